@@ -0,0 +1,266 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ==============================================================================
+# CONTROLE DE ADMISSÃO DAS VIEWS DE IA
+# ==============================================================================
+#
+# As views de IA de um processo (worker) dividem um único orçamento: um limite
+# de requisições executando ao mesmo tempo e uma fila de espera limitada.
+# Quando não há vaga, a requisição espera na fila do seu usuário; as vagas
+# liberadas são entregues em rodízio entre os usuários com requisições na fila,
+# para que um usuário com muitas requisições não atrase os outros. Fila cheia ou
+# espera esgotada viram 503 com Retry-After na hora, em vez de a requisição
+# ficar presa até o timeout.
+#
+# Cada requisição executando ou na fila prende uma thread do servidor, então
+# concorrencia + fila (threads_ocupadas_pela_ia) precisa ficar abaixo das
+# threads do worker, com uma reserva para as outras views (ver gunicorn.conf.py).
+#
+# Configuração em settings.IA_ADMISSAO.
+
+CONFIGURACAO_PADRAO = {
+    'concorrencia': 2,   # requisições executando ao mesmo tempo
+    'fila': 4,           # requisições esperando, somando todos os usuários
+    'por_usuario': 2,    # requisições esperando do mesmo usuário
+    'espera': 5.0,       # segundos máximos na fila
+}
+
+
+class ServicoSobrecarregado(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Serviço de IA sobrecarregado. Tente novamente em alguns segundos.'
+    default_code = 'servico_sobrecarregado'
+
+    def __init__(self, detail=None, espera=None):
+        super().__init__(detail)
+        # O exception_handler do DRF transforma `wait` no cabeçalho Retry-After.
+        self.wait = espera
+
+
+class _Espera:
+    __slots__ = ('evento', 'admitida')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.admitida = False
+
+
+class LimitadorAdmissao:
+    """ Semáforo com fila limitada e justa por usuário. Uma instância por processo, para todas as views de IA. """
+
+    def __init__(self, nome, concorrencia, fila, por_usuario, espera):
+        self.nome = nome
+        self.concorrencia = max(1, int(concorrencia))
+        self.fila_maxima = max(0, int(fila))
+        self.por_usuario = max(1, int(por_usuario))
+        self.espera_maxima = float(espera)
+
+        self._lock = threading.Lock()
+        self._em_execucao = 0
+        self._na_fila = 0
+        self._filas = OrderedDict()  # usuário -> deque de _Espera, na ordem do rodízio
+        self._duracao_media = None
+        self._contadores = {
+            'admitidas': 0,
+            'admitidas_apos_espera': 0,
+            'rejeitadas_fila_cheia': 0,
+            'rejeitadas_limite_usuario': 0,
+            'rejeitadas_espera_esgotada': 0,
+        }
+        self._espera_total = 0.0
+        self._pico_fila = 0
+        self._por_endpoint = Counter()
+
+    def _retry_after(self):
+        # Estimativa de quando a fila atual termina, em segundos inteiros.
+        duracao = self._duracao_media or 1.0
+        return max(1, math.ceil(duracao * (self._na_fila + 1) / self.concorrencia))
+
+    def _rejeitar(self, motivo):
+        self._contadores[f'rejeitadas_{motivo}'] += 1
+        return ServicoSobrecarregado(espera=self._retry_after())
+
+    def entrar(self, usuario, endpoint=None):
+        """ Ocupa uma vaga, esperando na fila se preciso. Levanta ServicoSobrecarregado. """
+        with self._lock:
+            if self._em_execucao < self.concorrencia and not self._na_fila:
+                self._em_execucao += 1
+                self._contadores['admitidas'] += 1
+                self._por_endpoint[endpoint] += 1
+                return time.monotonic()
+            if self._na_fila >= self.fila_maxima:
+                raise self._rejeitar('fila_cheia')
+            fila_usuario = self._filas.get(usuario)
+            if fila_usuario is not None and len(fila_usuario) >= self.por_usuario:
+                raise self._rejeitar('limite_usuario')
+
+            espera = _Espera()
+            if fila_usuario is None:
+                fila_usuario = self._filas[usuario] = deque()
+            fila_usuario.append(espera)
+            self._na_fila += 1
+            self._pico_fila = max(self._pico_fila, self._na_fila)
+
+        inicio = time.monotonic()
+        espera.evento.wait(self.espera_maxima)
+        with self._lock:
+            self._espera_total += time.monotonic() - inicio
+            # A vaga pode ter chegado entre o fim da espera e o lock.
+            if espera.admitida:
+                self._contadores['admitidas'] += 1
+                self._contadores['admitidas_apos_espera'] += 1
+                self._por_endpoint[endpoint] += 1
+                return time.monotonic()
+            fila_usuario.remove(espera)
+            if not fila_usuario:
+                del self._filas[usuario]
+            self._na_fila -= 1
+            raise self._rejeitar('espera_esgotada')
+
+    def sair(self, inicio):
+        """ Libera a vaga ocupada desde `inicio` (retorno de entrar). """
+        with self._lock:
+            duracao = time.monotonic() - inicio
+            self._duracao_media = duracao if self._duracao_media is None else 0.8 * self._duracao_media + 0.2 * duracao
+
+            if not self._filas:
+                self._em_execucao -= 1
+                return
+            # Rodízio: a vaga vai para o primeiro usuário da fila, que passa para o fim.
+            usuario, fila_usuario = next(iter(self._filas.items()))
+            espera = fila_usuario.popleft()
+            if fila_usuario:
+                self._filas.move_to_end(usuario)
+            else:
+                del self._filas[usuario]
+            self._na_fila -= 1
+            espera.admitida = True
+            espera.evento.set()
+
+    def estatisticas(self):
+        with self._lock:
+            esperas = self._contadores['admitidas_apos_espera'] + self._contadores['rejeitadas_espera_esgotada']
+            return {
+                'concorrencia': self.concorrencia,
+                'fila_maxima': self.fila_maxima,
+                'por_usuario': self.por_usuario,
+                'espera_maxima': self.espera_maxima,
+                'em_execucao': self._em_execucao,
+                'na_fila': self._na_fila,
+                'usuarios_na_fila': len(self._filas),
+                'pico_fila': self._pico_fila,
+                'duracao_media_s': round(self._duracao_media, 4) if self._duracao_media is not None else None,
+                'espera_media_s': round(self._espera_total / esperas, 4) if esperas else None,
+                **self._contadores,
+                'admitidas_por_endpoint': dict(self._por_endpoint),
+            }
+
+
+_limitador = None
+_limitador_lock = threading.Lock()
+
+
+def configuracao():
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'IA_ADMISSAO', {})}
+
+
+def obter_limitador():
+    global _limitador
+    if _limitador is None:
+        with _limitador_lock:
+            if _limitador is None:
+                _limitador = LimitadorAdmissao('ia', **configuracao())
+    return _limitador
+
+
+def threads_ocupadas_pela_ia():
+    """ Máximo de threads que as views de IA prendem ao mesmo tempo: vagas de execução mais a fila. """
+    valores = configuracao()
+    return max(1, int(valores['concorrencia'])) + max(0, int(valores['fila']))
+
+
+def estatisticas():
+    """ Contadores do orçamento de IA deste processo. """
+    return {'pid': os.getpid(), **obter_limitador().estatisticas()}
+
+# ==============================================================================
+# MIXIN DAS VIEWS
+# ==============================================================================
+
+class _LiberarAoFechar:
+    """
+    Conteúdo de StreamingHttpResponse que libera a vaga quando a resposta termina.
+    O Django chama close() ao fechar a resposta, mesmo que o cliente desconecte
+    antes de o conteúdo começar a ser lido.
+    """
+
+    def __init__(self, conteudo, liberar):
+        self._conteudo = conteudo
+        self._liberar = liberar
+
+    def __iter__(self):
+        try:
+            yield from self._conteudo
+        finally:
+            self.close()
+
+    def close(self):
+        self._liberar()
+
+
+class AdmissaoMixin:
+    """
+    Controle de admissão para APIViews de IA. A vaga é pedida depois da
+    autenticação e das permissões (requisições recusadas não entram na fila) e
+    liberada ao finalizar a resposta, ou no fim do streaming.
+    """
+    admissao_nome = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        limitador = obter_limitador()
+        inicio = limitador.entrar(request.user.id, self.admissao_nome)
+        liberada = False
+
+        def liberar():
+            nonlocal liberada
+            if not liberada:
+                liberada = True
+                limitador.sair(inicio)
+
+        self._liberar_admissao = liberar
+
+    def _liberar(self):
+        liberar = getattr(self, '_liberar_admissao', None)
+        if liberar is not None:
+            self._liberar_admissao = None
+            liberar()
+
+    def handle_exception(self, exc):
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Exceção não tratada: finalize_response não será chamado.
+            self._liberar()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        liberar = getattr(self, '_liberar_admissao', None)
+        if liberar is not None and getattr(response, 'streaming', False):
+            self._liberar_admissao = None
+            response.streaming_content = _LiberarAoFechar(response.streaming_content, liberar)
+        else:
+            self._liberar()
+        return response
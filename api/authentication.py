@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+# ==============================================================================
+# CACHE DE USUÁRIOS COMPLETOS (POR PROCESSO)
+# ==============================================================================
+
+_cache_usuarios = OrderedDict()
+_cache_lock = threading.Lock()
+_TAMANHO_MAXIMO_CACHE = 10000
+
+
+def dados_do_usuario(user):
+    """
+    Os campos de UserMeSerializer (e das claims do token) com uma única consulta
+    ao elenco; o resultado fica guardado na própria instância.
+    """
+    if not hasattr(user, '_dados_usuario'):
+        elenco = user.elencos.only('id', 'nome_elenco').first()
+        user._dados_usuario = {
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'team_name': elenco.nome_elenco if elenco else 'Time não definido',
+            'elenco_id': elenco.id if elenco else None,
+        }
+    return user._dados_usuario
+
+
+def obter_usuario(user_id):
+    """
+    Retorna o User completo (com dados_do_usuario já calculado), usando um cache
+    curto por processo. AUTH_CACHE_USUARIO_TTL = 0 desliga o cache.
+    """
+    from .models import User
+
+    ttl = getattr(settings, 'AUTH_CACHE_USUARIO_TTL', 30)
+    agora = time.monotonic()
+    if ttl:
+        with _cache_lock:
+            entrada = _cache_usuarios.get(user_id)
+            if entrada is not None and entrada[0] > agora:
+                _cache_usuarios.move_to_end(user_id)
+                return entrada[1]
+
+    usuario = User.objects.get(pk=user_id)
+    dados_do_usuario(usuario)
+    if ttl:
+        with _cache_lock:
+            _cache_usuarios[user_id] = (agora + ttl, usuario)
+            _cache_usuarios.move_to_end(user_id)
+            while len(_cache_usuarios) > _TAMANHO_MAXIMO_CACHE:
+                _cache_usuarios.popitem(last=False)
+    return usuario
+
+
+def invalidar_usuario(user_id):
+    with _cache_lock:
+        _cache_usuarios.pop(user_id, None)
+
+# ==============================================================================
+# USUÁRIO BASEADO NO TOKEN
+# ==============================================================================
+
+class UsuarioToken(TokenUser):
+    """
+    Usuário montado a partir das claims do token de acesso, sem consulta ao banco
+    (ver MyTokenObtainPairSerializer.get_token). Quem precisar do User de verdade
+    usa `usuario`, que passa pelo cache de obter_usuario.
+    """
+
+    @cached_property
+    def usuario(self):
+        # Como no JWTAuthentication.get_user: token de usuário removido ou
+        # inativo é 401, não 500.
+        from .models import User
+        try:
+            usuario = obter_usuario(self.id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("Usuário não encontrado.", code='user_not_found')
+        if not usuario.is_active:
+            raise AuthenticationFailed("Usuário inativo.", code='user_inactive')
+        return usuario
+
+    def _claim(self, nome):
+        # Tokens emitidos antes das claims extras caem no usuário completo.
+        if nome in self.token:
+            return self.token[nome]
+        return dados_do_usuario(self.usuario)[nome]
+
+    @cached_property
+    def email(self):
+        return self._claim('email')
+
+    @cached_property
+    def first_name(self):
+        return self._claim('first_name')
+
+    @cached_property
+    def last_name(self):
+        return self._claim('last_name')
+
+    @cached_property
+    def elenco_id(self):
+        return self._claim('elenco_id')
+
+    @cached_property
+    def team_name(self):
+        return self._claim('team_name')
+
+    def get_username(self):
+        return self.email
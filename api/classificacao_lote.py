@@ -0,0 +1,228 @@
+import codecs
+import json
+import logging
+import re
+
+import numpy as np
+
+from rest_framework import serializers
+
+from .ia_logic import _classificar_jogadores
+from .serializers import JogadorHipoteticoSerializer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ==============================================================================
+# LEITURA INCREMENTAL DO CORPO (NDJSON OU ARRAY JSON)
+# ==============================================================================
+#
+# O corpo é lido em blocos direto do stream da requisição, sem passar por
+# request.data / request.body, então a memória usada depende do tamanho do
+# lote e não do tamanho da requisição.
+
+TAMANHO_BLOCO = 64 * 1024
+_decoder = json.JSONDecoder()
+_ESPACOS = re.compile(r'[ \t\n\r]*')
+
+
+class ErroLeitura(Exception):
+    """ Corpo malformado de um jeito que impede continuar a leitura. """
+
+
+def _blocos(fluxo):
+    # Decodificador incremental: um caractere pode ficar dividido entre dois blocos.
+    decodificador = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        bloco = fluxo.read(TAMANHO_BLOCO)
+        if not bloco:
+            # Bytes de um caractere cortado no fim do corpo viram U+FFFD (e o
+            # registro em que caem, um ErroLeitura) em vez de sumirem.
+            resto = decodificador.decode(b'', final=True)
+            if resto:
+                yield resto
+            return
+        texto = decodificador.decode(bloco) if isinstance(bloco, bytes) else bloco
+        if texto:
+            yield texto
+
+
+def _ler_ndjson(blocos, buffer, tamanho_maximo):
+    """ Uma linha por registro; linha inválida vira erro só daquele registro. """
+    inicio = 0
+    fim = False
+    while not fim:
+        quebra = buffer.find('\n', inicio)
+        if quebra < 0:
+            buffer, inicio = buffer[inicio:], 0
+            if len(buffer) > tamanho_maximo:
+                raise ErroLeitura(f"Registro maior que {tamanho_maximo} bytes.")
+            bloco = next(blocos, None)
+            if bloco is not None:
+                buffer += bloco
+                continue
+            fim = True
+            linha = buffer
+        else:
+            linha, inicio = buffer[inicio:quebra], quebra + 1
+
+        linha = linha.strip()
+        if linha:
+            try:
+                yield json.loads(linha)
+            except json.JSONDecodeError as e:
+                yield ErroLeitura(f"JSON inválido: {e.msg}.")
+
+
+def _ler_array(blocos, buffer, tamanho_maximo):
+    """ Elementos de um array JSON de nível superior, decodificados um a um. """
+    posicao = 1  # depois do '['
+    esperando_virgula = False
+    fim = False
+
+    def ler_mais():
+        # Descarta o que já foi consumido para o buffer não crescer.
+        nonlocal buffer, posicao, fim
+        if posicao:
+            buffer, posicao = buffer[posicao:], 0
+        if len(buffer) > tamanho_maximo:
+            raise ErroLeitura(f"Registro maior que {tamanho_maximo} bytes.")
+        bloco = next(blocos, None)
+        fim = bloco is None
+        buffer += bloco or ''
+
+    while True:
+        posicao = _ESPACOS.match(buffer, posicao).end()
+        if posicao == len(buffer):
+            if fim:
+                raise ErroLeitura("Array JSON não foi fechado.")
+            ler_mais()
+            continue
+
+        if buffer[posicao] == ']':
+            if buffer[posicao + 1:].strip() or any(bloco.strip() for bloco in blocos):
+                raise ErroLeitura("Conteúdo inesperado depois do fim do array.")
+            return
+        if esperando_virgula:
+            if buffer[posicao] != ',':
+                raise ErroLeitura("Esperado ',' ou ']' entre os elementos do array.")
+            posicao, esperando_virgula = posicao + 1, False
+            continue
+
+        try:
+            registro, final = _decoder.raw_decode(buffer, posicao)
+            completo = final < len(buffer) or fim
+        except json.JSONDecodeError as e:
+            if fim:
+                raise ErroLeitura(f"JSON inválido: {e.msg}.")
+            completo = False
+        if not completo:
+            # Elemento cortado no fim do bloco: lê mais e tenta de novo.
+            ler_mais()
+            continue
+
+        posicao, esperando_virgula = final, True
+        yield registro
+
+
+def ler_registros(fluxo, tamanho_maximo):
+    """
+    Gera os registros do corpo: um array JSON (`[{...}, {...}]`) ou NDJSON (um
+    objeto por linha), detectado pelo primeiro caractere. Registros que não
+    puderam ser decodificados são gerados como ErroLeitura.
+    """
+    blocos = _blocos(fluxo)
+    buffer = ''
+    for bloco in blocos:
+        buffer = (buffer + bloco).lstrip('\ufeff \t\r\n')
+        if buffer:
+            break
+    if buffer.startswith('['):
+        return _ler_array(blocos, buffer, tamanho_maximo)
+    return _ler_ndjson(blocos, buffer, tamanho_maximo)
+
+# ==============================================================================
+# CLASSIFICAÇÃO EM LOTES
+# ==============================================================================
+
+def _erros_validacao(detalhe):
+    return detalhe if isinstance(detalhe, (dict, list)) else [str(detalhe)]
+
+
+def classificar_em_lotes(registros, model, scaler, tamanho_lote):
+    """
+    Valida cada registro com as regras de Jogador e classifica os válidos em
+    lotes de `tamanho_lote`, gerando um dict de resultado por registro, na ordem
+    de entrada. Goleiros não passam pelo modelo. A última linha é um resumo.
+    """
+    validador = JogadorHipoteticoSerializer()
+    totais = {'total': 0, 'classificados': 0, 'invalidos': 0}
+    lote = []
+
+    def esvaziar():
+        classificados, probabilidades = _classificar_jogadores([r for _, r in lote], model, scaler)
+        for (resultado, _), classificacao, linha in zip(lote, classificados, probabilidades):
+            resultado.update(
+                posicao_sugerida=classificacao['posicao_sugerida'],
+                grupo_tatico=classificacao['grupo_tatico'],
+                confianca=None if np.isnan(linha).any() else round(float(linha.max()), 4),
+            )
+        lote.clear()
+
+    pendentes = []
+    try:
+        for indice, registro in enumerate(registros):
+            totais['total'] += 1
+            resultado = {'indice': indice}
+            if isinstance(registro, ErroLeitura):
+                resultado['erros'] = [str(registro)]
+            elif not isinstance(registro, dict):
+                resultado['erros'] = ["Cada registro deve ser um objeto JSON."]
+            else:
+                if 'id' in registro:
+                    # Identificador externo, devolvido sem validação.
+                    resultado['id'] = registro['id']
+                try:
+                    jogador = validador.run_validation(registro)
+                except serializers.ValidationError as e:
+                    resultado['erros'] = _erros_validacao(e.detail)
+                else:
+                    resultado['nome'] = jogador['nome']
+                    if jogador['goleiro']:
+                        resultado.update(posicao_sugerida='Goleiro', grupo_tatico='Goleiro', confianca=None)
+                    else:
+                        lote.append((resultado, jogador))
+
+            if 'erros' in resultado:
+                totais['invalidos'] += 1
+            else:
+                totais['classificados'] += 1
+            pendentes.append(resultado)
+
+            # O limite vale também para os resultados retidos atrás do lote.
+            if lote and (len(lote) >= tamanho_lote or len(pendentes) >= 2 * tamanho_lote):
+                esvaziar()
+            # Só sai o que já foi classificado, mantendo a ordem de entrada.
+            if not lote:
+                yield from pendentes
+                pendentes.clear()
+    except ErroLeitura as e:
+        if lote:
+            esvaziar()
+        yield from pendentes
+        yield {'erro': str(e), 'registros_lidos': totais['total']}
+        return
+
+    if lote:
+        esvaziar()
+    yield from pendentes
+    yield {'resumo': totais}
+
+
+def gerar_ndjson(resultados):
+    # A resposta já começou a ser enviada: erros viram a última linha.
+    try:
+        for resultado in resultados:
+            yield json.dumps(resultado, ensure_ascii=False) + '\n'
+    except Exception as e:
+        logging.exception("Erro durante a classificação em massa:")
+        yield json.dumps({'erro': f"Erro interno na classificação. Detalhe: {e}"}, ensure_ascii=False) + '\n'
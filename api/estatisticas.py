@@ -0,0 +1,189 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .ia_logic import mapear_posicao_cadastrada_para_grupo
+from .models import Elenco, EstatisticasElenco, Jogador
+
+# ==============================================================================
+# CONTRIBUIÇÃO DE UM JOGADOR PARA OS AGREGADOS
+# ==============================================================================
+
+ATRIBUTOS_SOMADOS = ['velocidade', 'chute', 'passe', 'defesa', 'altura', 'peso', 'idade']
+CAMPOS_RASTREADOS = ['elenco_id', 'posicao', 'perna_boa', 'goleiro'] + ATRIBUTOS_SOMADOS
+
+
+def estado_do_jogador(jogador):
+    """
+    Copia os campos que entram nos agregados. Retorna None se algum campo foi
+    adiado (.only()/.defer()), para não disparar uma consulta por campo.
+    """
+    valores = jogador.__dict__
+    if any(campo not in valores for campo in CAMPOS_RASTREADOS):
+        return None
+    return {campo: valores[campo] for campo in CAMPOS_RASTREADOS}
+
+
+def _novo_delta():
+    return {'numeros': Counter(), 'posicoes': Counter(), 'grupos': Counter()}
+
+
+def _acumular(delta, estado, sinal):
+    numeros = delta['numeros']
+    numeros['total_jogadores'] += sinal
+    if estado['goleiro']:
+        numeros['total_goleiros'] += sinal
+    else:
+        delta['grupos'][mapear_posicao_cadastrada_para_grupo(estado['posicao'])] += sinal
+    numeros['perna_esquerda' if estado['perna_boa'] == 'ESQ' else 'perna_direita'] += sinal
+    for atributo in ATRIBUTOS_SOMADOS:
+        numeros[f'soma_{atributo}'] += sinal * (estado[atributo] or 0)
+    delta['posicoes'][estado['posicao']] += sinal
+
+
+def _somar_contagens(atual, delta):
+    resultado = dict(atual)
+    for chave, valor in delta.items():
+        novo = resultado.get(chave, 0) + valor
+        if novo:
+            resultado[chave] = novo
+        else:
+            resultado.pop(chave, None)
+    return resultado
+
+# ==============================================================================
+# ATUALIZAÇÃO INCREMENTAL (SINAIS E OPERAÇÕES EM MASSA)
+# ==============================================================================
+
+def _aplicar_delta(elenco_id, delta):
+    # Chamado dentro da transação que gravou o jogador (Jogador.save, delete e
+    # as operações em massa), que já detém o lock de escrita.
+    with transaction.atomic():
+        contagens = (
+            EstatisticasElenco.objects.select_for_update().filter(elenco_id=elenco_id)
+            .values_list('contagem_posicoes', 'contagem_grupos').first()
+        )
+        if contagens is None:
+            # Elenco anterior aos agregados (ou em remoção): recalcula do zero.
+            if Elenco.objects.filter(pk=elenco_id).exists():
+                recalcular_estatisticas([elenco_id])
+            return
+        # Contadores somados no próprio UPDATE; as contagens JSON vêm da linha travada acima.
+        EstatisticasElenco.objects.filter(elenco_id=elenco_id).update(
+            **{campo: F(campo) + valor for campo, valor in delta['numeros'].items() if valor},
+            contagem_posicoes=_somar_contagens(contagens[0], delta['posicoes']),
+            contagem_grupos=_somar_contagens(contagens[1], delta['grupos']),
+        )
+
+
+def registrar_alteracao(estado_anterior, estado_atual):
+    """Aplica em O(1) a troca de `estado_anterior` por `estado_atual` (qualquer um pode ser None)."""
+    deltas = defaultdict(_novo_delta)
+    if estado_anterior is not None:
+        _acumular(deltas[estado_anterior['elenco_id']], estado_anterior, -1)
+    if estado_atual is not None:
+        _acumular(deltas[estado_atual['elenco_id']], estado_atual, +1)
+    for elenco_id, delta in deltas.items():
+        _aplicar_delta(elenco_id, delta)
+
+
+def somar_jogadores_criados(jogadores):
+    """Soma os jogadores de um bulk_create, com uma atualização por elenco."""
+    deltas = defaultdict(_novo_delta)
+    for jogador in jogadores:
+        _acumular(deltas[jogador.elenco_id], estado_do_jogador(jogador), +1)
+    for elenco_id, delta in deltas.items():
+        _aplicar_delta(elenco_id, delta)
+
+def estatisticas_de_elencos_novos(elenco_ids, jogadores):
+    """
+    EstatisticasElenco (ainda não salvas) de elencos recém-criados, somando os
+    jogadores em memória; para bulk_create junto com os próprios elencos.
+    """
+    deltas = defaultdict(_novo_delta)
+    for jogador in jogadores:
+        _acumular(deltas[jogador.elenco_id], estado_do_jogador(jogador), +1)
+    return [
+        EstatisticasElenco(
+            elenco_id=elenco_id,
+            **deltas[elenco_id]['numeros'],
+            contagem_posicoes=dict(deltas[elenco_id]['posicoes']),
+            contagem_grupos=dict(deltas[elenco_id]['grupos']),
+        )
+        for elenco_id in elenco_ids
+    ]
+
+# ==============================================================================
+# RECÁLCULO COMPLETO
+# ==============================================================================
+
+def recalcular_estatisticas(elenco_ids=None):
+    """
+    Recalcula do zero os agregados dos elencos informados (ou de todos).
+    Usado pelas operações em massa e pelo comando recalcular_estatisticas_elenco.
+    """
+    elencos = Elenco.objects.all()
+    if elenco_ids is not None:
+        elenco_ids = [e for e in elenco_ids if e is not None]
+        if not elenco_ids:
+            return 0
+        elencos = elencos.filter(pk__in=elenco_ids)
+
+    somas = {f'soma_{atributo}': Sum(f'jogadores__{atributo}', default=0) for atributo in ATRIBUTOS_SOMADOS}
+    agregados = elencos.annotate(
+        total_jogadores=Count('jogadores'),
+        total_goleiros=Count('jogadores', filter=Q(jogadores__goleiro=True)),
+        perna_esquerda=Count('jogadores', filter=Q(jogadores__perna_boa='ESQ')),
+        **somas,
+    ).values('id', 'total_jogadores', 'total_goleiros', 'perna_esquerda', *somas)
+
+    jogadores = Jogador.objects.all()
+    if elenco_ids is not None:
+        jogadores = jogadores.filter(elenco_id__in=elenco_ids)
+    posicoes = defaultdict(Counter)
+    grupos = defaultdict(Counter)
+    for elenco_id, posicao, goleiro, quantidade in (
+        jogadores.values_list('elenco_id', 'posicao', 'goleiro').annotate(n=Count('id')).order_by()
+    ):
+        posicoes[elenco_id][posicao] += quantidade
+        if not goleiro:
+            grupos[elenco_id][mapear_posicao_cadastrada_para_grupo(posicao)] += quantidade
+
+    total = 0
+    with transaction.atomic():
+        for linha in agregados:
+            elenco_id = linha.pop('id')
+            linha['perna_direita'] = linha['total_jogadores'] - linha['perna_esquerda']
+            EstatisticasElenco.objects.update_or_create(
+                elenco_id=elenco_id,
+                defaults={
+                    **linha,
+                    'contagem_posicoes': dict(posicoes[elenco_id]),
+                    'contagem_grupos': dict(grupos[elenco_id]),
+                },
+            )
+            total += 1
+    return total
+
+# ==============================================================================
+# RESUMO DO ELENCO
+# ==============================================================================
+
+def resumir(estatisticas):
+    """Monta o resumo do elenco a partir da linha de agregados, sem ler os jogadores."""
+    total = estatisticas.total_jogadores
+    medias = {
+        atributo: round(getattr(estatisticas, f'soma_{atributo}') / total, 2) if total else None
+        for atributo in ATRIBUTOS_SOMADOS
+    }
+    return {
+        'elenco_id': estatisticas.elenco_id,
+        'total_jogadores': total,
+        'total_goleiros': estatisticas.total_goleiros,
+        'total_jogadores_linha': total - estatisticas.total_goleiros,
+        'medias': medias,
+        'perna_boa': {'DIR': estatisticas.perna_direita, 'ESQ': estatisticas.perna_esquerda},
+        'por_posicao': estatisticas.contagem_posicoes,
+        'por_grupo_tatico': estatisticas.contagem_grupos,
+    }
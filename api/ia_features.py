@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# FEATURES DO MODELO DE POSIÇÕES (TREINO E SERVIDOR)
+# ==============================================================================
+#
+# Definição única das entradas e saídas do modelo, usada pelo backend
+# (ia_logic._montar_features) e pelos scripts de deep_learning_model/
+# (preprocess_data.py, distill_model.py). Este módulo não depende do Django.
+
+POSICOES_MODELO = ['CAM', 'CB', 'CDM', 'CM', 'LB', 'LM', 'LW', 'RB', 'RM', 'RW', 'ST']
+
+NOMES_FEATURES_TREINO = [
+    'weight', 'height', 'wh', 'movement', 'finishing_acc', 'skills', 'defensive_rating'
+]
+
+# Features compostas a partir dos atributos da base de origem (tabela
+# Player_Attributes): colunas somadas e divisor. 'skills' soma quatro
+# atributos e divide por três, como no notebook que gerou os dados dos modelos
+# já treinados.
+FORMULAS_FONTE = {
+    'movement': (['acceleration', 'sprint_speed', 'agility', 'balance', 'stamina'], 5.0),
+    'finishing_acc': (['finishing', 'heading_accuracy', 'shot_power'], 3.0),
+    'skills': (['crossing', 'dribbling', 'curve', 'ball_control'], 3.0),
+    'defensive_rating': (['marking', 'standing_tackle', 'sliding_tackle'], 3.0),
+}
+
+COLUNAS_FONTE = sorted({coluna for colunas, _ in FORMULAS_FONTE.values() for coluna in colunas})
+
+# No servidor cada feature composta vem direto de um atributo de Jogador.
+ATRIBUTOS_JOGADOR = {
+    'movement': 'velocidade',
+    'finishing_acc': 'chute',
+    'skills': 'passe',
+    'defensive_rating': 'defesa',
+}
+
+# A base de origem tem o peso em libras e os atributos de 0 a 100; Jogador tem o
+# peso em kg e os atributos de 1 a 10. O modelo e o scaler foram treinados nas
+# unidades da fonte, então as entradas do servidor são convertidas para elas.
+# A altura está em cm nos dois.
+LIBRAS_POR_KG = 2.20462
+ESCALA_ATRIBUTOS_FONTE = 10.0
+
+
+def montar_features(peso, altura, movement, finishing_acc, skills, defensive_rating):
+    """ DataFrame nas colunas NOMES_FEATURES_TREINO; aceita escalares ou arrays. """
+    peso = np.asarray(peso, dtype=np.float64)
+    altura = np.asarray(altura, dtype=np.float64)
+    return pd.DataFrame({
+        'weight': peso,
+        'height': altura,
+        'wh': (peso + altura) / 2.0,
+        'movement': movement,
+        'finishing_acc': finishing_acc,
+        'skills': skills,
+        'defensive_rating': defensive_rating,
+    }, columns=NOMES_FEATURES_TREINO)
+
+
+def features_da_fonte(df):
+    """ Features a partir das colunas da base de origem (weight, height e COLUNAS_FONTE). """
+    compostas = {
+        nome: df[colunas].to_numpy(dtype=np.float64).sum(axis=1) / divisor
+        for nome, (colunas, divisor) in FORMULAS_FONTE.items()
+    }
+    return montar_features(df['weight'], df['height'], **compostas).set_axis(df.index)
+
+
+def features_de_atributos(peso, altura, velocidade, chute, passe, defesa):
+    """
+    Features a partir dos campos de Jogador (peso em kg, atributos de 1 a 10),
+    convertidos para as unidades da fonte. Um atributo de Jogador vale por todas
+    as colunas da fórmula da feature: passe 8 equivale a crossing, dribbling,
+    curve e ball_control em 80, ou seja, skills = 4 * 80 / 3.
+    """
+    atributos = dict(zip(ATRIBUTOS_JOGADOR.values(), (velocidade, chute, passe, defesa)))
+    compostas = {
+        feature: np.asarray(atributos[campo], dtype=np.float64) * ESCALA_ATRIBUTOS_FONTE
+        * len(FORMULAS_FONTE[feature][0]) / FORMULAS_FONTE[feature][1]
+        for feature, campo in ATRIBUTOS_JOGADOR.items()
+    }
+    return montar_features(np.asarray(peso, dtype=np.float64) * LIBRAS_POR_KG, altura, **compostas)
+
+
+def features_de_jogadores(jogadores):
+    """ Features a partir de dicts com os campos de Jogador (como ia_logic recebe). """
+    return features_de_atributos(*(
+        [jogador[campo] for jogador in jogadores]
+        for campo in ('peso', 'altura', *ATRIBUTOS_JOGADOR.values())
+    ))
@@ -1,18 +1,63 @@
-import pandas as pd
+import numpy as np
 from collections import Counter
+from functools import lru_cache
 import logging
 
+from .ia_features import POSICOES_MODELO, features_de_jogadores
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # ==============================================================================
 # SEÇÃO 1: FUNÇÕES AUXILIARES (INTERNAS)
 # ==============================================================================
 
+def _montar_features(jogadores):
+    # Mesma definição e unidades dos dados de treino (ver ia_features.py).
+    return features_de_jogadores(jogadores)
+
+def _prever_probabilidades_em_lote(features_df, scaler, model):
+    """ Uma única inferência para todas as linhas; retorna matriz (n, len(POSICOES_MODELO)). """
+    if len(features_df) == 0:
+        return np.empty((0, len(POSICOES_MODELO)))
+    # predict_on_batch evita o pipeline tf.data de predict (~100 ms fixos por chamada).
+    return np.asarray(model.predict_on_batch(scaler.transform(features_df)))
+
 def _predict_player_positions(player_df, scaler, model):
-    posicoes_modelo = ['CAM', 'CB', 'CDM', 'CM', 'LB', 'LM', 'LW', 'RB', 'RM', 'RW', 'ST']
-    input_scaled = scaler.transform(player_df)
-    predictions = model.predict(input_scaled, verbose=0)
-    return dict(zip(posicoes_modelo, predictions.flatten()))
+    predictions = _prever_probabilidades_em_lote(player_df, scaler, model)
+    return dict(zip(POSICOES_MODELO, predictions.flatten()))
+
+def _classificar_jogadores(jogadores, model, scaler):
+    """
+    Classifica todos os jogadores com uma inferência em lote (se o lote falhar,
+    classifica um a um). Retorna a lista de jogadores classificados e a matriz
+    de probabilidades, com NaN nas linhas que não puderam ser classificadas.
+    """
+    try:
+        probabilidades = _prever_probabilidades_em_lote(_montar_features(jogadores), scaler, model)
+    except Exception as e:
+        logging.error(f"Erro na classificação em lote, classificando um a um: {e}")
+        probabilidades = np.full((len(jogadores), len(POSICOES_MODELO)), np.nan)
+        for i, jogador in enumerate(jogadores):
+            try:
+                probabilidades[i] = _prever_probabilidades_em_lote(_montar_features([jogador]), scaler, model)[0]
+            except Exception as e:
+                logging.error(f"Erro ao classificar jogador {jogador.get('nome', 'desconhecido')}: {e}")
+
+    classificados = []
+    for jogador, linha in zip(jogadores, probabilidades):
+        if np.isnan(linha).any():
+            melhor_posicao_prevista = 'Sem Sugestão (Erro AI)'
+            grupo_principal = 'Outro'
+        else:
+            melhor_posicao_prevista = POSICOES_MODELO[int(np.argmax(linha))]
+            grupo_principal = _mapear_posicao_para_grupo(melhor_posicao_prevista)
+        classificados.append({
+            'nome': jogador.get('nome'),
+            'posicao_sugerida': melhor_posicao_prevista,
+            'grupo_tatico': grupo_principal
+        })
+        logging.debug(f"Jogador: {jogador.get('nome')}, Posição AI: {melhor_posicao_prevista}, Grupo Tático: {grupo_principal}")
+    return classificados, probabilidades
 
 def _mapear_posicao_para_grupo(posicao_str):
     posicao_upper = posicao_str.upper()
@@ -28,6 +73,26 @@ def _mapear_posicao_para_grupo(posicao_str):
         return 'Atacante'
     return 'Outro'
 
+def mapear_posicao_cadastrada_para_grupo(posicao_str):
+    """
+    Traduz a posição cadastrada pelo técnico (ex.: 'Zagueiro', 'Lateral Direito')
+    para um grupo tático; siglas do modelo (ex.: 'CB', 'ST') também são aceitas.
+    """
+    posicao_lower = (posicao_str or '').lower()
+    if 'goleiro' in posicao_lower or posicao_lower.strip() == 'gk':
+        return 'Goleiro'
+    if 'zagueiro' in posicao_lower or 'lateral' in posicao_lower:
+        return 'Defensor'
+    if 'volante' in posicao_lower:
+        return 'Volante'
+    if 'meia' in posicao_lower or 'meio' in posicao_lower:
+        return 'Meia'
+    if 'ponta' in posicao_lower:
+        return 'Ponta'
+    if 'atacante' in posicao_lower or 'centroavante' in posicao_lower:
+        return 'Atacante'
+    return _mapear_posicao_para_grupo(posicao_lower)
+
 # ==============================================================================
 # LÓGICA DE AVALIAÇÃO DE TÁTICAS
 # ==============================================================================
@@ -82,7 +147,7 @@ def _avaliar_fit_tatica(tactic_name, group_counts):
     
     requisitos = REQUISITOS_TATICAS.get(tactic_name)
     if not requisitos:
-        logging.warning(f"Tática desconhecida: {tatic_name}")
+        logging.warning(f"Tática desconhecida: {tactic_name}")
         return None, "Tática desconhecida."
 
     score = 0
@@ -121,11 +186,13 @@ def _avaliar_fit_tatica(tactic_name, group_counts):
     logging.debug(f"Finalizando _avaliar_fit_tatica para '{tactic_name}'. Score: {score}, Justificativa: {justificativa_final}") # Log de depuração final
     return score, justificativa_final
 
-def _sugerir_taticas_por_fit(group_counts, num_sugestoes=3, tolerancia_score=10):
+def _sugerir_taticas_por_fit(group_counts, num_sugestoes=3, tolerancia_score=10, contagens_por_tatica=None):
+    """ Com `contagens_por_tatica` (ver selecionar_melhores_xi) cada tática é avaliada com o seu onze. """
     logging.info(f"Iniciando sugestão de táticas para contagens de grupo: {group_counts}")
     resultados_taticas = []
     for tatic_name in REQUISITOS_TATICAS.keys():
-        score, justificativa = _avaliar_fit_tatica(tatic_name, group_counts)
+        contagem = contagens_por_tatica[tatic_name] if contagens_por_tatica else group_counts
+        score, justificativa = _avaliar_fit_tatica(tatic_name, contagem)
         if score is not None:
             resultados_taticas.append({
                 'nome': tatic_name,
@@ -154,21 +221,228 @@ def _sugerir_taticas_por_fit(group_counts, num_sugestoes=3, tolerancia_score=10)
     logging.info(f"Sugestões finais geradas: {sugestoes_finais}")
     return sugestoes_finais
 
+# ==============================================================================
+# ROBUSTEZ DAS SUGESTÕES (MONTE CARLO)
+# ==============================================================================
+#
+# Em vez de fixar cada jogador na posição de maior probabilidade, sorteia
+# milhares de distribuições de grupos a partir das probabilidades do modelo e
+# avalia todas as táticas em todas as amostras de uma vez. A pontuação é a
+# mesma de _avaliar_fit_tatica, só que vetorizada.
+
+GRUPOS_TATICOS = ['Defensor', 'Volante', 'Meia', 'Ponta', 'Atacante', 'Outro']
+_GRUPO_DA_POSICAO = np.array([GRUPOS_TATICOS.index(_mapear_posicao_para_grupo(p)) for p in POSICOES_MODELO])
+
+def _matrizes_requisitos():
+    """ Requisitos de REQUISITOS_TATICAS como matrizes (táticas x grupos). """
+    nomes = list(REQUISITOS_TATICAS)
+    forma = (len(nomes), len(GRUPOS_TATICOS))
+    ideal, minimo, maximo, avaliado = np.zeros(forma), np.zeros(forma), np.zeros(forma), np.zeros(forma, dtype=bool)
+    total = np.array([REQUISITOS_TATICAS[nome]['total_jogadores_linha'] for nome in nomes])
+    for t, nome in enumerate(nomes):
+        # Só os grupos da 'prioridade' entram na pontuação, como em _avaliar_fit_tatica.
+        for grupo in REQUISITOS_TATICAS[nome]['prioridade']:
+            g = GRUPOS_TATICOS.index(grupo)
+            requisito = REQUISITOS_TATICAS[nome][grupo]
+            ideal[t, g], minimo[t, g], maximo[t, g] = requisito['ideal'], requisito['min'], requisito['max']
+            avaliado[t, g] = True
+    return nomes, total, ideal, minimo, maximo, avaliado
+
+def _probabilidades_por_grupo(probabilidades):
+    """
+    Soma as probabilidades das posições de cada grupo e normaliza por jogador.
+    Linhas sem sinal (saídas zeradas) ficam com o grupo da classificação
+    determinística; linhas com erro ficam em 'Outro'.
+    """
+    por_grupo = np.zeros((len(probabilidades), len(GRUPOS_TATICOS)))
+    validas = ~np.isnan(probabilidades).any(axis=1)
+    np.add.at(por_grupo.T, _GRUPO_DA_POSICAO, np.nan_to_num(probabilidades).T)
+    somas = por_grupo.sum(axis=1)
+    sem_sinal = validas & (somas <= 0)
+    por_grupo[sem_sinal, _GRUPO_DA_POSICAO[np.argmax(probabilidades[sem_sinal], axis=1)]] = 1.0
+    por_grupo[~validas, GRUPOS_TATICOS.index('Outro')] = 1.0
+    return por_grupo / por_grupo.sum(axis=1, keepdims=True)
+
+_REQUISITOS_VETORIZADOS = _matrizes_requisitos()
+
+@lru_cache(maxsize=64)
+def _tabela_penalidades(n_jogadores):
+    """
+    A pontuação é separável por grupo: tabela[t, g, c] é a penalidade da tática
+    t quando o grupo g tem c jogadores (0 <= c <= n_jogadores).
+    """
+    _, _, ideal, minimo, maximo, avaliado = _REQUISITOS_VETORIZADOS
+    c = np.arange(n_jogadores + 1)[None, None, :]
+    ideal, minimo, maximo, avaliado = (m[:, :, None] for m in (ideal, minimo, maximo, avaliado))
+    penalidade = np.abs(c - ideal) + 5 * ((c < minimo) | (c > maximo))
+    return np.where(avaliado, penalidade, 0).astype(np.int32)
+
+def _scores_das_contagens(contagens_por_grupo, totais):
+    """
+    contagens_por_grupo: uma matriz (amostras x táticas) por grupo, com quantos
+    jogadores de cada tática caíram no grupo; totais: jogadores por tática.
+    Retorna os scores (amostras x táticas) de _avaliar_fit_tatica.
+    """
+    total_ideal = _REQUISITOS_VETORIZADOS[1]
+    tabela = _tabela_penalidades(int(totais.max()))
+    deslocamentos = np.arange(tabela.shape[0]) * tabela.shape[2]
+    # Cada jogador cai em exatamente um grupo: a penalidade do total é constante por tática.
+    scores = np.tile(np.abs(totais - total_ideal) * 10, (len(contagens_por_grupo[0]), 1))
+    for g, contagens in enumerate(contagens_por_grupo):
+        scores += np.take(tabela[:, g, :], deslocamentos + contagens)
+    return scores
+
+def avaliar_robustez_taticas(probabilidades, amostras=2000, seed=None, mascaras=None):
+    """
+    Recebe a matriz de probabilidades dos jogadores de linha (como retornada por
+    _classificar_jogadores) e retorna, por tática, o score esperado, o desvio
+    padrão e a probabilidade de ser a melhor tática (empates divididos).
+    `mascaras` (táticas x jogadores) restringe cada tática aos seus titulares
+    (ver selecionar_melhores_xi); sem ela todas usam o elenco inteiro.
+    """
+    nomes = _REQUISITOS_VETORIZADOS[0]
+    n_jogadores = len(probabilidades)
+    if n_jogadores == 0:
+        return {}
+    if mascaras is None:
+        mascaras = np.ones((len(nomes), n_jogadores), dtype=bool)
+    else:
+        # Quem não é titular em nenhuma tática não precisa ser sorteado.
+        titulares = mascaras.any(axis=0)
+        probabilidades, mascaras = probabilidades[titulares], mascaras[:, titulares]
+        n_jogadores = len(probabilidades)
+    pesos = mascaras.T.astype(np.float32)
+    totais = mascaras.sum(axis=1)
+
+    # Sorteio por inversão da CDF, um uniforme por jogador por amostra. Em vez de
+    # materializar o grupo de cada jogador, conta direto quantos titulares de
+    # cada tática caem depois de cada fronteira da CDF (um produto matricial por
+    # fronteira); as contagens por grupo são as diferenças.
+    acumuladas = np.cumsum(_probabilidades_por_grupo(probabilidades), axis=1)
+    rng = np.random.default_rng(seed)
+    sorteios = rng.random((amostras, n_jogadores), dtype=np.float32)
+    anterior = np.broadcast_to(totais, (amostras, len(nomes)))
+    contagens_por_grupo = []
+    for g in range(len(GRUPOS_TATICOS) - 1):
+        depois = ((sorteios > acumuladas[:, g]).astype(np.float32) @ pesos).astype(np.int64)
+        contagens_por_grupo.append(anterior - depois)
+        anterior = depois
+    contagens_por_grupo.append(anterior)
+
+    scores = _scores_das_contagens(contagens_por_grupo, totais)
+    melhores = scores == scores.min(axis=1, keepdims=True)
+    prob_melhor = (melhores / melhores.sum(axis=1, keepdims=True)).mean(axis=0)
+
+    return {
+        nome: {
+            'score_esperado': round(float(scores[:, t].mean()), 2),
+            'desvio_padrao': round(float(scores[:, t].std()), 2),
+            'prob_melhor': round(float(prob_melhor[t]), 4),
+        }
+        for t, nome in enumerate(nomes)
+    }
+
+# ==============================================================================
+# MELHOR ONZE POR TÁTICA
+# ==============================================================================
+#
+# Com mais jogadores de linha do que a tática usa, avaliar o elenco inteiro
+# sempre penaliza o total e infla as contagens. Cada tática passa a ser avaliada
+# com os titulares que melhor cumprem suas cotas.
+#
+# Dentro de um grupo vale sempre escalar os de maior confiança, então só importa
+# QUANTOS de cada grupo entram: programação dinâmica sobre os grupos, com estado
+# = jogadores já escolhidos. Minimiza o score da tática e, no empate, maximiza a
+# confiança somada. O custo (grupos x 11 x 11 por tática) não depende do elenco.
+
+def _quantidades_otimas(t, confiancas_por_grupo, alvo):
+    """ Quantidade por grupo e score do melhor onze da tática de índice t. """
+    penalidades = _tabela_penalidades(alvo)[t].tolist()
+    # melhor[s] = (score, -confiança, quantidades) com s jogadores escolhidos.
+    melhor = {0: (0, 0.0, ())}
+    for g, confiancas in enumerate(confiancas_por_grupo):
+        acumulada = [0.0] + list(np.cumsum(confiancas))
+        proximo = {}
+        for escolhidos, (score, confianca, quantidades) in melhor.items():
+            for k in range(min(len(confiancas), alvo - escolhidos) + 1):
+                candidato = (score + penalidades[g][k], confianca - acumulada[k], quantidades + (k,))
+                atual = proximo.get(escolhidos + k)
+                if atual is None or candidato[:2] < atual[:2]:
+                    proximo[escolhidos + k] = candidato
+        melhor = proximo
+    score, _, quantidades = melhor[alvo]
+    return score + 10 * abs(alvo - int(_REQUISITOS_VETORIZADOS[1][t])), quantidades
+
+def selecionar_melhores_xi(grupos, confiancas):
+    """
+    Recebe o grupo tático e a confiança do modelo de cada jogador de linha e
+    retorna, por tática, {'score', 'contagem_grupos', 'indices'} do melhor onze
+    (indices aponta para as listas de entrada). Jogadores em 'Outro' (sem
+    classificação) não são escalados.
+    """
+    indices_por_grupo = [[] for _ in GRUPOS_TATICOS]
+    for i, grupo in enumerate(grupos):
+        if grupo in GRUPOS_TATICOS and grupo != 'Outro':
+            indices_por_grupo[GRUPOS_TATICOS.index(grupo)].append(i)
+    for indices in indices_por_grupo:
+        indices.sort(key=lambda i: -confiancas[i])
+    confiancas_por_grupo = [[confiancas[i] for i in indices] for indices in indices_por_grupo]
+    disponiveis = sum(len(indices) for indices in indices_por_grupo)
+
+    resultado = {}
+    for t, nome in enumerate(_REQUISITOS_VETORIZADOS[0]):
+        alvo = min(REQUISITOS_TATICAS[nome]['total_jogadores_linha'], disponiveis)
+        score, quantidades = _quantidades_otimas(t, confiancas_por_grupo, alvo)
+        resultado[nome] = {
+            'score': score,
+            'contagem_grupos': {GRUPOS_TATICOS[g]: k for g, k in enumerate(quantidades) if k},
+            'indices': [i for g, k in enumerate(quantidades) for i in indices_por_grupo[g][:k]],
+        }
+    return resultado
+
+def _confiancas(probabilidades):
+    """ Probabilidade da posição escolhida; 0 para jogadores que não puderam ser classificados. """
+    if len(probabilidades) == 0:
+        return []
+    validas = ~np.isnan(probabilidades).any(axis=1)
+    return np.where(validas, np.nan_to_num(probabilidades).max(axis=1), 0.0).tolist()
+
+def _onzes_do_elenco(nomes, grupos, confiancas):
+    """
+    Com mais de 10 jogadores de linha retorna o melhor onze de cada tática, com
+    os nomes dos titulares em 'titulares'; com até 10, None (a tática é avaliada
+    com o elenco inteiro, como antes).
+    """
+    if len(grupos) <= 10:
+        return None
+    melhores_xi = selecionar_melhores_xi(grupos, confiancas)
+    for xi in melhores_xi.values():
+        xi['titulares'] = [nomes[i] for i in xi['indices']]
+    return melhores_xi
+
+def _contagens_por_tatica(melhores_xi):
+    return {nome: xi['contagem_grupos'] for nome, xi in melhores_xi.items()} if melhores_xi else None
+
+def _mascaras_titulares(melhores_xi, n_jogadores):
+    mascaras = np.zeros((len(REQUISITOS_TATICAS), n_jogadores), dtype=bool)
+    for t, nome in enumerate(_REQUISITOS_VETORIZADOS[0]):
+        mascaras[t, melhores_xi[nome]['indices']] = True
+    return mascaras
+
 # ==============================================================================
 # FUNÇÃO PRINCIPAL
 # ==============================================================================
 
-def recomendar_formacao_com_ia(lista_jogadores, model, scaler):
+def recomendar_formacao_com_ia(lista_jogadores, model, scaler, amostras_robustez=0):
     """
     Recebe uma lista de jogadores, usa um modelo de IA para prever posições,
     e retorna sugestões de tática E a lista de jogadores com posições sugeridas.
+    Com `amostras_robustez` > 0 inclui 'robustez' (ver avaliar_robustez_taticas).
     """
     jogadores_de_linha = [p for p in lista_jogadores if not p.get('goleiro', False)]
     
     logging.info(f"Total de jogadores de linha recebidos: {len(jogadores_de_linha)}")
 
-    jogadores_com_posicao = []
-
     if len(jogadores_de_linha) == 0:
         logging.warning("Nenhum jogador de linha encontrado para classificação de IA.")
         return {
@@ -178,41 +452,20 @@ def recomendar_formacao_com_ia(lista_jogadores, model, scaler):
             'jogadores_classificados': []
         }
 
-    nomes_features_treino = [
-        'weight', 'height', 'wh', 'movement', 'finishing_acc', 'skills', 'defensive_rating'
-    ]
-
-    for jogador in jogadores_de_linha:
-        altura = jogador['altura']
-        peso = jogador['peso']
-        wh = (peso + altura) / 2.0
-        
-        try:
-            jogador_df = pd.DataFrame([[
-                peso, altura, wh,
-                jogador['velocidade'], jogador['chute'], jogador['passe'], jogador['defesa']
-            ]], columns=nomes_features_treino)
-            
-            probabilidades = _predict_player_positions(jogador_df, scaler, model)
-            melhor_posicao_prevista = max(probabilidades, key=probabilidades.get)
-            grupo_principal = _mapear_posicao_para_grupo(melhor_posicao_prevista)
-        except Exception as e:
-            logging.error(f"Erro ao classificar jogador {jogador.get('nome', 'desconhecido')}: {e}")
-            melhor_posicao_prevista = 'Sem Sugestão (Erro AI)'
-            grupo_principal = 'Outro'
-        
-        jogadores_com_posicao.append({
-            'nome': jogador['nome'],
-            'posicao_sugerida': melhor_posicao_prevista,
-            'grupo_tatico': grupo_principal
-        })
-        logging.info(f"Jogador: {jogador['nome']}, Posição AI: {melhor_posicao_prevista}, Grupo Tático: {grupo_principal}")
-
+    jogadores_com_posicao, probabilidades = _classificar_jogadores(jogadores_de_linha, model, scaler)
 
     contagem_grupos = Counter([p['grupo_tatico'] for p in jogadores_com_posicao])
     logging.info(f"Contagem final de grupos táticos: {contagem_grupos}")
     
-    sugestoes_taticas = _sugerir_taticas_por_fit(contagem_grupos)
+    melhores_xi = _onzes_do_elenco(
+        [p['nome'] for p in jogadores_com_posicao],
+        [p['grupo_tatico'] for p in jogadores_com_posicao],
+        _confiancas(probabilidades),
+    )
+    sugestoes_taticas = _sugerir_taticas_por_fit(contagem_grupos, contagens_por_tatica=_contagens_por_tatica(melhores_xi))
+    if melhores_xi:
+        for nome, sugestao in sugestoes_taticas.items():
+            sugestao['titulares'] = melhores_xi[nome]['titulares']
     
     formacao_sugerida_principal = None
     if sugestoes_taticas:
@@ -224,6 +477,14 @@ def recomendar_formacao_com_ia(lista_jogadores, model, scaler):
         'jogadores_classificados': jogadores_com_posicao,
         'formacao_sugerida_principal': formacao_sugerida_principal
     }
+    if melhores_xi:
+        response_data['melhores_xi'] = {
+            nome: {chave: xi[chave] for chave in ('score', 'contagem_grupos', 'titulares')}
+            for nome, xi in melhores_xi.items()
+        }
+    if amostras_robustez:
+        mascaras = _mascaras_titulares(melhores_xi, len(jogadores_de_linha)) if melhores_xi else None
+        response_data['robustez'] = avaliar_robustez_taticas(probabilidades, amostras_robustez, mascaras=mascaras)
 
     if len(jogadores_de_linha) < 10:
         logging.warning("Número insuficiente de jogadores de linha para uma sugestão de tática completa.")
@@ -246,4 +507,108 @@ def recomendar_formacao_com_ia(lista_jogadores, model, scaler):
             'message': 'Táticas sugeridas com base no seu elenco:'
         })
         
-    return response_data
\ No newline at end of file
+    return response_data
+
+# ==============================================================================
+# SIMULAÇÃO DE CENÁRIOS (WHAT-IF)
+# ==============================================================================
+
+def _ranking_taticas(group_counts, melhores_xi=None):
+    ranking = []
+    for tatic_name in REQUISITOS_TATICAS:
+        if melhores_xi:
+            score, _ = _avaliar_fit_tatica(tatic_name, melhores_xi[tatic_name]['contagem_grupos'])
+            ranking.append({'nome': tatic_name, 'score': score, 'titulares': melhores_xi[tatic_name]['titulares']})
+        else:
+            score, _ = _avaliar_fit_tatica(tatic_name, group_counts)
+            ranking.append({'nome': tatic_name, 'score': score})
+    ranking.sort(key=lambda x: x['score'])
+    return ranking
+
+def simular_cenarios(lista_jogadores, cenarios, model, scaler):
+    """
+    Avalia cenários hipotéticos sobre o elenco atual sem alterar o banco.
+
+    `lista_jogadores` são os jogadores atuais (com 'id'); cada cenário pode ter
+    'adicionar' (jogadores novos), 'remover' (ids) e 'editar' (dicts com 'id' e
+    os atributos alterados). O elenco atual é classificado uma vez e só os
+    jogadores adicionados/editados de todos os cenários são reclassificados,
+    numa única inferência em lote; as contagens de grupo de cada cenário são
+    derivadas das contagens do elenco atual. Com mais de 10 jogadores de linha,
+    cada tática é avaliada com o seu melhor onze (ver selecionar_melhores_xi).
+    """
+    jogadores_por_id = {p['id']: p for p in lista_jogadores}
+    jogadores_de_linha = [p for p in lista_jogadores if not p.get('goleiro', False)]
+    classificados_base, probabilidades_base = _classificar_jogadores(jogadores_de_linha, model, scaler)
+    grupo_por_id = {p['id']: c['grupo_tatico'] for p, c in zip(jogadores_de_linha, classificados_base)}
+    confianca_por_id = dict(zip(grupo_por_id, _confiancas(probabilidades_base)))
+    nome_por_id = {p['id']: p['nome'] for p in jogadores_de_linha}
+    contagem_base = Counter(grupo_por_id.values())
+
+    # Junta os jogadores afetados de todos os cenários para uma só inferência.
+    afetados = []
+    for indice, cenario in enumerate(cenarios):
+        for edicao in cenario.get('editar', []):
+            afetados.append((indice, edicao['id'], {**jogadores_por_id[edicao['id']], **edicao}))
+        for novo in cenario.get('adicionar', []):
+            afetados.append((indice, None, novo))
+    afetados_de_linha = [a for a in afetados if not a[2].get('goleiro', False)]
+    classificados_afetados, probabilidades_afetados = _classificar_jogadores([a[2] for a in afetados_de_linha], model, scaler)
+    classificacao_afetados = {id(a): c for a, c in zip(afetados_de_linha, classificados_afetados)}
+    confianca_afetados = {id(a): c for a, c in zip(afetados_de_linha, _confiancas(probabilidades_afetados))}
+
+    xi_base = _onzes_do_elenco(list(nome_por_id.values()), list(grupo_por_id.values()), list(confianca_por_id.values()))
+    ranking_base = _ranking_taticas(contagem_base, xi_base)
+    score_base = {t['nome']: t['score'] for t in ranking_base}
+
+    resultados = []
+    for indice, cenario in enumerate(cenarios):
+        contagem = Counter(contagem_base)
+        fora = set(cenario.get('remover', []))
+        for jogador_id in fora:
+            if jogador_id in grupo_por_id:
+                contagem[grupo_por_id[jogador_id]] -= 1
+
+        jogadores_alterados = []
+        escalaveis = []
+        for afetado in afetados:
+            if afetado[0] != indice:
+                continue
+            _, jogador_id, jogador = afetado
+            fora.add(jogador_id)
+            if jogador_id in grupo_por_id:
+                contagem[grupo_por_id[jogador_id]] -= 1
+            classificacao = classificacao_afetados.get(id(afetado))
+            if classificacao is not None:
+                contagem[classificacao['grupo_tatico']] += 1
+                jogadores_alterados.append({'id': jogador_id, **classificacao})
+                escalaveis.append((classificacao['nome'], classificacao['grupo_tatico'], confianca_afetados[id(afetado)]))
+        contagem = +contagem
+
+        escalaveis += [
+            (nome_por_id[jogador_id], grupo, confianca_por_id[jogador_id])
+            for jogador_id, grupo in grupo_por_id.items() if jogador_id not in fora
+        ]
+        melhores_xi = _onzes_do_elenco(*zip(*escalaveis)) if escalaveis else None
+
+        ranking = _ranking_taticas(contagem, melhores_xi)
+        for tatica in ranking:
+            tatica['variacao'] = tatica['score'] - score_base[tatica['nome']]
+        resultados.append({
+            'nome': cenario.get('nome') or f"Cenário {indice + 1}",
+            'contagem_grupos': dict(contagem),
+            'total_jogadores_linha': sum(contagem.values()),
+            'sugestoes': _sugerir_taticas_por_fit(contagem, contagens_por_tatica=_contagens_por_tatica(melhores_xi)),
+            'ranking': ranking,
+            'jogadores_alterados': jogadores_alterados,
+        })
+
+    return {
+        'base': {
+            'contagem_grupos': dict(contagem_base),
+            'total_jogadores_linha': sum(contagem_base.values()),
+            'sugestoes': _sugerir_taticas_por_fit(contagem_base, contagens_por_tatica=_contagens_por_tatica(xi_base)),
+            'ranking': ranking_base,
+        },
+        'cenarios': resultados,
+    }
@@ -0,0 +1,161 @@
+import gc
+import logging
+import threading
+
+import joblib
+import numpy as np
+from django.conf import settings
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ==============================================================================
+# FORMATOS DE MODELO
+# ==============================================================================
+#
+# IA_MODELO_PATH decide o formato pela extensão:
+#     .h5 / .keras  modelo Keras (o v12 original)
+#     .npz          MLP destilado, executado com NumPy (deep_learning_model/distill_model.py)
+#     .joblib       classificador do scikit-learn destilado (idem)
+# Todos expõem predict_on_batch(X) -> matriz (n, len(POSICOES_MODELO)).
+
+EXTENSOES_KERAS = ('.h5', '.keras')
+
+_ATIVACOES = {
+    'elu': lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-np.clip(x, -60, 60))),
+    'linear': lambda x: x,
+}
+
+
+class ModeloMLPNumpy:
+    """ MLP denso salvo em .npz (pesos W0, b0, ... e o nome de cada ativação). """
+
+    def __init__(self, camadas, ativacoes):
+        self.camadas = camadas
+        self.ativacoes = [_ATIVACOES[nome] for nome in ativacoes]
+
+    @classmethod
+    def carregar(cls, caminho):
+        with np.load(caminho) as dados:
+            n_camadas = int(dados['n_camadas'])
+            camadas = [(dados[f'W{i}'], dados[f'b{i}']) for i in range(n_camadas)]
+            ativacoes = [str(nome) for nome in dados['ativacoes']]
+        return cls(camadas, ativacoes)
+
+    def predict_on_batch(self, X):
+        saida = np.asarray(X, dtype=np.float32)
+        for (W, b), ativacao in zip(self.camadas, self.ativacoes):
+            saida = ativacao(saida @ W + b)
+        return saida
+
+
+class ModeloSklearn:
+    """ Classificador do scikit-learn treinado com os índices de POSICOES_MODELO como classes. """
+
+    def __init__(self, estimador, n_classes):
+        self.estimador = estimador
+        self.n_classes = n_classes
+
+    def predict_on_batch(self, X):
+        # Classes que não apareceram no treino ficam com probabilidade 0.
+        probabilidades = np.zeros((len(X), self.n_classes))
+        probabilidades[:, self.estimador.classes_] = self.estimador.predict_proba(X)
+        return probabilidades
+
+
+def usa_keras():
+    return settings.IA_MODELO_PATH.suffix in EXTENSOES_KERAS
+
+
+def carregar_modelo(caminho):
+    if caminho.suffix in EXTENSOES_KERAS:
+        from tensorflow.keras.models import load_model
+        return load_model(caminho)
+    if caminho.suffix == '.npz':
+        return ModeloMLPNumpy.carregar(caminho)
+    if caminho.suffix == '.joblib':
+        from .ia_features import POSICOES_MODELO
+        return ModeloSklearn(joblib.load(caminho), len(POSICOES_MODELO))
+    raise ValueError(f"Formato de modelo não suportado: '{caminho.suffix}'.")
+
+# ==============================================================================
+# MODELO DE IA E SCALER COMPARTILHADOS PELAS VIEWS
+# ==============================================================================
+#
+# Uma única cópia por processo, carregada sob demanda. No gunicorn com
+# preload_app (ver gunicorn.conf.py) o master importa o TensorFlow e carrega
+# o scaler antes do fork, mas NÃO um modelo Keras: o runtime do TensorFlow
+# inicializado no master não sobrevive ao fork (o worker trava no primeiro
+# predict). Cada worker monta o modelo em post_worker_init. Modelos destilados
+# (.npz/.joblib) são só arrays e são carregados no master.
+
+_modelo = None
+_scaler = None
+_falhou = False
+_lock = threading.Lock()
+
+
+def _carregar_scaler():
+    global _scaler
+    if _scaler is None:
+        _scaler = joblib.load(settings.IA_SCALER_PATH)
+    return _scaler
+
+
+def obter_modelo_ia():
+    """ Retorna (modelo, scaler) do processo; (None, None) se o carregamento falhou. """
+    global _modelo, _falhou
+    if _modelo is None and not _falhou:
+        with _lock:
+            if _modelo is None and not _falhou:
+                try:
+                    _carregar_scaler()
+                    _modelo = carregar_modelo(settings.IA_MODELO_PATH)
+                    logging.info(f"✅ Modelo de IA '{settings.IA_MODELO_PATH.name}' e Scaler carregados com sucesso.")
+                except Exception as e:
+                    _falhou = True
+                    logging.error(f"❌ ERRO ao carregar modelo de IA e Scaler: {e}")
+    if _modelo is None:
+        return None, None
+    return _modelo, _scaler
+
+
+def configurar_threads(intra_op, inter_op=1):
+    """ Limita as threads do TensorFlow; precisa rodar antes da primeira operação do TF no processo. """
+    if not usa_keras():
+        return
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+    except RuntimeError as e:
+        logging.warning(f"Não foi possível limitar as threads do TensorFlow (runtime já iniciado): {e}")
+
+
+def preparar_para_fork():
+    """
+    Executado no master do gunicorn: importa o que é caro e somente leitura
+    (TensorFlow/Keras, views, scaler e, se não for Keras, o próprio modelo) para
+    que as páginas sejam compartilhadas por copy-on-write, e congela o GC para
+    não sujar essas páginas depois.
+    """
+    import core.urls  # noqa: F401  (importa as views e suas dependências)
+    if usa_keras():
+        import tensorflow.keras.models  # noqa: F401
+        try:
+            _carregar_scaler()
+        except Exception as e:
+            logging.error(f"❌ ERRO ao pré-carregar o Scaler: {e}")
+    else:
+        obter_modelo_ia()
+    gc.collect()
+    gc.freeze()
+
+
+def reiniciar_apos_fork():
+    """ Estado que não pode ser herdado do master: lock e sementes aleatórias. """
+    global _lock
+    _lock = threading.Lock()
+    import numpy as np
+    np.random.seed()
@@ -0,0 +1,106 @@
+import json
+import logging
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ==============================================================================
+# LISTAGENS A PARTIR DE .values_list()
+# ==============================================================================
+#
+# As listagens de jogadores, elencos e formações passavam por uma instância de
+# modelo e pela chamada de to_representation de cada campo do ModelSerializer
+# para cada linha. Aqui o mapeamento campo do serializer -> coluna do banco é
+# calculado uma vez por classe de serializer e cada linha vira um dict direto
+# da tupla do banco. A saída é a mesma do serializer: os campos suportados são
+# os que o serializer devolveria sem conversão (inteiros, textos, booleanos,
+# choices, JSON e chaves estrangeiras como pk). Um serializer com outro tipo de
+# campo, sem conversor, continua no caminho normal do DRF.
+
+_CAMPOS_DIRETOS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.JSONField,
+)
+
+
+def decodificar_json(valor):
+    """ posicoes de Formacao: guardadas como lista ou como texto JSON. """
+    try:
+        return json.loads(valor) if isinstance(valor, str) else valor
+    except (json.JSONDecodeError, TypeError):
+        return []
+
+
+_mapeamentos = {}
+
+
+def mapeamento_listagem(serializer_class, conversores):
+    """
+    Lista de (nome na resposta, coluna em .values_list, conversor ou None) na
+    ordem dos campos do serializer, ou None se algum campo não for suportado.
+    """
+    chave = (serializer_class, tuple(sorted(conversores)))
+    if chave in _mapeamentos:
+        return _mapeamentos[chave]
+
+    modelo = serializer_class.Meta.model
+    mapeamento = []
+    for nome, campo in serializer_class().fields.items():
+        if campo.write_only:
+            continue
+        if nome in conversores:
+            mapeamento.append((nome, nome, conversores[nome]))
+            continue
+        if isinstance(campo, serializers.PrimaryKeyRelatedField) and not campo.pk_field:
+            # 'elenco' vira a coluna elenco_id, sem buscar o Elenco.
+            mapeamento.append((nome, modelo._meta.get_field(campo.source).attname, None))
+            continue
+        if isinstance(campo, _CAMPOS_DIRETOS) and '.' not in campo.source and campo.source != '*':
+            mapeamento.append((nome, campo.source, None))
+            continue
+        logging.info(f"Listagem rápida desativada para {serializer_class.__name__}: campo '{nome}' não suportado.")
+        mapeamento = None
+        break
+
+    _mapeamentos[chave] = mapeamento
+    return mapeamento
+
+
+def colunas_listagem(queryset, mapeamento):
+    return queryset.values_list(*[coluna for _, coluna, _ in mapeamento])
+
+
+def montar_linhas(tuplas, mapeamento):
+    """ Dicts da resposta a partir das tuplas de colunas_listagem. """
+    nomes = [nome for nome, _, _ in mapeamento]
+    linhas = [dict(zip(nomes, tupla)) for tupla in tuplas]
+    for nome, _, conversor in mapeamento:
+        if conversor is not None:
+            for linha in linhas:
+                linha[nome] = conversor(linha[nome])
+    return linhas
+
+
+class ListagemRapidaMixin:
+    """
+    `list()` de ViewSet montado a partir de .values_list(), com filtros e
+    paginação normais. `conversores_listagem` trata campos que o serializer
+    calcula (ex.: SerializerMethodField).
+    """
+    conversores_listagem = {}
+
+    def list(self, request, *args, **kwargs):
+        mapeamento = mapeamento_listagem(self.get_serializer_class(), self.conversores_listagem)
+        if mapeamento is None:
+            return super().list(request, *args, **kwargs)
+
+        tuplas = colunas_listagem(self.filter_queryset(self.get_queryset()), mapeamento)
+        pagina = self.paginate_queryset(tuplas)
+        if pagina is not None:
+            return self.get_paginated_response(montar_linhas(pagina, mapeamento))
+        return Response(montar_linhas(tuplas, mapeamento))
@@ -0,0 +1,171 @@
+import time
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from api.estatisticas import estatisticas_de_elencos_novos
+from api.models import Elenco, EstatisticasElenco, Jogador, User
+
+# Elenco-modelo de 25 jogadores; elencos de outro tamanho sorteiam as posições
+# nas mesmas proporções. Perfil por posição: médias de velocidade, chute, passe,
+# defesa (escala 1-10), altura média em cm e chance de ser canhoto.
+PERFIS_POSICAO = {
+    'Goleiro':          {'vagas': 3, 'atributos': (4, 3, 5, 2), 'altura': 190, 'canhoto': 0.15},
+    'Zagueiro':         {'vagas': 4, 'atributos': (5, 4, 6, 8), 'altura': 187, 'canhoto': 0.20},
+    'Lateral Direito':  {'vagas': 2, 'atributos': (8, 5, 7, 7), 'altura': 177, 'canhoto': 0.05},
+    'Lateral Esquerdo': {'vagas': 2, 'atributos': (8, 5, 7, 7), 'altura': 177, 'canhoto': 0.85},
+    'Volante':          {'vagas': 3, 'atributos': (6, 6, 7, 8), 'altura': 182, 'canhoto': 0.20},
+    'Meia Central':     {'vagas': 3, 'atributos': (6, 7, 8, 5), 'altura': 178, 'canhoto': 0.25},
+    'Meia Ofensivo':    {'vagas': 2, 'atributos': (7, 8, 9, 4), 'altura': 176, 'canhoto': 0.30},
+    'Ponta Direita':    {'vagas': 2, 'atributos': (9, 7, 7, 3), 'altura': 174, 'canhoto': 0.45},
+    'Ponta Esquerda':   {'vagas': 2, 'atributos': (9, 7, 7, 3), 'altura': 174, 'canhoto': 0.45},
+    'Centroavante':     {'vagas': 2, 'atributos': (7, 9, 6, 3), 'altura': 184, 'canhoto': 0.20},
+}
+POSICOES = list(PERFIS_POSICAO)
+VAGAS = np.array([perfil['vagas'] for perfil in PERFIS_POSICAO.values()])
+MEDIAS_ATRIBUTOS = np.array([perfil['atributos'] for perfil in PERFIS_POSICAO.values()], dtype=float)
+MEDIAS_ALTURA = np.array([perfil['altura'] for perfil in PERFIS_POSICAO.values()], dtype=float)
+CHANCE_CANHOTO = np.array([perfil['canhoto'] for perfil in PERFIS_POSICAO.values()])
+INDICE_GOLEIRO = POSICOES.index('Goleiro')
+
+PRIMEIROS_NOMES = [
+    'Gabriel', 'Lucas', 'Matheus', 'Pedro', 'Rafael', 'Bruno', 'Thiago', 'Felipe', 'Gustavo', 'Diego',
+    'João', 'André', 'Vinícius', 'Rodrigo', 'Carlos', 'Luis', 'Marco', 'Daniel', 'Samuel', 'Eduardo',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira', 'Almeida', 'Rodrigues',
+    'Gomes', 'Martins', 'Araújo', 'Barbosa', 'Ribeiro', 'Carvalho', 'Rocha', 'Mendes', 'Nunes', 'Moreira',
+]
+NACIONALIDADES = ['Brasil', 'Argentina', 'Uruguai', 'Colômbia', 'Portugal', 'Espanha', 'França', 'Paraguai', 'Chile', None]
+PESOS_NACIONALIDADES = np.array([0.55, 0.1, 0.06, 0.05, 0.05, 0.04, 0.04, 0.04, 0.03, 0.04])
+
+
+def sortear_jogadores(rng, elenco_ids, por_elenco):
+    """ Campos dos jogadores de vários elencos, gerados de uma vez com NumPy. """
+    total = len(elenco_ids) * por_elenco
+
+    # Posições: múltiplos do elenco-modelo e o resto sorteado nas mesmas proporções.
+    base = np.repeat(np.arange(len(POSICOES)), VAGAS)
+    modelo = np.concatenate([np.tile(base, por_elenco // len(base)),
+                             rng.choice(len(POSICOES), por_elenco % len(base), p=VAGAS / VAGAS.sum())])
+    posicoes = np.tile(modelo.astype(int), len(elenco_ids))
+
+    # Camisas distintas dentro de cada elenco (unique_together elenco/camisa).
+    numeros = max(99, por_elenco)
+    camisas = np.argsort(rng.random((len(elenco_ids), numeros)), axis=1)[:, :por_elenco].ravel() + 1
+
+    atributos = np.clip(np.rint(rng.normal(MEDIAS_ATRIBUTOS[posicoes], 1.3)), 1, 10).astype(int)
+    alturas = np.rint(rng.normal(MEDIAS_ALTURA[posicoes], 5.5)).astype(int)
+    # Peso pelo IMC (em torno de 23).
+    pesos = np.rint(rng.normal(23.0, 1.4, total) * (alturas / 100.0) ** 2).astype(int)
+    idades = np.clip(np.rint(rng.normal(26, 4.5, total)), 16, 40).astype(int)
+    canhotos = rng.random(total) < CHANCE_CANHOTO[posicoes]
+    nomes = rng.integers(0, len(PRIMEIROS_NOMES), total), rng.integers(0, len(SOBRENOMES), total)
+    nacionalidades = rng.choice(len(NACIONALIDADES), total, p=PESOS_NACIONALIDADES)
+
+    return [
+        Jogador(
+            elenco_id=elenco_id,
+            nome=f'{PRIMEIROS_NOMES[primeiro]} {SOBRENOMES[sobrenome]}',
+            posicao=POSICOES[posicao],
+            camisa=camisa,
+            idade=idade,
+            nacionalidade=NACIONALIDADES[nacionalidade],
+            velocidade=velocidade, chute=chute, passe=passe, defesa=defesa,
+            altura=altura,
+            peso=peso,
+            perna_boa='ESQ' if canhoto else 'DIR',
+            goleiro=posicao == INDICE_GOLEIRO,
+        )
+        for elenco_id, primeiro, sobrenome, posicao, camisa, idade, nacionalidade,
+            (velocidade, chute, passe, defesa), altura, peso, canhoto in zip(
+            np.repeat(elenco_ids, por_elenco).tolist(), nomes[0].tolist(), nomes[1].tolist(),
+            posicoes.tolist(), camisas.tolist(), idades.tolist(), nacionalidades.tolist(),
+            atributos.tolist(), alturas.tolist(), pesos.tolist(), canhotos.tolist(),
+        )
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera usuários, elencos e jogadores sintéticos (com distribuições de atributos "
+        "por posição) para testes de volume. Tudo é inserido com bulk_create em lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--elencos-por-usuario', type=int, default=1)
+        parser.add_argument('--jogadores-por-elenco', type=int, default=25)
+        parser.add_argument('--jogadores-por-transacao', type=int, default=50000,
+                            help="jogadores gravados em cada transação (com seus usuários e elencos)")
+        parser.add_argument('--lote', type=int, default=5000, help="batch_size dos bulk_create")
+        parser.add_argument('--senha', default='liga-sintetica', help="senha de todos os usuários gerados")
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        usuarios = options['usuarios']
+        elencos_por_usuario = options['elencos_por_usuario']
+        por_elenco = options['jogadores_por_elenco']
+        lote = options['lote']
+        if min(usuarios, elencos_por_usuario, por_elenco, lote) < 1:
+            raise CommandError("Quantidades e --lote devem ser maiores que zero.")
+
+        rng = np.random.default_rng(options['seed'])
+        # Um hash só para todos (o hasher padrão leva centenas de ms por senha).
+        senha = make_password(options['senha'])
+        # E-mails numerados a partir do maior id atual, para não colidir com execuções anteriores.
+        inicio_numeracao = (User.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+        usuarios_por_transacao = max(1, options['jogadores_por_transacao'] // (elencos_por_usuario * por_elenco))
+
+        contagens = {'usuarios': 0, 'elencos': 0, 'estatisticas': 0, 'jogadores': 0}
+        inicio = time.perf_counter()
+        for primeiro in range(0, usuarios, usuarios_por_transacao):
+            quantidade = min(usuarios_por_transacao, usuarios - primeiro)
+            numeros = range(inicio_numeracao + primeiro, inicio_numeracao + primeiro + quantidade)
+            with transaction.atomic():
+                criados = User.objects.bulk_create([
+                    User(
+                        email=f'tecnico{numero}@liga-sintetica.local',
+                        password=senha,
+                        first_name=PRIMEIROS_NOMES[numero % len(PRIMEIROS_NOMES)],
+                        last_name=SOBRENOMES[numero * 7 % len(SOBRENOMES)],
+                    )
+                    for numero in numeros
+                ], batch_size=lote)
+                elencos = Elenco.objects.bulk_create([
+                    Elenco(tecnico_id=usuario.pk, nome_elenco=f'{usuario.first_name} FC {n + 1}' if n else f'{usuario.first_name} FC')
+                    for usuario in criados for n in range(elencos_por_usuario)
+                ], batch_size=lote)
+                elenco_ids = [elenco.pk for elenco in elencos]
+                jogadores = Jogador.objects.bulk_create(
+                    sortear_jogadores(rng, elenco_ids, por_elenco), batch_size=lote, atualizar_estatisticas=False
+                )
+                # bulk_create não dispara o post_save que cria os agregados: eles
+                # são somados em memória e gravados de uma vez.
+                estatisticas = EstatisticasElenco.objects.bulk_create(
+                    estatisticas_de_elencos_novos(elenco_ids, jogadores), batch_size=lote
+                )
+
+            contagens['usuarios'] += len(criados)
+            contagens['elencos'] += len(elencos)
+            contagens['estatisticas'] += len(estatisticas)
+            contagens['jogadores'] += len(jogadores)
+            decorrido = time.perf_counter() - inicio
+            self.stdout.write(
+                f"  {contagens['usuarios']}/{usuarios} usuários, {contagens['jogadores']} jogadores "
+                f"({sum(contagens.values()) / decorrido:,.0f} linhas/s)"
+            )
+
+        duracao = time.perf_counter() - inicio
+        linhas = sum(contagens.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{contagens['usuarios']} usuários, {contagens['elencos']} elencos e {contagens['jogadores']} jogadores "
+            f"gerados em {duracao:.1f}s ({linhas / duracao:,.0f} linhas/s, "
+            f"{contagens['jogadores'] / duracao:,.0f} jogadores/s)."
+        ))
+        self.stdout.write(
+            "O índice de scouting não é atualizado por bulk_create: rode reconstruir_indice_scouting."
+        )
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.estatisticas import recalcular_estatisticas
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero os agregados (EstatisticasElenco) de todos os elencos ou dos informados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('elencos', nargs='*', type=int, help="IDs dos elencos (padrão: todos)")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total = recalcular_estatisticas(options['elencos'] or None)
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"Estatísticas de {total} elencos recalculadas ({duracao:.2f}s)."))
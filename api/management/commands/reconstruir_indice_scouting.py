@@ -0,0 +1,20 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.scouting import IndiceScouting
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a partir do banco o índice de scouting e o salva em SCOUTING_INDEX_PATH."
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        indice = IndiceScouting(caminho=settings.SCOUTING_INDEX_PATH)
+        indice.construir_do_banco()
+        indice.salvar()
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice com {len(indice)} jogadores salvo em {settings.SCOUTING_INDEX_PATH} ({duracao:.2f}s)."
+        ))
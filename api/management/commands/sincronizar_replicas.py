@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.replicas import aliases_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco principal (SQLite) para as réplicas locais de DJANGO_DB_REPLICAS "
+        "com a API de backup do SQLite, sem parar leitores nem escritores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help="repete a cada N segundos (padrão: sincroniza uma vez)")
+        parser.add_argument('--paginas', type=int, default=-1,
+                            help="páginas copiadas por passo; -1 copia tudo num passo só")
+
+    def handle(self, *args, **options):
+        principal = settings.DATABASES['default']
+        if principal['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("sincronizar_replicas só copia bancos SQLite.")
+        replicas = aliases_replicas()
+        if not replicas:
+            raise CommandError("Nenhuma réplica configurada (DJANGO_DB_REPLICAS).")
+
+        while True:
+            for alias in replicas:
+                self.sincronizar(str(principal['NAME']), str(settings.DATABASES[alias]['NAME']), alias, options['paginas'])
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def sincronizar(self, origem, destino, alias, paginas):
+        # O backup escreve no próprio arquivo da réplica, com o lock do SQLite:
+        # conexões já abertas nela (CONN_MAX_AGE) enxergam os dados novos.
+        inicio = time.perf_counter()
+        fonte = sqlite3.connect(origem)
+        alvo = sqlite3.connect(destino, timeout=20)
+        try:
+            fonte.backup(alvo, pages=paginas)
+            tamanho = alvo.execute('PRAGMA page_count').fetchone()[0] * alvo.execute('PRAGMA page_size').fetchone()[0]
+        finally:
+            alvo.close()
+            fonte.close()
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{alias}: {destino} sincronizada ({tamanho / 1024 / 1024:.1f} MB, {duracao:.2f}s)."
+        ))
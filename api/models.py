@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -33,6 +33,40 @@ class Elenco(models.Model):
     def __str__(self):
         return self.nome_elenco
 
+class JogadorQuerySet(models.QuerySet):
+    """
+    Operações em massa não disparam sinais por objeto; estas sobrescritas mantêm
+    as estatísticas dos elencos afetados em dia (ver api/estatisticas.py).
+    bulk_create(..., atualizar_estatisticas=False) é para quem grava os agregados
+    por conta própria (ex.: o comando gerar_liga_sintetica).
+    """
+
+    def bulk_create(self, objs, *args, atualizar_estatisticas=True, **kwargs):
+        from .estatisticas import somar_jogadores_criados
+        with transaction.atomic(using=self.db):
+            criados = super().bulk_create(objs, *args, **kwargs)
+            if not atualizar_estatisticas:
+                return criados
+            if not kwargs.get('ignore_conflicts') and not kwargs.get('update_conflicts'):
+                somar_jogadores_criados(criados)
+            else:
+                from .estatisticas import recalcular_estatisticas
+                recalcular_estatisticas({j.elenco_id for j in criados})
+        return criados
+
+    def update(self, **kwargs):
+        # bulk_update também passa por aqui, em lotes.
+        from .estatisticas import recalcular_estatisticas
+        with transaction.atomic(using=self.db):
+            elencos = set(self.values_list('elenco_id', flat=True).distinct())
+            muda_elenco = 'elenco' in kwargs or 'elenco_id' in kwargs
+            pks = list(self.values_list('pk', flat=True)) if muda_elenco else None
+            linhas = super().update(**kwargs)
+            if muda_elenco:
+                elencos |= set(self.model.objects.filter(pk__in=pks).values_list('elenco_id', flat=True).distinct())
+            recalcular_estatisticas(elencos)
+        return linhas
+
 class Jogador(models.Model):
     elenco = models.ForeignKey(Elenco, related_name='jogadores', on_delete=models.CASCADE)
     nome = models.CharField(max_length=100)
@@ -50,6 +84,8 @@ class Jogador(models.Model):
     peso = models.IntegerField(default=75, help_text="Peso em kg")
     perna_boa = models.CharField(max_length=3, choices=[('DIR', 'Direita'), ('ESQ', 'Esquerda')], default='DIR')
     goleiro = models.BooleanField(default=False)
+
+    objects = JogadorQuerySet.as_manager()
     
     class Meta:
         unique_together = ('elenco', 'camisa')
@@ -57,6 +93,41 @@ class Jogador(models.Model):
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        # O post_save aplica a alteração em EstatisticasElenco: a linha do jogador
+        # e os agregados são gravados na mesma transação (o delete já é atômico).
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Jogador, instance=self)):
+            super().save(*args, **kwargs)
+
+class EstatisticasElenco(models.Model):
+    """ Agregados do elenco mantidos incrementalmente a cada alteração de Jogador. """
+    elenco = models.OneToOneField(Elenco, related_name='estatisticas', on_delete=models.CASCADE)
+    total_jogadores = models.IntegerField(default=0)
+    total_goleiros = models.IntegerField(default=0)
+    perna_direita = models.IntegerField(default=0)
+    perna_esquerda = models.IntegerField(default=0)
+
+    soma_velocidade = models.IntegerField(default=0)
+    soma_chute = models.IntegerField(default=0)
+    soma_passe = models.IntegerField(default=0)
+    soma_defesa = models.IntegerField(default=0)
+    soma_altura = models.IntegerField(default=0)
+    soma_peso = models.IntegerField(default=0)
+    soma_idade = models.IntegerField(default=0)
+
+    contagem_posicoes = models.JSONField(default=dict)
+    contagem_grupos = models.JSONField(
+        default=dict,
+        help_text=(
+            "Apenas jogadores de linha, agrupados pela posição cadastrada pelo técnico "
+            "(mapear_posicao_cadastrada_para_grupo), não pelo grupo que a IA atribui: "
+            "não substitui a classificação feita pelas views de tática."
+        ),
+    )
+
+    def __str__(self):
+        return f"Estatísticas de {self.elenco}"
+
 class Formacao(models.Model):
     nome = models.CharField(max_length=100, unique=True)
     estilo = models.CharField(max_length=100)
@@ -0,0 +1,213 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ==============================================================================
+# PERFILAMENTO SOB DEMANDA DE REQUISIÇÕES
+# ==============================================================================
+#
+# Com PERFILAMENTO_ATIVO, uma requisição é perfilada quando traz o cabeçalho
+# X-Perfilar: 1 com um token de staff, ou quando cai na amostragem
+# (PERFILAMENTO_AMOSTRAGEM). O perfil (cProfile) e as alocações feitas durante
+# a requisição (tracemalloc) vão para PERFILAMENTO_DIR, que guarda só os
+# PERFILAMENTO_MAXIMO mais recentes. A resposta perfilada traz X-Perfil-Id.
+# Desativado, o middleware nem entra na pilha (MiddlewareNotUsed).
+#
+# O cProfile só vê a thread da requisição, mas o tracemalloc rastreia todas as
+# threads do processo e não registra qual delas alocou: o pico e as alocações
+# incluem as requisições concorrentes do mesmo worker. Por isso esses campos
+# são gravados como 'pico_memoria_processo_kb' e 'alocacoes_processo'.
+
+CABECALHO = 'HTTP_X_PERFILAR'
+LINHAS_RESUMO = 40
+_ID_VALIDO = re.compile(r'^[0-9]+-[0-9]+$')
+
+# cProfile e tracemalloc valem para o processo todo: uma requisição por vez.
+_perfilando = threading.Lock()
+_autenticacao = JWTStatelessUserAuthentication()
+
+
+def diretorio_perfis():
+    return Path(settings.PERFILAMENTO_DIR)
+
+
+def _pedido_por_staff(request):
+    if request.META.get(CABECALHO) != '1':
+        return False
+    try:
+        autenticado = _autenticacao.authenticate(request)
+    except APIException:
+        return False
+    return autenticado is not None and autenticado[0].is_staff
+
+
+def _resumo_funcoes(perfil):
+    estatisticas = pstats.Stats(perfil)
+    linhas = sorted(estatisticas.stats.items(), key=lambda item: item[1][3], reverse=True)[:LINHAS_RESUMO]
+    return estatisticas.total_tt, [
+        {
+            'funcao': f"{arquivo}:{linha}({nome})",
+            'chamadas': chamadas,
+            'tempo_proprio_ms': round(tempo_proprio * 1000, 3),
+            'tempo_acumulado_ms': round(tempo_acumulado * 1000, 3),
+        }
+        for (arquivo, linha, nome), (_, chamadas, tempo_proprio, tempo_acumulado, _) in linhas
+    ]
+
+
+def _resumo_alocacoes(snapshot):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    return [
+        {
+            'local': f"{estatistica.traceback[0].filename}:{estatistica.traceback[0].lineno}",
+            'kb': round(estatistica.size / 1024, 1),
+            'blocos': estatistica.count,
+        }
+        for estatistica in snapshot.statistics('lineno')[:LINHAS_RESUMO]
+    ]
+
+
+def _perfis_por_data(diretorio):
+    """ .json do diretório, do mais antigo para o mais recente, sem os que outro
+    worker apagou (limpeza do anel) entre o glob e o stat. """
+    datas = []
+    for caminho in diretorio.glob('*.json'):
+        try:
+            datas.append((caminho.stat().st_mtime, caminho))
+        except FileNotFoundError:
+            continue
+    return [caminho for _, caminho in sorted(datas)]
+
+
+def _salvar(perfil_id, perfil, metadados):
+    diretorio = diretorio_perfis()
+    diretorio.mkdir(parents=True, exist_ok=True)
+    perfil.dump_stats(diretorio / f'{perfil_id}.prof')
+    temporario = diretorio / f'.{perfil_id}.json'
+    temporario.write_text(json.dumps(metadados, ensure_ascii=False))
+    os.replace(temporario, diretorio / f'{perfil_id}.json')
+
+    # Anel: descarta os mais antigos além do limite.
+    antigos = _perfis_por_data(diretorio)
+    for caminho in antigos[:-settings.PERFILAMENTO_MAXIMO]:
+        caminho.unlink(missing_ok=True)
+        caminho.with_suffix('.prof').unlink(missing_ok=True)
+
+
+class PerfilamentoMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILAMENTO_ATIVO', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.amostragem = settings.PERFILAMENTO_AMOSTRAGEM
+
+    def __call__(self, request):
+        if request.path.startswith('/api/perfis/'):
+            return self.get_response(request)
+        motivo = 'cabecalho' if _pedido_por_staff(request) else None
+        if motivo is None and self.amostragem and random.random() < self.amostragem:
+            motivo = 'amostragem'
+        if motivo is None or not _perfilando.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self._perfilar(request, motivo)
+        finally:
+            _perfilando.release()
+
+    def _perfilar(self, request, motivo):
+        iniciou_tracemalloc = not tracemalloc.is_tracing()
+        if iniciou_tracemalloc:
+            tracemalloc.start(settings.PERFILAMENTO_FRAMES_TRACEMALLOC)
+        tracemalloc.reset_peak()
+        perfil = cProfile.Profile()
+        inicio = time.perf_counter()
+        perfil.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            perfil.disable()
+            duracao = time.perf_counter() - inicio
+            # O que foi alocado (por qualquer thread) durante a requisição e ainda está vivo.
+            snapshot = tracemalloc.take_snapshot()
+            _, pico = tracemalloc.get_traced_memory()
+            if iniciou_tracemalloc:
+                tracemalloc.stop()
+
+        perfil_id = f'{time.time_ns()}-{os.getpid()}'
+        try:
+            tempo_perfilado, funcoes = _resumo_funcoes(perfil)
+            _salvar(perfil_id, perfil, {
+                'id': perfil_id,
+                'metodo': request.method,
+                'caminho': request.get_full_path(),
+                'status': response.status_code,
+                'motivo': motivo,
+                'inicio': time.time() - duracao,
+                'duracao_ms': round(duracao * 1000, 3),
+                'tempo_perfilado_ms': round(tempo_perfilado * 1000, 3),
+                'pico_memoria_processo_kb': round(pico / 1024, 1),
+                'funcoes': funcoes,
+                'alocacoes_processo': _resumo_alocacoes(snapshot),
+            })
+        except OSError:
+            logging.exception("Não foi possível salvar o perfil da requisição:")
+            return response
+
+        logging.info(f"Perfil {perfil_id} salvo ({request.method} {request.path}, {duracao * 1000:.1f} ms, {motivo}).")
+        response['X-Perfil-Id'] = perfil_id
+        return response
+
+# ==============================================================================
+# LEITURA DOS PERFIS SALVOS
+# ==============================================================================
+
+def listar_perfis():
+    """ Metadados dos perfis guardados, do mais recente para o mais antigo. """
+    diretorio = diretorio_perfis()
+    if not diretorio.exists():
+        return []
+    perfis = []
+    for caminho in reversed(_perfis_por_data(diretorio)):
+        try:
+            dados = json.loads(caminho.read_text())
+        except (OSError, ValueError):
+            continue
+        perfis.append({campo: dados.get(campo) for campo in (
+            'id', 'metodo', 'caminho', 'status', 'motivo', 'inicio', 'duracao_ms', 'pico_memoria_processo_kb'
+        )})
+    return perfis
+
+
+def caminho_perfil(perfil_id, extensao):
+    """ Caminho do arquivo do perfil, ou None se o id for inválido ou não existir. """
+    if not _ID_VALIDO.match(perfil_id):
+        return None
+    caminho = diretorio_perfis() / f'{perfil_id}.{extensao}'
+    return caminho if caminho.exists() else None
+
+
+def texto_pstats(perfil_id, ordenacao='cumulative', linhas=60):
+    """ Saída de pstats.print_stats, para leitura direta no navegador. """
+    saida = io.StringIO()
+    pstats.Stats(str(caminho_perfil(perfil_id, 'prof')), stream=saida).sort_stats(ordenacao).print_stats(linhas)
+    return saida.getvalue()
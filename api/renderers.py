@@ -0,0 +1,71 @@
+import logging
+import math
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ==============================================================================
+# RENDERIZADOR JSON COM ORJSON
+# ==============================================================================
+
+_encoder = encoders.JSONEncoder()
+_OPCOES_ORJSON = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+_SEPARADORES_JS = (b'\xe2\x80\xa8', b'\xe2\x80\xa9')
+
+
+def _tem_float_nao_finito(dados):
+    pendentes = [dados]
+    while pendentes:
+        valor = pendentes.pop()
+        if isinstance(valor, float):
+            if not math.isfinite(valor):
+                return True
+        elif isinstance(valor, dict):
+            pendentes.extend(valor.values())
+        elif isinstance(valor, (list, tuple)):
+            pendentes.extend(valor)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer do DRF com a serialização feita pelo orjson. Datas, Decimal,
+    textos traduzíveis etc. passam pelo mesmo encoder do DRF (o orjson não
+    formata datas por conta própria). A saída só difere da do JSONRenderer
+    compacto na escrita de floats: o orjson não usa a forma `e+NN`/`e-0N` do
+    Python (1e-05 sai como 0.00001, 1e+16 como 1e16, 2.5e-07 como 2.5e-7), o
+    que dá o mesmo valor para quem faz o parse, mas não os mesmos bytes.
+
+    O orjson escreve NaN/Infinity como null; com STRICT_JSON (padrão do DRF) o
+    JSONRenderer recusa esses valores com ValueError, então um payload com
+    float não finito é repassado a ele. Respostas indentadas (API navegável,
+    `indent=`) e valores que o orjson recusa (ex.: inteiros acima de 64 bits)
+    também usam o JSONRenderer. Sem orjson instalado, é o próprio JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            resultado = orjson.dumps(data, default=_encoder.default, option=_OPCOES_ORJSON)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # NaN/Infinity viram null no orjson. Só há o que procurar se a saída tem null.
+        if self.strict and b'null' in resultado and _tem_float_nao_finito(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Como o JSONRenderer: U+2028/U+2029 escapados para a saída ser JavaScript válido.
+        if any(separador in resultado for separador in _SEPARADORES_JS):
+            resultado = resultado.replace(_SEPARADORES_JS[0], b'\\u2028').replace(_SEPARADORES_JS[1], b'\\u2029')
+        return resultado
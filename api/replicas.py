@@ -0,0 +1,135 @@
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+# ==============================================================================
+# RÉPLICAS DE LEITURA
+# ==============================================================================
+#
+# Com DJANGO_DB_REPLICAS (ver core/settings.py), as conexões 'replica_N' recebem
+# as leituras das views que declaram leitura_em_replica: os nomes dos handlers
+# (ex.: 'get' numa APIView, 'list' num ViewSet) que só leem. Todo o resto, e
+# qualquer escrita, vai para o banco principal ('default').
+#
+# Leitura das próprias escritas: cada escrita bem sucedida de um usuário
+# autenticado (pelo JWT, como o frontend se autentica) grava o instante no cache
+# CACHE_REPLICAS, compartilhado entre os workers, e por
+# DB_REPLICAS_PRIMARIO_APOS_ESCRITA segundos as leituras daquele usuário
+# continuam no principal. O cabeçalho "X-Ler-Primario: 1" (liberado no CORS)
+# força o mesmo.
+#
+# Uma requisição lê sempre da mesma réplica, sorteada no início, para não ver
+# estados diferentes do banco entre duas consultas.
+#
+# As réplicas podem ser cópias locais do arquivo SQLite, atualizadas pelo
+# comando sincronizar_replicas.
+
+PREFIXO_REPLICA = 'replica_'
+CACHE_REPLICAS = 'replicas'
+CABECALHO_PRIMARIO = 'HTTP_X_LER_PRIMARIO'
+METODOS_LEITURA = ('GET', 'HEAD', 'OPTIONS')
+
+_replica = contextvars.ContextVar('replica', default=None)
+_autenticacao = JWTStatelessUserAuthentication()
+
+
+def aliases_replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith(PREFIXO_REPLICA)]
+
+
+def _sortear_replica():
+    replicas = aliases_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def em_replica():
+    """ Leituras dentro do bloco vão para uma réplica (se houver), a mesma até o fim do bloco. """
+    token = _replica.set(_sortear_replica())
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """ Leituras marcadas com em_replica() na réplica sorteada para o bloco; escritas no principal. """
+
+    def db_for_read(self, model, **hints):
+        return _replica.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas têm os mesmos dados do principal.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _acao(request, view_func):
+    """ Nome do handler que vai atender: a action do ViewSet ou o método da APIView. """
+    acoes = getattr(view_func, 'actions', None)
+    if acoes is not None:
+        return acoes.get(request.method.lower())
+    return request.method.lower()
+
+
+def _usuario_id(request):
+    try:
+        autenticado = _autenticacao.authenticate(request)
+    except APIException:
+        return None
+    return autenticado[0].id if autenticado is not None else None
+
+
+def _chave_escrita(usuario_id):
+    return f'replicas:ultima_escrita:{usuario_id}'
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        if not aliases_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.primario_apos_escrita = settings.DB_REPLICAS_PRIMARIO_APOS_ESCRITA
+        self.cache = caches[CACHE_REPLICAS]
+
+    def __call__(self, request):
+        token = _replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+        if request.method not in METODOS_LEITURA and response.status_code < 400 and self.primario_apos_escrita:
+            usuario_id = _usuario_id(request)
+            if usuario_id is not None:
+                self.cache.set(_chave_escrita(usuario_id), time.time(), self.primario_apos_escrita)
+        return response
+
+    def _escreveu_recentemente(self, request):
+        usuario_id = _usuario_id(request)
+        return usuario_id is not None and self.cache.get(_chave_escrita(usuario_id)) is not None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in METODOS_LEITURA or request.META.get(CABECALHO_PRIMARIO) == '1':
+            return None
+        view_class = getattr(view_func, 'cls', None)
+        if _acao(request, view_func) not in getattr(view_class, 'leitura_em_replica', ()):
+            return None
+        if self.primario_apos_escrita and self._escreveu_recentemente(request):
+            return None
+        _replica.set(_sortear_replica())
+        return None
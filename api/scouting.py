@@ -0,0 +1,334 @@
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+from django.conf import settings
+from sklearn.neighbors import KDTree
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# ==============================================================================
+# NORMALIZAÇÃO DOS ATRIBUTOS
+# ==============================================================================
+
+ATRIBUTOS_SCOUTING = ['velocidade', 'chute', 'passe', 'defesa', 'altura', 'peso', 'idade']
+
+# Faixas fixas (e não calculadas sobre os dados) para que um jogador novo possa
+# entrar no índice sem precisar renormalizar todos os outros.
+LIMITES_ATRIBUTOS = {
+    'velocidade': (1, 10),
+    'chute': (1, 10),
+    'passe': (1, 10),
+    'defesa': (1, 10),
+    'altura': (150, 210),
+    'peso': (50, 110),
+    'idade': (15, 45),
+}
+
+_MINIMOS = np.array([LIMITES_ATRIBUTOS[a][0] for a in ATRIBUTOS_SCOUTING], dtype=np.float64)
+_AMPLITUDES = np.array([LIMITES_ATRIBUTOS[a][1] - LIMITES_ATRIBUTOS[a][0] for a in ATRIBUTOS_SCOUTING], dtype=np.float64)
+
+VERSAO_FORMATO_INDICE = 1
+
+
+def normalizar_atributos(matriz):
+    """Leva cada atributo para o intervalo [0, 1] usando as faixas de LIMITES_ATRIBUTOS."""
+    matriz = np.asarray(matriz, dtype=np.float64).reshape(-1, len(ATRIBUTOS_SCOUTING))
+    return np.clip((matriz - _MINIMOS) / _AMPLITUDES, 0.0, 1.0)
+
+
+def _chave_posicao(posicao):
+    return (posicao or '').strip().upper()
+
+
+def _montar_arvores(ids, vetores, posicoes):
+    """ Idades e árvores (geral e por posição) de uma base; não toca em estado compartilhado. """
+    idades = (vetores[:, -1] * _AMPLITUDES[-1] + _MINIMOS[-1]).round().astype(np.int64) if len(ids) else np.empty(0, dtype=np.int64)
+    arvores = {}
+    if len(ids):
+        arvores[None] = (KDTree(vetores), np.arange(len(ids)))
+        for posicao in np.unique(posicoes):
+            linhas = np.flatnonzero(posicoes == posicao)
+            arvores[posicao] = (KDTree(vetores[linhas]), linhas)
+    return idades, arvores
+
+
+# ==============================================================================
+# ÍNDICE ESPACIAL
+# ==============================================================================
+
+class IndiceScouting:
+    """
+    Índice de vizinhos mais próximos sobre os atributos normalizados dos jogadores.
+
+    As árvores (uma geral e uma por posição) são estáticas; as alterações feitas
+    depois da construção ficam num buffer de pendentes consultado por força bruta
+    e os ids alterados/removidos da árvore são ignorados nas consultas. Quando o
+    buffer passa de `limite_pendentes`, uma thread em segundo plano reconstrói o
+    índice a partir do banco, salva em disco e troca a base; as consultas seguem
+    na base antiga enquanto isso e as alterações feitas depois do início da
+    leitura do banco continuam pendentes.
+    """
+
+    def __init__(self, caminho=None, limite_pendentes=1000):
+        self.caminho = caminho
+        self.limite_pendentes = limite_pendentes
+        self._lock = threading.RLock()
+        self._mtime_carregado = None
+        self._reconstrucao = None
+        vazios = np.empty(0, dtype=np.int64), np.empty((0, len(ATRIBUTOS_SCOUTING))), np.empty(0, dtype=object)
+        self._definir_base(*vazios, *_montar_arvores(*vazios))
+
+    def _definir_base(self, ids, vetores, posicoes, idades, arvores, construido_em=None):
+        """
+        Troca a base (chamar com o lock). Com `construido_em`, mantém só as
+        alterações posteriores a esse instante; sem ele, descarta todas.
+        """
+        self._ids = ids
+        self._vetores = vetores
+        self._posicoes = posicoes
+        self._idades = idades
+        self._arvores = arvores
+        self._construido_em = construido_em or 0.0
+        if construido_em is None:
+            self._removidos = set()
+            self._pendentes = {}
+            self._alteracoes = {}
+            self._cache_pendentes = None
+        else:
+            self._descartar_alteracoes_ate(construido_em)
+
+    def _descartar_alteracoes_ate(self, instante):
+        # Alterações chegam via on_commit: se foram registradas antes de a leitura
+        # do banco começar, já estão na base nova.
+        recentes = {jogador_id for jogador_id, quando in self._alteracoes.items() if quando >= instante}
+        self._alteracoes = {jogador_id: self._alteracoes[jogador_id] for jogador_id in recentes}
+        self._removidos &= recentes
+        self._pendentes = {jogador_id: valor for jogador_id, valor in self._pendentes.items() if jogador_id in recentes}
+        self._cache_pendentes = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids) - len(self._removidos) + len(self._pendentes)
+
+    # --- Construção e persistência -------------------------------------------
+
+    def construir(self, linhas, construido_em=None):
+        """
+        Reconstrói o índice a partir de tuplas (id, posicao, *ATRIBUTOS_SCOUTING).
+        As árvores são montadas fora do lock; só a troca da base o segura.
+        """
+        ids, posicoes, atributos = [], [], []
+        for linha in linhas:
+            ids.append(linha[0])
+            posicoes.append(_chave_posicao(linha[1]))
+            atributos.append(linha[2:])
+        ids = np.asarray(ids, dtype=np.int64)
+        vetores = normalizar_atributos(atributos) if atributos else np.empty((0, len(ATRIBUTOS_SCOUTING)))
+        posicoes = np.asarray(posicoes, dtype=object)
+        idades, arvores = _montar_arvores(ids, vetores, posicoes)
+        with self._lock:
+            self._definir_base(ids, vetores, posicoes, idades, arvores, construido_em)
+
+    def construir_do_banco(self):
+        from .models import Jogador
+        campos = ['id', 'posicao'] + ATRIBUTOS_SCOUTING
+        construido_em = time.time()
+        self.construir(Jogador.objects.values_list(*campos).iterator(chunk_size=10000), construido_em)
+        logging.info(f"Índice de scouting construído com {len(self)} jogadores.")
+
+    def salvar(self):
+        if not self.caminho:
+            return
+        with self._lock:
+            estado = {
+                'versao': VERSAO_FORMATO_INDICE,
+                'ids': self._ids,
+                'vetores': self._vetores,
+                'posicoes': self._posicoes,
+                'idades': self._idades,
+                'arvores': self._arvores,
+                'construido_em': self._construido_em,
+            }
+        # A base é imutável depois de montada: a gravação não precisa do lock.
+        os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+        temporario = f"{self.caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(estado, temporario)
+        os.replace(temporario, self.caminho)
+        self._mtime_carregado = os.stat(self.caminho).st_mtime
+
+    def carregar(self, manter_pendentes=False):
+        """Carrega o índice salvo em disco. Retorna False se não houver um arquivo válido."""
+        if not self.caminho or not os.path.exists(self.caminho):
+            return False
+        try:
+            estado = joblib.load(self.caminho)
+        except Exception as e:
+            logging.error(f"Erro ao carregar índice de scouting de {self.caminho}: {e}")
+            return False
+        if estado.get('versao') != VERSAO_FORMATO_INDICE:
+            return False
+        with self._lock:
+            # Com manter_pendentes, ficam só as alterações que o arquivo não inclui.
+            self._definir_base(
+                estado['ids'], estado['vetores'], estado['posicoes'], estado['idades'], estado['arvores'],
+                estado.get('construido_em', 0.0) if manter_pendentes else None,
+            )
+            self._mtime_carregado = os.stat(self.caminho).st_mtime
+        return True
+
+    def recarregar_se_desatualizado(self):
+        """Recarrega o arquivo se outro processo salvou uma versão mais nova do índice."""
+        if not self.caminho:
+            return
+        try:
+            mtime = os.stat(self.caminho).st_mtime
+        except OSError:
+            return
+        if self._mtime_carregado is not None and mtime > self._mtime_carregado:
+            self.carregar(manter_pendentes=True)
+
+    # --- Atualização incremental ---------------------------------------------
+
+    def atualizar(self, jogador_id, posicao, atributos):
+        with self._lock:
+            self._alteracoes[jogador_id] = time.time()
+            self._removidos.add(jogador_id)
+            self._pendentes[jogador_id] = (_chave_posicao(posicao), normalizar_atributos(atributos)[0])
+            self._cache_pendentes = None
+            self._reconstruir_se_necessario()
+
+    def remover(self, jogador_id):
+        with self._lock:
+            self._alteracoes[jogador_id] = time.time()
+            self._removidos.add(jogador_id)
+            self._pendentes.pop(jogador_id, None)
+            self._cache_pendentes = None
+            self._reconstruir_se_necessario()
+
+    def _reconstruir_se_necessario(self):
+        # Chamado no on_commit de uma escrita: a reconstrução não pode rodar aqui.
+        if len(self._pendentes) + len(self._removidos) <= self.limite_pendentes:
+            return
+        if self._reconstrucao is not None and self._reconstrucao.is_alive():
+            return
+        self._reconstrucao = threading.Thread(target=self._reconstruir, name='reconstrucao-scouting', daemon=True)
+        self._reconstrucao.start()
+
+    def _reconstruir(self):
+        # Parte do banco (e não do estado em memória) para que o arquivo salvo
+        # inclua também as escritas feitas por outros processos; os outros
+        # workers recarregam o arquivo e descartam as pendências que ele cobre.
+        from django.db import connection
+        try:
+            self.construir_do_banco()
+            self.salvar()
+        except Exception:
+            logging.exception("Erro ao reconstruir o índice de scouting:")
+        finally:
+            connection.close()
+
+    # --- Consulta -------------------------------------------------------------
+
+    def buscar(self, atributos, k=10, posicao=None, idade_min=None, idade_max=None, excluir=()):
+        """
+        Retorna até `k` pares (jogador_id, distancia) ordenados pela distância
+        euclidiana nos atributos normalizados.
+        """
+        vetor = normalizar_atributos(atributos)
+        chave = _chave_posicao(posicao) if posicao else None
+        excluir = set(excluir)
+
+        def aceita_idade(idade):
+            return (idade_min is None or idade >= idade_min) and (idade_max is None or idade <= idade_max)
+
+        with self._lock:
+            ignorar = self._removidos | excluir
+            resultados = self._buscar_na_arvore(vetor, k, chave, ignorar, aceita_idade)
+            resultados.extend(self._buscar_nos_pendentes(vetor, k, chave, excluir, idade_min, idade_max))
+
+        resultados.sort(key=lambda r: r[1])
+        return resultados[:k]
+
+    def _matriz_pendentes(self):
+        if self._cache_pendentes is None:
+            self._cache_pendentes = (
+                np.fromiter(self._pendentes.keys(), dtype=np.int64, count=len(self._pendentes)),
+                np.array([p for p, _ in self._pendentes.values()], dtype=object),
+                np.array([v for _, v in self._pendentes.values()]).reshape(-1, len(ATRIBUTOS_SCOUTING)),
+            )
+        return self._cache_pendentes
+
+    def _buscar_nos_pendentes(self, vetor, k, chave, excluir, idade_min, idade_max):
+        if not self._pendentes:
+            return []
+        ids, posicoes, vetores = self._matriz_pendentes()
+        idades = (vetores[:, -1] * _AMPLITUDES[-1] + _MINIMOS[-1]).round()
+        mascara = ~np.isin(ids, list(excluir)) if excluir else np.ones(len(ids), dtype=bool)
+        if chave is not None:
+            mascara &= posicoes == chave
+        if idade_min is not None:
+            mascara &= idades >= idade_min
+        if idade_max is not None:
+            mascara &= idades <= idade_max
+        distancias = np.linalg.norm(vetores[mascara] - vetor[0], axis=1)
+        melhores = np.argsort(distancias)[:k]
+        return [(int(i), float(d)) for i, d in zip(ids[mascara][melhores], distancias[melhores])]
+
+    def _buscar_na_arvore(self, vetor, k, chave, ignorar, aceita_idade):
+        if chave not in self._arvores:
+            return []
+        arvore, linhas = self._arvores[chave]
+        total = len(linhas)
+        # Consulta com folga para compensar os ids ignorados e os filtros de idade;
+        # dobra a folga até ter k resultados ou esgotar a árvore.
+        quantidade = min(total, 2 * k)
+        while True:
+            distancias, indices = arvore.query(vetor, k=quantidade)
+            resultados = []
+            for distancia, indice in zip(distancias[0], indices[0]):
+                linha = linhas[indice]
+                jogador_id = int(self._ids[linha])
+                if jogador_id in ignorar or not aceita_idade(self._idades[linha]):
+                    continue
+                resultados.append((jogador_id, float(distancia)))
+                if len(resultados) == k:
+                    return resultados
+            if quantidade >= total:
+                return resultados
+            quantidade = min(total, quantidade * 2)
+
+
+# ==============================================================================
+# INSTÂNCIA DO PROCESSO
+# ==============================================================================
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def obter_indice():
+    """Retorna o índice do processo, carregando do disco (ou do banco) na primeira chamada."""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                indice = IndiceScouting(
+                    caminho=getattr(settings, 'SCOUTING_INDEX_PATH', None),
+                    limite_pendentes=getattr(settings, 'SCOUTING_LIMITE_PENDENTES', 1000),
+                )
+                if not indice.carregar():
+                    indice.construir_do_banco()
+                    indice.salvar()
+                _indice = indice
+    else:
+        _indice.recarregar_se_desatualizado()
+    return _indice
+
+
+def indice_carregado():
+    """Retorna o índice apenas se ele já foi carregado neste processo."""
+    return _indice
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Elenco, Jogador, Formacao, FormacaoEscolhida, User
-import json
+from .authentication import dados_do_usuario
+from .listagem import decodificar_json
 
 class ElencoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,6 +13,46 @@ class JogadorSerializer(serializers.ModelSerializer):
         model = Jogador
         fields = '__all__'
 
+class JogadorHipoteticoSerializer(serializers.ModelSerializer):
+    """ Jogador fictício (não salvo), validado com as mesmas regras de Jogador. """
+    class Meta:
+        model = Jogador
+        fields = ['nome', 'posicao', 'altura', 'peso', 'velocidade', 'chute', 'passe', 'defesa', 'goleiro']
+        extra_kwargs = {'posicao': {'required': False}}
+
+    preencher_padroes = True
+
+    def validate(self, attrs):
+        # Os atributos omitidos assumem os mesmos valores padrão de Jogador.
+        if self.preencher_padroes:
+            for campo in self.Meta.fields:
+                model_field = Jogador._meta.get_field(campo)
+                if campo not in attrs:
+                    attrs[campo] = model_field.get_default() if model_field.has_default() else ''
+        return attrs
+
+class EdicaoJogadorSerializer(JogadorHipoteticoSerializer):
+    id = serializers.IntegerField()
+    preencher_padroes = False
+
+    class Meta(JogadorHipoteticoSerializer.Meta):
+        fields = ['id'] + JogadorHipoteticoSerializer.Meta.fields
+        extra_kwargs = {campo: {'required': False} for campo in JogadorHipoteticoSerializer.Meta.fields}
+
+class CenarioSerializer(serializers.Serializer):
+    nome = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    adicionar = JogadorHipoteticoSerializer(many=True, default=list)
+    remover = serializers.ListField(child=serializers.IntegerField(), default=list)
+    editar = EdicaoJogadorSerializer(many=True, default=list)
+
+    def validate(self, attrs):
+        if len(set(attrs['remover'])) != len(attrs['remover']):
+            raise serializers.ValidationError({"remover": "Um jogador não pode ser removido duas vezes no mesmo cenário."})
+        editados = [edicao['id'] for edicao in attrs['editar']]
+        if len(set(editados)) != len(editados) or set(editados) & set(attrs['remover']):
+            raise serializers.ValidationError("Um jogador não pode ser editado duas vezes nem editado e removido no mesmo cenário.")
+        return attrs
+
 class UserRegisterSerializer(serializers.ModelSerializer):
     password2 = serializers.CharField(style={'input_type': 'password'}, write_only=True)
     team_name = serializers.CharField(max_length=100, write_only=True)
@@ -48,12 +89,10 @@ class UserMeSerializer(serializers.ModelSerializer):
         fields = ('id', 'email', 'first_name', 'last_name', 'team_name', 'elenco_id')
 
     def get_team_name(self, obj):
-        elenco = obj.elencos.first()
-        return elenco.nome_elenco if elenco else 'Time não definido'
+        return dados_do_usuario(obj)['team_name']
     
     def get_elenco_id(self, obj):
-        elenco = obj.elencos.first()
-        return elenco.id if elenco else None
+        return dados_do_usuario(obj)['elenco_id']
 
 class FormacaoSerializer(serializers.ModelSerializer):
     posicoes = serializers.SerializerMethodField()
@@ -61,10 +100,7 @@ class FormacaoSerializer(serializers.ModelSerializer):
         model = Formacao
         fields = '__all__'
     def get_posicoes(self, obj):
-        try:
-            return json.loads(obj.posicoes) if isinstance(obj.posicoes, str) else obj.posicoes
-        except (json.JSONDecodeError, TypeError):
-            return []
+        return decodificar_json(obj.posicoes)
 
 class FormacaoEscolhidaSerializer(serializers.ModelSerializer):
     formacao = FormacaoSerializer()
@@ -75,9 +111,19 @@ class FormacaoEscolhidaSerializer(serializers.ModelSerializer):
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Claims lidas por UsuarioToken, para que as requisições não consultem o banco.
+        token = super().get_token(user)
+        for claim, valor in dados_do_usuario(user).items():
+            if claim != 'id':
+                token[claim] = valor
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
-        serializer = UserMeSerializer(self.user)
-        data['user'] = serializer.data
+        data['user'] = dict(dados_do_usuario(self.user))
         
         return data
\ No newline at end of file
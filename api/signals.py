@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import invalidar_usuario
+from .estatisticas import estado_do_jogador, recalcular_estatisticas, registrar_alteracao
+from .models import Elenco, EstatisticasElenco, Jogador, User
+from .scouting import ATRIBUTOS_SCOUTING, indice_carregado
+
+# ==============================================================================
+# ÍNDICE DE SCOUTING
+# ==============================================================================
+
+@receiver(post_save, sender=Jogador)
+def atualizar_indice_scouting(sender, instance, **kwargs):
+    # Só o índice já carregado neste processo é atualizado: a primeira construção
+    # (varredura da tabela) fica para a consulta ou para reconstruir_indice_scouting,
+    # e já inclui esta escrita.
+    indice = indice_carregado()
+    if indice is None:
+        return
+    atributos = [getattr(instance, atributo) for atributo in ATRIBUTOS_SCOUTING]
+    transaction.on_commit(lambda: indice.atualizar(instance.pk, instance.posicao, atributos))
+
+@receiver(post_delete, sender=Jogador)
+def remover_do_indice_scouting(sender, instance, **kwargs):
+    indice = indice_carregado()
+    if indice is None:
+        return
+    jogador_id = instance.pk
+    transaction.on_commit(lambda: indice.remover(jogador_id))
+
+# ==============================================================================
+# ESTATÍSTICAS DO ELENCO
+# ==============================================================================
+
+@receiver(post_save, sender=Elenco)
+def criar_estatisticas_elenco(sender, instance, created, **kwargs):
+    if created:
+        EstatisticasElenco.objects.get_or_create(elenco=instance)
+
+@receiver(post_init, sender=Jogador)
+def guardar_estado_jogador(sender, instance, **kwargs):
+    instance._estado_estatisticas = estado_do_jogador(instance)
+
+@receiver(post_save, sender=Jogador)
+def atualizar_estatisticas_elenco(sender, instance, created, **kwargs):
+    anterior = None if created else instance._estado_estatisticas
+    if anterior is None and not created:
+        # Estado original desconhecido (campos adiados): o recálculo cobre o elenco atual.
+        recalcular_estatisticas([instance.elenco_id])
+    else:
+        registrar_alteracao(anterior, estado_do_jogador(instance))
+    instance._estado_estatisticas = estado_do_jogador(instance)
+
+@receiver(post_delete, sender=Jogador)
+def descontar_estatisticas_elenco(sender, instance, origin=None, **kwargs):
+    # Na remoção em cascata de um elenco (ou técnico) os agregados somem junto.
+    if isinstance(origin, Jogador) or getattr(origin, 'model', None) is Jogador:
+        registrar_alteracao(estado_do_jogador(instance), None)
+
+# ==============================================================================
+# CACHE DE USUÁRIOS DA AUTENTICAÇÃO
+# ==============================================================================
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+@receiver(post_save, sender=Elenco)
+@receiver(post_delete, sender=Elenco)
+def invalidar_cache_tecnico(sender, instance, **kwargs):
+    invalidar_usuario(instance.tecnico_id)
@@ -1,3 +1,619 @@
-from django.test import TestCase
+import io
+import itertools
+import json
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import admissao, classificacao_lote, scouting
+from .admissao import AdmissaoMixin, LimitadorAdmissao, ServicoSobrecarregado, threads_ocupadas_pela_ia
+from .classificacao_lote import ErroLeitura, ler_registros
+from .estatisticas import recalcular_estatisticas
+from .ia_features import COLUNAS_FONTE, FORMULAS_FONTE, features_da_fonte, features_de_jogadores
+from .ia_logic import GRUPOS_TATICOS, REQUISITOS_TATICAS, _avaliar_fit_tatica, selecionar_melhores_xi
+from .models import Elenco, EstatisticasElenco, Formacao, Jogador, User
+from .perfilamento import listar_perfis
+from .renderers import ORJSONRenderer
+from .replicas import ReplicaMiddleware, ReplicaRouter
+from .scouting import IndiceScouting
+from .serializers import CenarioSerializer
+from .views import JogadorViewSet
+
+
+class IndiceTemporarioMixin:
+    """ O índice do processo (alimentado pelos sinais de Jogador) grava num diretório temporário. """
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(SCOUTING_INDEX_PATH=Path(diretorio.name) / 'scouting_index.joblib')
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        scouting._indice = None
+        self.addCleanup(setattr, scouting, '_indice', None)
+        super().setUp()
+
+
+# ==============================================================================
+# ÍNDICE DE SCOUTING
+# ==============================================================================
+
+def _criar_jogador(elenco, camisa, **atributos):
+    campos = {'nome': f'Jogador {camisa}', 'posicao': 'Meia', 'idade': 25, **atributos}
+    return Jogador.objects.create(elenco=elenco, camisa=camisa, **campos)
+
+
+class IndiceScoutingReconstrucaoTests(IndiceTemporarioMixin, TransactionTestCase):
+    """ A reconstrução roda numa thread própria (que lê o banco com outra conexão). """
+
+    def setUp(self):
+        super().setUp()
+        tecnico = User.objects.create_user(email='scout@exemplo.com', password='senha-forte-123')
+        self.elenco = Elenco.objects.create(tecnico=tecnico, nome_elenco='Scouting FC')
+        self.jogadores = [_criar_jogador(self.elenco, camisa, velocidade=camisa) for camisa in range(1, 6)]
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.indice = IndiceScouting(caminho=str(Path(diretorio.name) / 'indice.joblib'), limite_pendentes=3)
+        self.indice.construir_do_banco()
+
+    def _atributos(self, jogador):
+        return [jogador.velocidade, jogador.chute, jogador.passe, jogador.defesa, jogador.altura, jogador.peso, jogador.idade]
+
+    def test_reconstrucao_fora_da_chamada_e_com_a_base_nova(self):
+        jogador = self.jogadores[0]
+        jogador.velocidade = 10
+        jogador.save()
+        self.indice.atualizar(jogador.pk, jogador.posicao, self._atributos(jogador))
+        removido = self.jogadores[1].pk
+        self.jogadores[1].delete()
+        self.indice.remover(removido)
+        self.assertIsNone(self.indice._reconstrucao)
+
+        # Passou do limite: a chamada retorna e a reconstrução segue em segundo plano.
+        removido = self.jogadores[2].pk
+        self.jogadores[2].delete()
+        self.indice.remover(removido)
+        self.assertIsNotNone(self.indice._reconstrucao)
+        self.indice._reconstrucao.join(timeout=30)
+
+        # Tudo o que foi registrado antes da leitura do banco já está na base.
+        self.assertEqual(self.indice._pendentes, {})
+        self.assertEqual(self.indice._removidos, set())
+        self.assertEqual(len(self.indice), 3)
+        mais_proximo, distancia = self.indice.buscar(self._atributos(jogador), k=1)[0]
+        self.assertEqual((mais_proximo, distancia), (jogador.pk, 0.0))
+
+        # O arquivo salvo pela thread é o que os outros processos carregam.
+        outro = IndiceScouting(caminho=self.indice.caminho)
+        self.assertTrue(outro.carregar())
+        self.assertEqual(len(outro), 3)
+
+    def test_alteracoes_posteriores_a_leitura_continuam_pendentes(self):
+        construido_em = self.indice._construido_em
+        jogador = self.jogadores[0]
+        self.indice.atualizar(jogador.pk, jogador.posicao, self._atributos(jogador))
+        # Simula uma alteração registrada depois do início da leitura do banco.
+        self.indice._alteracoes[jogador.pk] = construido_em + 3600
+        self.indice.construir_do_banco()
+        self.assertIn(jogador.pk, self.indice._pendentes)
+
+
+
+class IndiceScoutingEscritasTests(IndiceTemporarioMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tecnico = User.objects.create_user(email='dono@exemplo.com', password='senha-forte-123')
+        self.elenco = Elenco.objects.create(tecnico=self.tecnico, nome_elenco='Dono FC')
+        rival = User.objects.create_user(email='rival@exemplo.com', password='senha-forte-123')
+        self.elenco_rival = Elenco.objects.create(tecnico=rival, nome_elenco='Rival FC')
+
+    def test_escrita_nao_constroi_o_indice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            _criar_jogador(self.elenco, 1)
+        self.assertIsNone(scouting.indice_carregado())
+        self.assertFalse(Path(scouting.settings.SCOUTING_INDEX_PATH).exists())
+
+    def test_escrita_atualiza_o_indice_ja_carregado(self):
+        indice = scouting.obter_indice()
+        with self.captureOnCommitCallbacks(execute=True):
+            jogador = _criar_jogador(self.elenco, 1)
+        self.assertIn(jogador.pk, indice._pendentes)
+
+    def test_similares_de_outros_elencos_sem_dados_pessoais(self):
+        referencia = _criar_jogador(self.elenco, 1, velocidade=8)
+        meu = _criar_jogador(self.elenco, 2, velocidade=8, nome='Meu Jogador')
+        _criar_jogador(self.elenco_rival, 3, velocidade=8, nome='Jogador Rival', nacionalidade='Uruguai')
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.tecnico)}')
+
+        resposta = cliente.get(f'/api/jogadores/{referencia.pk}/similares/')
+        self.assertEqual(resposta.status_code, 200)
+        por_elenco = {item['meu_elenco']: item for item in resposta.json()}
+        self.assertEqual(por_elenco[True]['id'], meu.pk)
+        self.assertEqual(por_elenco[True]['nome'], 'Meu Jogador')
+        self.assertFalse({'id', 'nome', 'nacionalidade', 'elenco'} & set(por_elenco[False]))
+        self.assertEqual(por_elenco[False]['velocidade'], 8)
+
+# ==============================================================================
+# ESTATÍSTICAS DO ELENCO
+# ==============================================================================
+
+class EstatisticasIncrementaisTests(IndiceTemporarioMixin, TestCase):
+    """ Os agregados mantidos a cada escrita devem bater com o recálculo completo. """
+
+    def setUp(self):
+        super().setUp()
+        tecnico = User.objects.create_user(email='estatisticas@exemplo.com', password='senha-forte-123')
+        self.elenco = Elenco.objects.create(tecnico=tecnico, nome_elenco='Titulares FC')
+        self.outro = Elenco.objects.create(tecnico=tecnico, nome_elenco='Reservas FC')
+
+    def assertAgregadosConferem(self):
+        def agregados():
+            return list(EstatisticasElenco.objects.order_by('elenco_id').values())
+
+        incrementais = agregados()
+        recalcular_estatisticas()
+        self.assertEqual(incrementais, agregados())
+
+    def test_criar_editar_mover_e_remover(self):
+        goleiro = _criar_jogador(self.elenco, 1, posicao='Goleiro', goleiro=True, altura=190)
+        lateral = _criar_jogador(self.elenco, 2, posicao='Lateral Esquerdo', perna_boa='ESQ', velocidade=9)
+        _criar_jogador(self.elenco, 9, posicao='Centroavante', chute=9)
+        self.assertAgregadosConferem()
+
+        lateral.posicao, lateral.perna_boa, lateral.idade = 'Meia', 'DIR', 31
+        lateral.save()
+        self.assertAgregadosConferem()
+
+        lateral.elenco = self.outro
+        lateral.save()
+        self.assertAgregadosConferem()
+
+        goleiro.delete()
+        self.assertAgregadosConferem()
+        self.assertEqual(EstatisticasElenco.objects.get(elenco=self.elenco).total_jogadores, 1)
+        self.assertEqual(EstatisticasElenco.objects.get(elenco=self.outro).contagem_posicoes, {'Meia': 1})
+
+    def test_operacoes_em_massa(self):
+        Jogador.objects.bulk_create([
+            Jogador(elenco=elenco, nome=f'Jogador {camisa}', posicao=posicao, camisa=camisa, idade=20 + camisa)
+            for elenco in (self.elenco, self.outro)
+            for camisa, posicao in enumerate(['Zagueiro', 'Volante', 'Ponta Direita'], start=1)
+        ])
+        self.assertAgregadosConferem()
+
+        Jogador.objects.filter(posicao='Volante').update(defesa=10, perna_boa='ESQ')
+        self.assertAgregadosConferem()
+
+        Jogador.objects.filter(elenco=self.outro, camisa=1).update(elenco=self.elenco, camisa=4)
+        self.assertAgregadosConferem()
+        self.assertEqual(EstatisticasElenco.objects.get(elenco=self.elenco).total_jogadores, 4)
+
+        Jogador.objects.filter(posicao='Ponta Direita').delete()
+        self.assertAgregadosConferem()
+
+
+# ==============================================================================
+# SIMULAÇÃO DE CENÁRIOS
+# ==============================================================================
+
+class FeaturesModeloTests(TestCase):
+    """ Linha da base de origem e o Jogador equivalente geram as mesmas features. """
+
+    def test_fonte_e_jogador_equivalente(self):
+        # Linha da tabela Player/Player_Attributes: peso em libras, atributos de 0 a 100.
+        linha = {coluna: 0.0 for coluna in COLUNAS_FONTE}
+        for colunas, valor in zip((c for c, _ in FORMULAS_FONTE.values()), (80, 60, 70, 30)):
+            linha.update(dict.fromkeys(colunas, valor))
+        fonte = features_da_fonte(pd.DataFrame([{**linha, 'weight': 165.3465, 'height': 182.88}]))
+        jogador = features_de_jogadores([
+            {'peso': 75, 'altura': 182.88, 'velocidade': 8, 'chute': 6, 'passe': 7, 'defesa': 3}
+        ])
+        np.testing.assert_allclose(jogador.to_numpy(), fonte.to_numpy(), rtol=1e-5)
+        self.assertEqual(list(jogador.columns), list(fonte.columns))
+
+    def test_faixa_do_scaler_de_treino(self):
+        # O scaler do modelo publicado foi ajustado com peso médio de ~165 lb e
+        # atributos de 0 a 100: um jogador médio não pode ficar a vários desvios disso.
+        features = features_de_jogadores([
+            {'peso': 75, 'altura': 180, 'velocidade': 7, 'chute': 6, 'passe': 6, 'defesa': 5}
+        ]).iloc[0]
+        self.assertAlmostEqual(features['weight'], 165.3, delta=0.1)
+        self.assertEqual(features['movement'], 70)
+        self.assertEqual(features['skills'], 80)
+
+
+class MelhoresXiTests(TestCase):
+    """ A programação dinâmica de selecionar_melhores_xi contra a enumeração de todos os onzes. """
+
+    def test_igual_a_forca_bruta(self):
+        rng = random.Random(7)
+        for _ in range(5):
+            grupos = [rng.choice(GRUPOS_TATICOS) for _ in range(13)]
+            confiancas = [round(rng.random(), 3) for _ in grupos]
+            escalaveis = [i for i, grupo in enumerate(grupos) if grupo != 'Outro']
+            resultado = selecionar_melhores_xi(grupos, confiancas)
+
+            for nome, requisitos in REQUISITOS_TATICAS.items():
+                alvo = min(requisitos['total_jogadores_linha'], len(escalaveis))
+                # Menor score e, no empate, maior confiança somada.
+                score, confianca = min(
+                    (_avaliar_fit_tatica(nome, Counter(grupos[i] for i in onze))[0],
+                     -round(sum(confiancas[i] for i in onze), 6))
+                    for onze in itertools.combinations(escalaveis, alvo)
+                )
+                xi = resultado[nome]
+                with self.subTest(grupos=grupos, tatica=nome):
+                    self.assertEqual(xi['score'], score)
+                    self.assertAlmostEqual(sum(confiancas[i] for i in xi['indices']), -confianca, places=6)
+                    self.assertEqual(xi['contagem_grupos'], dict(Counter(grupos[i] for i in xi['indices'])))
+                    self.assertEqual(_avaliar_fit_tatica(nome, xi['contagem_grupos'])[0], score)
+
+class CenarioSerializerTests(TestCase):
+
+    def test_remocao_repetida_e_rejeitada(self):
+        serializer = CenarioSerializer(data={'remover': [3, 3]})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('remover', serializer.errors)
+
+    def test_edicao_repetida_ou_de_removido_e_rejeitada(self):
+        for dados in ({'editar': [{'id': 1}, {'id': 1}]}, {'remover': [1], 'editar': [{'id': 1}]}):
+            self.assertFalse(CenarioSerializer(data=dados).is_valid(), dados)
+
+    def test_cenario_valido(self):
+        serializer = CenarioSerializer(data={'nome': 'Sem o 3', 'remover': [3, 4], 'editar': [{'id': 1}]})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+
+# ==============================================================================
+# AUTENTICAÇÃO
+# ==============================================================================
+
+class UsuarioTokenTests(TestCase):
+    """ Token válido de um usuário que não pode mais entrar: 401, como no JWTAuthentication. """
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(email='token@exemplo.com', password='senha-forte-123')
+        self.formacao = Formacao.objects.create(
+            nome='4-4-2', estilo='Equilibrado', dificuldade=1, descricao='', categoria='Clássica', posicoes=[],
+        )
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+
+    def assertNaoAutenticado(self):
+        self.assertEqual(self.cliente.get('/api/me/').status_code, 401)
+        resposta = self.cliente.post('/api/salvar-formacao/', {'formationId': self.formacao.pk})
+        self.assertEqual(resposta.status_code, 401)
+
+    def test_usuario_ativo(self):
+        self.assertEqual(self.cliente.get('/api/me/').status_code, 200)
+        resposta = self.cliente.post('/api/salvar-formacao/', {'formationId': self.formacao.pk})
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_usuario_removido(self):
+        self.usuario.delete()
+        self.assertNaoAutenticado()
+
+    def test_usuario_inativo(self):
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertNaoAutenticado()
+        resposta = self.cliente.post('/api/elencos/', {'nome_elenco': 'Novo FC', 'tecnico': self.usuario.pk})
+        self.assertEqual(resposta.status_code, 401)
+
+
+# ==============================================================================
+# LEITURA DO CORPO DA CLASSIFICAÇÃO EM LOTE
+# ==============================================================================
+
+class LerRegistrosTests(TestCase):
+
+    def ler(self, corpo, tamanho_maximo=1024):
+        return list(ler_registros(io.BytesIO(corpo.encode() if isinstance(corpo, str) else corpo), tamanho_maximo))
+
+    def test_array_e_ndjson(self):
+        esperado = [{'nome': 'Ana'}, {'nome': 'Bia'}]
+        self.assertEqual(self.ler(' [{"nome": "Ana"}, {"nome": "Bia"}] \n'), esperado)
+        self.assertEqual(self.ler('\ufeff{"nome": "Ana"}\n\n{"nome": "Bia"}'), esperado)
+
+    def test_registros_cortados_entre_blocos(self):
+        registros = [{'nome': f'Jogador {n} – São Paulo', 'velocidade': n} for n in range(20)]
+        array = json.dumps(registros, ensure_ascii=False)
+        ndjson = '\n'.join(json.dumps(r, ensure_ascii=False) for r in registros)
+        # Blocos de 1 a 7 bytes cortam números, strings e caracteres multibyte.
+        for tamanho in range(1, 8):
+            with self.subTest(tamanho=tamanho), mock.patch.object(classificacao_lote, 'TAMANHO_BLOCO', tamanho):
+                self.assertEqual(self.ler(array), registros)
+                self.assertEqual(self.ler(ndjson), registros)
+
+    def test_linha_invalida_vira_erro_do_registro(self):
+        registros = self.ler('{"nome": "Ana"}\n{"nome": \n{"nome": "Bia"}\n')
+        self.assertEqual(registros[0], {'nome': 'Ana'})
+        self.assertIsInstance(registros[1], ErroLeitura)
+        self.assertEqual(registros[2], {'nome': 'Bia'})
+
+    def test_caractere_cortado_no_fim_do_corpo(self):
+        # Só o primeiro byte de "ã" chegou: o registro não pode sair como válido.
+        corpo = '{"nome": "Ana"}\n{"nome": "Bia"}'.encode() + 'ã'.encode()[:1]
+        registros = self.ler(corpo)
+        self.assertEqual(registros[0], {'nome': 'Ana'})
+        self.assertEqual(len(registros), 2)
+        self.assertIsInstance(registros[1], ErroLeitura)
+
+    def test_registro_maior_que_o_limite(self):
+        grande = json.dumps({'nome': 'x' * 200})
+        with mock.patch.object(classificacao_lote, 'TAMANHO_BLOCO', 16):
+            with self.assertRaises(ErroLeitura):
+                self.ler(f'[{grande}]', tamanho_maximo=64)
+            with self.assertRaises(ErroLeitura):
+                self.ler(grande, tamanho_maximo=64)
+
+    def test_array_nao_fechado(self):
+        registros = ler_registros(io.BytesIO(b'[{"nome": "Ana"}, {"nome": "Bia"}'), 1024)
+        self.assertEqual(next(registros), {'nome': 'Ana'})
+        with self.assertRaises(ErroLeitura):
+            list(registros)
+
+
+# ==============================================================================
+# CONTROLE DE ADMISSÃO
+# ==============================================================================
+
+class _ViewLimitada(AdmissaoMixin, APIView):
+    permission_classes = [AllowAny]
+    admissao_nome = 'teste'
+    # Evento que segura as requisições admitidas (None: respondem na hora).
+    segurar = None
+
+    def get(self, request):
+        if self.segurar is not None:
+            self.segurar.wait(5)
+        return Response({'ok': True})
+
+
+class _ViewComum(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response({'ok': True})
+
+
+class LimitadorAdmissaoTests(TestCase):
+
+    def setUp(self):
+        self.threads = []
+        self.addCleanup(self.aguardar_threads)
+
+    def aguardar_threads(self):
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    def enfileirar(self, limitador, usuario, ao_entrar=None):
+        """ Coloca `usuario` na fila numa thread e só retorna quando ele já está esperando. """
+        na_fila = limitador.estatisticas()['na_fila']
+
+        def executar():
+            try:
+                inicio = limitador.entrar(usuario)
+            except ServicoSobrecarregado:
+                return
+            if ao_entrar is not None:
+                ao_entrar(usuario)
+            limitador.sair(inicio)
+
+        thread = threading.Thread(target=executar)
+        thread.start()
+        self.threads.append(thread)
+        limite = time.monotonic() + 5
+        while limitador.estatisticas()['na_fila'] == na_fila:
+            self.assertLess(time.monotonic(), limite, "A requisição não entrou na fila.")
+            time.sleep(0.001)
+
+    def test_vagas_liberadas_em_rodizio_entre_usuarios(self):
+        limitador = LimitadorAdmissao('teste', concorrencia=1, fila=10, por_usuario=5, espera=5)
+        inicio = limitador.entrar('ocupante')
+        ordem = []
+        for usuario in ['a', 'a', 'a', 'b', 'c', 'b']:
+            self.enfileirar(limitador, usuario, ordem.append)
+        limitador.sair(inicio)
+        self.aguardar_threads()
+
+        self.assertEqual(ordem, ['a', 'b', 'c', 'a', 'b', 'a'])
+        estatisticas = limitador.estatisticas()
+        self.assertEqual((estatisticas['em_execucao'], estatisticas['na_fila']), (0, 0))
+        self.assertEqual(estatisticas['admitidas_apos_espera'], 6)
+
+    def test_fila_limitada_no_total_e_por_usuario(self):
+        limitador = LimitadorAdmissao('teste', concorrencia=1, fila=2, por_usuario=1, espera=5)
+        inicio = limitador.entrar('ocupante')
+        self.enfileirar(limitador, 'a')
+        with self.assertRaises(ServicoSobrecarregado):
+            limitador.entrar('a')
+        self.enfileirar(limitador, 'b')
+        with self.assertRaises(ServicoSobrecarregado) as contexto:
+            limitador.entrar('c')
+        # Sem duração medida ainda, 1s por requisição: 2 na fila + 1, com 1 vaga.
+        self.assertEqual(contexto.exception.wait, 3)
+        limitador.sair(inicio)
+        self.aguardar_threads()
+
+        estatisticas = limitador.estatisticas()
+        self.assertEqual(estatisticas['rejeitadas_limite_usuario'], 1)
+        self.assertEqual(estatisticas['rejeitadas_fila_cheia'], 1)
+        self.assertEqual(estatisticas['admitidas'], 3)
+        self.assertEqual(estatisticas['pico_fila'], 2)
+
+    def test_espera_esgotada(self):
+        limitador = LimitadorAdmissao('teste', concorrencia=1, fila=1, por_usuario=1, espera=0.01)
+        limitador.entrar('ocupante')
+        with self.assertRaises(ServicoSobrecarregado):
+            limitador.entrar('a')
+        estatisticas = limitador.estatisticas()
+        self.assertEqual((estatisticas['rejeitadas_espera_esgotada'], estatisticas['na_fila']), (1, 0))
+
+    def test_view_responde_503_com_retry_after(self):
+        limitador = LimitadorAdmissao('teste', concorrencia=1, fila=0, por_usuario=1, espera=5)
+        self.addCleanup(setattr, admissao, '_limitador', None)
+        admissao._limitador = limitador
+        view = _ViewLimitada.as_view()
+
+        self.assertEqual(view(APIRequestFactory().get('/')).status_code, 200)
+        self.assertEqual(limitador.estatisticas()['em_execucao'], 0)
+
+        inicio = limitador.entrar('ocupante')
+        resposta = view(APIRequestFactory().get('/'))
+        self.assertEqual(resposta.status_code, 503)
+        self.assertEqual(resposta['Retry-After'], '1')
+        limitador.sair(inicio)
+
+    @override_settings(IA_ADMISSAO={'concorrencia': 2, 'fila': 3, 'por_usuario': 5, 'espera': 5.0})
+    def test_views_comuns_atendidas_com_a_ia_lotada(self):
+        """ Um worker gthread com as threads da IA mais uma de reserva (como no gunicorn.conf.py). """
+        self.addCleanup(setattr, admissao, '_limitador', None)
+        admissao._limitador = None
+        self.assertEqual(threads_ocupadas_pela_ia(), 5)
+        pool = ThreadPoolExecutor(threads_ocupadas_pela_ia() + 1)
+        self.addCleanup(pool.shutdown)
+        segurar = threading.Event()
+        self.addCleanup(segurar.set)
+        self.addCleanup(setattr, _ViewLimitada, 'segurar', None)
+        _ViewLimitada.segurar = segurar
+        ia, comum = _ViewLimitada.as_view(), _ViewComum.as_view()
+
+        # Duas executando e três na fila: a IA ocupa 5 das 6 threads.
+        lotacao = [pool.submit(ia, APIRequestFactory().get('/')) for _ in range(threads_ocupadas_pela_ia())]
+        limite = time.monotonic() + 5
+        while (admissao.estatisticas()['em_execucao'], admissao.estatisticas()['na_fila']) != (2, 3):
+            self.assertLess(time.monotonic(), limite, "A IA não lotou.")
+            time.sleep(0.001)
+
+        # O excedente de IA é recusado na hora pela thread de reserva...
+        inicio = time.monotonic()
+        self.assertEqual(pool.submit(ia, APIRequestFactory().get('/')).result(timeout=5).status_code, 503)
+        self.assertLess(time.monotonic() - inicio, 1)
+        # ...que continua livre para as outras views.
+        self.assertEqual(pool.submit(comum, APIRequestFactory().get('/')).result(timeout=1).status_code, 200)
+
+        segurar.set()
+        self.assertEqual([futuro.result(timeout=5).status_code for futuro in lotacao], [200] * 5)
+        self.assertEqual(admissao.estatisticas()['admitidas_por_endpoint'], {'teste': 5})
+
+
+# ==============================================================================
+# RÉPLICAS DE LEITURA
+# ==============================================================================
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'replicas': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'testes-replicas'}},
+    DB_REPLICAS_PRIMARIO_APOS_ESCRITA=30,
+)
+class ReplicaMiddlewareTests(TestCase):
+    """ O middleware é exercitado direto, com duas réplicas fictícias (nenhuma consulta é feita). """
+
+    def setUp(self):
+        replicas = mock.patch('api.replicas.aliases_replicas', return_value=['replica_1', 'replica_2'])
+        replicas.start()
+        self.addCleanup(replicas.stop)
+        self.fabrica = RequestFactory()
+        self.listar = JogadorViewSet.as_view({'get': 'list', 'post': 'create'})
+        self.usuarios = [User.objects.create_user(email=f'leitor{n}@exemplo.com', password='senha-forte-123') for n in range(2)]
+
+    def requisitar(self, metodo, usuario=None, status=200, **extra):
+        """ Passa uma requisição pelo middleware e devolve os bancos escolhidos para as leituras. """
+        if usuario is not None:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(usuario)}'
+        request = getattr(self.fabrica, metodo)('/api/jogadores/', **extra)
+        leituras = []
+
+        def atender(request):
+            middleware.process_view(request, self.listar, (), {})
+            roteador = ReplicaRouter()
+            leituras.extend(roteador.db_for_read(Jogador) for _ in range(20))
+            return HttpResponse(status=status)
+
+        middleware = ReplicaMiddleware(atender)
+        middleware(request)
+        return leituras
+
+    def test_uma_replica_por_requisicao(self):
+        for _ in range(10):
+            leituras = self.requisitar('get', self.usuarios[0])
+            self.assertIn(leituras[0], ('replica_1', 'replica_2'))
+            self.assertEqual(set(leituras), {leituras[0]})
+
+    def test_usuario_le_as_proprias_escritas(self):
+        self.requisitar('post', self.usuarios[0], status=201)
+        self.assertEqual(set(self.requisitar('get', self.usuarios[0])), {'default'})
+        # Outro usuário e escritas que falharam não mudam o roteamento.
+        self.assertNotEqual(set(self.requisitar('get', self.usuarios[1])), {'default'})
+        self.requisitar('post', self.usuarios[1], status=400)
+        self.assertNotEqual(set(self.requisitar('get', self.usuarios[1])), {'default'})
+
+    def test_cabecalho_forca_o_principal(self):
+        self.assertEqual(set(self.requisitar('get', self.usuarios[0], HTTP_X_LER_PRIMARIO='1')), {'default'})
+
+    def test_sem_requisicao_leituras_no_principal(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Jogador), 'default')
+
+
+# ==============================================================================
+# RENDERIZAÇÃO JSON
+# ==============================================================================
+
+class ORJSONRendererTests(TestCase):
+
+    def test_mesmo_conteudo_do_jsonrenderer(self):
+        dados = {'nome': 'Jo\u2028ão', 'nota': 1e-05, 'grande': 1e16, 'lista': [None, 2.5, True], 1: 'chave int'}
+        rapido = ORJSONRenderer().render(dados)
+        drf = JSONRenderer().render(dados)
+        self.assertEqual(json.loads(rapido), json.loads(drf))
+        self.assertIn(b'\\u2028', rapido)
+
+    def test_float_nao_finito_e_recusado_como_no_drf(self):
+        for valor in (float('nan'), float('inf'), float('-inf')):
+            dados = {'itens': [{'distancia': valor}, {'distancia': None}]}
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(dados)
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render(dados)
+
+    def test_desligado_por_padrao(self):
+        self.assertNotIn(ORJSONRenderer, api_settings.DEFAULT_RENDERER_CLASSES)
+
+
+# ==============================================================================
+# PERFILAMENTO
+# ==============================================================================
+
+class ListarPerfisTests(TestCase):
+
+    def test_perfil_apagado_durante_a_listagem_e_ignorado(self):
+        with tempfile.TemporaryDirectory() as diretorio, override_settings(PERFILAMENTO_DIR=diretorio):
+            for perfil_id in ('1-1', '2-1'):
+                (Path(diretorio) / f'{perfil_id}.json').write_text(json.dumps({'id': perfil_id}))
+            # Outro worker apaga um arquivo entre o glob e o stat (limpeza do anel).
+            apagado = Path(diretorio) / '0-1.json'
+            glob_original = Path.glob
+            with mock.patch.object(Path, 'glob', lambda caminho, padrao: [*glob_original(caminho, padrao), apagado]):
+                perfis = listar_perfis()
+        self.assertCountEqual([perfil['id'] for perfil in perfis], ['1-1', '2-1'])
@@ -5,7 +5,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     ElencoViewSet, JogadorViewSet, RegisterView, UserMeView,
     FormacaoViewSet, SalvarFormacaoView, FormacaoEscolhidaView,
-    SugerirTaticaView, ProcurarTalentosView
+    SugerirTaticaView, ProcurarTalentosView, SimularElencoView,
+    ClassificarJogadoresView, AdmissaoEstatisticasView, PerfisView, PerfilView
 
 )
 
@@ -24,4 +25,9 @@ urlpatterns = [
     path('formacao-escolhida/', FormacaoEscolhidaView.as_view(), name='formacao_escolhida'),
     path('sugerir-tatica/', SugerirTaticaView.as_view(), name='sugerir_tatica'),
     path('procurar-talentos/', ProcurarTalentosView.as_view(), name='procurar_talentos'),
+    path('simular-elenco/', SimularElencoView.as_view(), name='simular_elenco'),
+    path('classificar-jogadores/', ClassificarJogadoresView.as_view(), name='classificar_jogadores'),
+    path('admissao/', AdmissaoEstatisticasView.as_view(), name='admissao_estatisticas'),
+    path('perfis/', PerfisView.as_view(), name='perfis'),
+    path('perfis/<str:perfil_id>/', PerfilView.as_view(), name='perfil'),
 ]
@@ -1,29 +1,36 @@
 # --- Imports do Django e DRF ---
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 
 # --- Imports de outros módulos do projeto ---
-from .models import Elenco, Jogador, Formacao, FormacaoEscolhida
+from .models import Elenco, EstatisticasElenco, Jogador, Formacao, FormacaoEscolhida
 from .filters import ElencoFilter, JogadorFilter
 
 # --- IMPORTAÇÃO CORRIGIDA DE SERIALIZERS ---
 from .serializers import (
     ElencoSerializer, JogadorSerializer, UserRegisterSerializer,
     UserMeSerializer, FormacaoSerializer, FormacaoEscolhidaSerializer,
-    MyTokenObtainPairSerializer
+    MyTokenObtainPairSerializer, CenarioSerializer
 )
 
 # --- IMPORTS PARA A LÓGICA DE IA ---
-from django.conf import settings
-from pathlib import Path
-from tensorflow.keras.models import load_model
-import joblib
-from .ia_logic import recomendar_formacao_com_ia 
+from .ia_modelos import obter_modelo_ia
+from .admissao import AdmissaoMixin, estatisticas as estatisticas_admissao
+from .listagem import ListagemRapidaMixin, decodificar_json
+from .perfilamento import caminho_perfil, listar_perfis, texto_pstats
+from .ia_logic import recomendar_formacao_com_ia, simular_cenarios
+from .classificacao_lote import classificar_em_lotes, gerar_ndjson, ler_registros
+from .scouting import ATRIBUTOS_SCOUTING, obter_indice
+from .estatisticas import recalcular_estatisticas, resumir
+from django.db.models import Count, Q, Sum
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -49,39 +56,103 @@ class UserMeView(APIView):
     
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        serializer = UserMeSerializer(request.user)
+        serializer = UserMeSerializer(request.user.usuario)
         return Response(serializer.data)
 
 # ==============================================================================
 # VIEWSETS PARA O CRUD (JOGADOR, ELENCO, FORMAÇÃO)
 # ==============================================================================
 
-class ElencoViewSet(viewsets.ModelViewSet):
+class ElencoViewSet(ListagemRapidaMixin, viewsets.ModelViewSet):
     serializer_class = ElencoSerializer
     permission_classes = [IsAuthenticated]
+    leitura_em_replica = ('list',)
     filter_backends = [DjangoFilterBackend]
     filterset_class = ElencoFilter
 
     def get_queryset(self):
-        return Elenco.objects.filter(tecnico=self.request.user)
+        return Elenco.objects.filter(tecnico_id=self.request.user.id)
 
     def perform_create(self, serializer):
-        serializer.save(tecnico=self.request.user)
+        serializer.save(tecnico=self.request.user.usuario)
+
+    @action(detail=True, methods=['get'])
+    def resumo(self, request, pk=None):
+        """ Resumo do elenco lido da linha de agregados, sem percorrer os jogadores. """
+        elenco = self.get_object()
+        try:
+            estatisticas = elenco.estatisticas
+        except EstatisticasElenco.DoesNotExist:
+            recalcular_estatisticas([elenco.pk])
+            estatisticas = EstatisticasElenco.objects.get(elenco=elenco)
+        return Response(resumir(estatisticas), status=status.HTTP_200_OK)
 
-class JogadorViewSet(viewsets.ModelViewSet):
+class JogadorViewSet(ListagemRapidaMixin, viewsets.ModelViewSet):
     serializer_class = JogadorSerializer
     permission_classes = [IsAuthenticated]
+    leitura_em_replica = ('list',)
     filter_backends = [DjangoFilterBackend]
     filterset_class = JogadorFilter
 
     def get_queryset(self):
         # Garante que o técnico só veja jogadores dos seus próprios elencos
-        return Jogador.objects.filter(elenco__tecnico=self.request.user)
-
-class FormacaoViewSet(ReadOnlyModelViewSet):
+        return Jogador.objects.filter(elenco__tecnico_id=self.request.user.id)
+
+    # Sem filter_backends: 'posicao' e 'idade' aqui filtram os similares, não o jogador de referência.
+    @action(detail=True, methods=['get'], filter_backends=[])
+    def similares(self, request, pk=None):
+        """
+        Busca no índice de scouting os jogadores (de qualquer elenco) mais parecidos
+        com este. De jogadores de outros técnicos só saem os atributos, sem nome,
+        nacionalidade ou elenco.
+        """
+        jogador = self.get_object()
+        try:
+            k = min(int(request.query_params.get('k', 10)), 100)
+            idade_min = request.query_params.get('idade_min')
+            idade_max = request.query_params.get('idade_max')
+            idade_min = int(idade_min) if idade_min else None
+            idade_max = int(idade_max) if idade_max else None
+        except ValueError:
+            return Response({'error': 'k, idade_min e idade_max devem ser números inteiros.'}, status=status.HTTP_400_BAD_REQUEST)
+        if k < 1:
+            return Response({'error': 'k deve ser maior que zero.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        vizinhos = obter_indice().buscar(
+            [getattr(jogador, atributo) for atributo in ATRIBUTOS_SCOUTING],
+            k=k,
+            posicao=request.query_params.get('posicao'),
+            idade_min=idade_min,
+            idade_max=idade_max,
+            excluir=[jogador.pk],
+        )
+
+        # O índice só guarda ids; os dados exibidos vêm do banco, o que também
+        # descarta jogadores removidos que o índice deste processo ainda não viu.
+        encontrados = Jogador.objects.select_related('elenco').in_bulk([jogador_id for jogador_id, _ in vizinhos])
+        resultado = []
+        for jogador_id, distancia in vizinhos:
+            similar = encontrados.get(jogador_id)
+            if similar is None:
+                continue
+            item = {
+                'posicao': similar.posicao,
+                **{atributo: getattr(similar, atributo) for atributo in ATRIBUTOS_SCOUTING},
+                'meu_elenco': similar.elenco.tecnico_id == request.user.id,
+                'distancia': round(distancia, 4),
+            }
+            if item['meu_elenco']:
+                item.update(id=similar.id, nome=similar.nome, nacionalidade=similar.nacionalidade,
+                            elenco=similar.elenco.nome_elenco)
+            resultado.append(item)
+        return Response(resultado, status=status.HTTP_200_OK)
+
+class FormacaoViewSet(ListagemRapidaMixin, ReadOnlyModelViewSet):
     queryset = Formacao.objects.all()
     serializer_class = FormacaoSerializer
     permission_classes = []
+    leitura_em_replica = ('list', 'retrieve')
+    conversores_listagem = {'posicoes': decodificar_json}
 
 # ==============================================================================
 # VIEWS DE LÓGICA DE NEGÓCIO (SALVAR FORMAÇÃO, SUGESTÕES, ETC.)
@@ -97,38 +168,28 @@ class SalvarFormacaoView(APIView):
             formacao = Formacao.objects.get(id=formacao_id)
         except Formacao.DoesNotExist:
             return Response({'error': 'Formação não encontrada'}, status=status.HTTP_404_NOT_FOUND)
-        FormacaoEscolhida.objects.update_or_create(user=request.user, defaults={'formacao': formacao})
+        FormacaoEscolhida.objects.update_or_create(user=request.user.usuario, defaults={'formacao': formacao})
         return Response({'message': 'Formação salva com sucesso'}, status=status.HTTP_200_OK)
 
 class FormacaoEscolhidaView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
         try:
-            formacao_escolhida = FormacaoEscolhida.objects.select_related("formacao").get(user=request.user)
+            formacao_escolhida = FormacaoEscolhida.objects.select_related("formacao").get(user_id=request.user.id)
             serializer = FormacaoEscolhidaSerializer(formacao_escolhida)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except FormacaoEscolhida.DoesNotExist:
             return Response({'error': 'Nenhuma formação escolhida'}, status=status.HTTP_404_NOT_FOUND)
 
-class SugerirTaticaView(APIView):
+class SugerirTaticaView(AdmissaoMixin, APIView):
     """ View que usa a lógica de IA para sugerir táticas baseadas no elenco do usuário. """
     permission_classes = [IsAuthenticated]
-
-    try:
-        BASE_DIR = settings.BASE_DIR
-        model_path = BASE_DIR / 'ia_models' / 'modelspi2025_v12.h5'
-        scaler_path = BASE_DIR / 'ia_models' / 'scaler_wh.pkl'
-
-        modelo_ia_global = load_model(model_path)
-        scaler_ia_global = joblib.load(scaler_path)
-        logging.info("✅ Modelo de IA 'Procurando Talentos' e Scaler carregados com sucesso para SugerirTaticaView.")
-    except Exception as e:
-        modelo_ia_global = None
-        scaler_ia_global = None
-        logging.error(f"❌ ERRO ao carregar modelo de IA e Scaler para SugerirTaticaView: {e}")
+    admissao_nome = 'sugerir_tatica'
+    leitura_em_replica = ('get',)
 
     def get(self, request):
-        if not SugerirTaticaView.modelo_ia_global or not SugerirTaticaView.scaler_ia_global:
+        modelo, scaler = obter_modelo_ia()
+        if not modelo or not scaler:
             logging.error("Serviço de IA indisponível para SugerirTaticaView.")
             return Response(
                 {"error": "Serviço de IA indisponível. Verifique os logs do servidor."},
@@ -136,24 +197,47 @@ class SugerirTaticaView(APIView):
             )
 
         try:
-            jogadores_qs = Jogador.objects.filter(elenco__tecnico=request.user)
+            # Pré-triagem pelos agregados: sem jogadores de linha não há o que classificar.
+            # É a única que eles permitem: contagem_grupos vem da posição cadastrada, não
+            # dos grupos da IA, então o elenco é lido e classificado abaixo como antes.
+            totais = Elenco.objects.filter(tecnico_id=request.user.id).aggregate(
+                jogadores=Sum('estatisticas__total_jogadores', default=0),
+                goleiros=Sum('estatisticas__total_goleiros', default=0),
+                sem_estatisticas=Count('id', filter=Q(estatisticas__isnull=True)),
+            )
+            if not totais['sem_estatisticas'] and totais['jogadores'] == totais['goleiros']:
+                return Response({
+                    'sugestoes': {},
+                    'no_match': True,
+                    'message': 'Nenhum jogador de linha encontrado para análise. Adicione jogadores ao seu elenco.'
+                }, status=status.HTTP_200_OK)
+
+            jogadores_qs = Jogador.objects.filter(elenco__tecnico_id=request.user.id)
             lista_jogadores_serializada = list(jogadores_qs.values(
                 'nome', 'posicao', 'altura', 'peso', 'velocidade', 'chute', 'passe', 'defesa', 'goleiro'
             ))
             
             logging.info(f"SugerirTaticaView: Jogadores do elenco encontrados: {len(lista_jogadores_serializada)}")
             
+            # ?robustez=1 inclui o score esperado e a chance de cada tática ser a melhor.
+            robustez = request.query_params.get('robustez') in ('1', 'true')
             resultado_sugestao = recomendar_formacao_com_ia(
                 lista_jogadores_serializada,
-                SugerirTaticaView.modelo_ia_global,
-                SugerirTaticaView.scaler_ia_global
+                modelo,
+                scaler,
+                amostras_robustez=settings.IA_ROBUSTEZ_AMOSTRAS if robustez else 0
             )
             
-            return Response({
+            resposta = {
                 'sugestoes': resultado_sugestao.get('sugestoes', {}),
                 'no_match': resultado_sugestao.get('no_match', True),
-                'message': resultado_sugestao.get('message', 'Erro ao processar sugestões.')
-            }, status=status.HTTP_200_OK)
+                'message': resultado_sugestao.get('message', 'Erro ao processar sugestões.'),
+                # Onze escolhido por tática ('score', 'contagem_grupos', 'titulares'); None com até 10 jogadores de linha.
+                'melhores_xi': resultado_sugestao.get('melhores_xi'),
+            }
+            if robustez:
+                resposta['robustez'] = resultado_sugestao.get('robustez', {})
+            return Response(resposta, status=status.HTTP_200_OK)
 
         except Exception as e:
             logging.exception("Ocorreu um erro interno na SugerirTaticaView:")
@@ -162,30 +246,96 @@ class SugerirTaticaView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-# ==============================================================================
-# VIEW DE ANÁLISE DE TALENTOS (USA LÓGICA DE IA PARA CLASSIFICAR JOGADORES)
-# ==============================================================================
+class SimularElencoView(AdmissaoMixin, APIView):
+    """ What-if: avalia contratações, dispensas e edições hipotéticas sem alterar o elenco. """
+    permission_classes = [IsAuthenticated]
+    admissao_nome = 'simular_elenco'
+    max_cenarios = 50
+
+    def post(self, request):
+        modelo, scaler = obter_modelo_ia()
+        if not modelo or not scaler:
+            logging.error("Serviço de IA indisponível para SimularElencoView.")
+            return Response(
+                {"error": "Serviço de IA indisponível. Verifique os logs do servidor."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        # Aceita {"cenarios": [...]} ou um único cenário no corpo.
+        dados = request.data
+        cenarios = dados['cenarios'] if isinstance(dados, dict) and 'cenarios' in dados else [dados]
+        serializer = CenarioSerializer(data=cenarios, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if len(serializer.validated_data) > self.max_cenarios:
+            return Response({'error': f'Máximo de {self.max_cenarios} cenários por requisição.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            jogadores = list(Jogador.objects.filter(elenco__tecnico_id=request.user.id).values(
+                'id', 'nome', 'posicao', 'altura', 'peso', 'velocidade', 'chute', 'passe', 'defesa', 'goleiro'
+            ))
+            ids_elenco = {jogador['id'] for jogador in jogadores}
+            citados = {
+                jogador_id
+                for cenario in serializer.validated_data
+                for jogador_id in cenario['remover'] + [edicao['id'] for edicao in cenario['editar']]
+            }
+            desconhecidos = sorted(citados - ids_elenco)
+            if desconhecidos:
+                return Response({'error': f'Jogadores não encontrados no seu elenco: {desconhecidos}'}, status=status.HTTP_400_BAD_REQUEST)
+
+            resultado = simular_cenarios(
+                jogadores,
+                serializer.validated_data,
+                modelo,
+                scaler
+            )
+            return Response(resultado, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logging.exception("Ocorreu um erro interno na SimularElencoView:")
+            return Response(
+                {"error": f"Ocorreu um erro interno ao simular cenários. Detalhe: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
-class ProcurarTalentosView(APIView):
+class ClassificarJogadoresView(AdmissaoMixin, APIView):
+    """
+    Classificação em massa de jogadores externos, sem criar registros. O corpo é
+    um array JSON ou NDJSON (um jogador por linha) e a resposta é NDJSON, gerada
+    conforme o corpo é lido e classificado em lotes.
+    """
     permission_classes = [IsAuthenticated]
+    admissao_nome = 'classificar_jogadores'
 
-    try:
-        BASE_DIR = settings.BASE_DIR
-        model_path = BASE_DIR / 'ia_models' / 'modelspi2025_v12.h5'
-        scaler_path = BASE_DIR / 'ia_models' / 'scaler_wh.pkl'
-        
-        modelo_ia_talentos = load_model(model_path)
-        scaler_ia_talentos = joblib.load(scaler_path)
-        logging.info("✅ Modelo de IA 'Procurar Talentos' carregado com sucesso para ProcurarTalentosView.")
+    def post(self, request):
+        modelo, scaler = obter_modelo_ia()
+        if not modelo or not scaler:
+            logging.error("Serviço de IA indisponível para ClassificarJogadoresView.")
+            return Response(
+                {"error": "Serviço de IA indisponível. Verifique os logs do servidor."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
 
-    except Exception as e:
-        modelo_ia_talentos = None
-        scaler_ia_talentos = None
-        logging.error(f"❌ ERRO ao carregar modelo de IA para ProcurarTalentosView: {e}")
+        # O corpo é lido direto do stream (request.data carregaria tudo na memória).
+        registros = ler_registros(request, settings.IA_TAMANHO_MAXIMO_REGISTRO)
+        resultados = classificar_em_lotes(registros, modelo, scaler, settings.IA_LOTE_CLASSIFICACAO)
+        resposta = StreamingHttpResponse(gerar_ndjson(resultados), content_type='application/x-ndjson')
+        resposta['X-Accel-Buffering'] = 'no'
+        return resposta
 
+# ==============================================================================
+# VIEW DE ANÁLISE DE TALENTOS (USA LÓGICA DE IA PARA CLASSIFICAR JOGADORES)
+# ==============================================================================
+
+class ProcurarTalentosView(AdmissaoMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    admissao_nome = 'procurar_talentos'
+    leitura_em_replica = ('get',)
 
     def get(self, request):
-        if not self.modelo_ia_talentos or not self.scaler_ia_talentos:
+        modelo, scaler = obter_modelo_ia()
+        if not modelo or not scaler:
             logging.error("Serviço de IA de talentos indisponível.")
             return Response(
                 {"error": "Serviço de IA de talentos indisponível. Verifique os logs do servidor."},
@@ -193,7 +343,7 @@ class ProcurarTalentosView(APIView):
             )
 
         try:
-            jogadores_qs = Jogador.objects.filter(elenco__tecnico=request.user)
+            jogadores_qs = Jogador.objects.filter(elenco__tecnico_id=request.user.id)
             if not jogadores_qs.exists():
                 return Response({"error": "Seu elenco não possui jogadores para a análise."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -205,8 +355,8 @@ class ProcurarTalentosView(APIView):
 
             resultado_ia = recomendar_formacao_com_ia(
                 lista_jogadores_serializada,
-                self.modelo_ia_talentos,
-                self.scaler_ia_talentos
+                modelo,
+                scaler
             )
 
             relatorio_talentos = []
@@ -244,4 +394,39 @@ class ProcurarTalentosView(APIView):
             return Response(
                 {"error": f"Ocorreu um erro interno na análise de talentos. Detalhe: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+class AdmissaoEstatisticasView(APIView):
+    """ Contadores do controle de admissão das views de IA (do worker que atendeu). """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(estatisticas_admissao(), status=status.HTTP_200_OK)
+
+class PerfisView(APIView):
+    """ Perfis de requisição guardados pelo PerfilamentoMiddleware, do mais recente ao mais antigo. """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(listar_perfis(), status=status.HTTP_200_OK)
+
+class PerfilView(APIView):
+    """
+    Um perfil: resumo em JSON (funções por tempo acumulado e alocações), ou
+    ?formato=texto (saída do pstats) ou ?formato=prof (arquivo para snakeviz/pstats).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, perfil_id):
+        formato = request.query_params.get('formato', 'json')
+        if formato not in ('json', 'texto', 'prof'):
+            return Response({'error': "formato deve ser 'json', 'texto' ou 'prof'."}, status=status.HTTP_400_BAD_REQUEST)
+        caminho = caminho_perfil(perfil_id, 'json' if formato == 'json' else 'prof')
+        if caminho is None:
+            return Response({'error': 'Perfil não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+        if formato == 'prof':
+            return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=caminho.name)
+        if formato == 'texto':
+            return HttpResponse(texto_pstats(perfil_id), content_type='text/plain; charset=utf-8')
+        return HttpResponse(caminho.read_bytes(), content_type='application/json')
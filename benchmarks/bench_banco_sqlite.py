@@ -0,0 +1,150 @@
+"""
+Benchmark de concorrência leitura/escrita no SQLite: perfil padrão x perfil de
+produção (DJANGO_DB_PROFILE=producao, ver core/settings.py).
+
+Cada perfil roda num processo separado, com um banco temporário próprio.
+Escritores imitam o JogadorViewSet (busca + save de um jogador) e leitores
+imitam listagens/análises (jogadores de um técnico via .values()). Depois de
+cada operação as conexões são tratadas como no fim de uma requisição
+(close_old_connections), para que CONN_MAX_AGE tenha efeito.
+
+Uso:
+    python benchmarks/bench_banco_sqlite.py [--segundos 10] [--escritores 4] [--leitores 8]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+PERFIS = ['padrao', 'producao']
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def executar_perfil(args):
+    sys.path.insert(0, str(RAIZ))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections
+
+    settings.SCOUTING_INDEX_PATH = Path(args.diretorio) / 'scouting_index.joblib'
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+    from api.models import Elenco, Jogador, User
+
+    usuarios = User.objects.bulk_create([
+        User(email=f'bench{i}@exemplo.com', password='!') for i in range(args.elencos)
+    ])
+    elencos = Elenco.objects.bulk_create([
+        Elenco(tecnico=usuario, nome_elenco=f'Elenco {i}') for i, usuario in enumerate(usuarios)
+    ])
+    Jogador.objects.bulk_create([
+        Jogador(
+            elenco=elenco, nome=f'Jogador {n}', posicao='Meia', camisa=n, idade=25,
+            velocidade=random.randint(1, 10), chute=random.randint(1, 10),
+            passe=random.randint(1, 10), defesa=random.randint(1, 10),
+        )
+        for elenco in elencos for n in range(1, args.jogadores_por_elenco + 1)
+    ])
+    ids_usuarios = [u.id for u in usuarios]
+    ids_jogadores = list(Jogador.objects.values_list('id', flat=True))
+    close_old_connections()
+
+    fim = time.perf_counter() + args.segundos
+    resultados = {'leitura': [], 'escrita': []}
+    erros = {'leitura': 0, 'escrita': 0}
+    lock = threading.Lock()
+
+    def ler():
+        list(Jogador.objects.filter(elenco__tecnico_id=random.choice(ids_usuarios)).values(
+            'nome', 'posicao', 'altura', 'peso', 'velocidade', 'chute', 'passe', 'defesa', 'goleiro'
+        ))
+
+    def escrever():
+        jogador = Jogador.objects.get(pk=random.choice(ids_jogadores))
+        jogador.passe = random.randint(1, 10)
+        jogador.save()
+
+    def trabalhador(tipo, operacao):
+        latencias, falhas = [], 0
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            try:
+                operacao()
+                latencias.append(time.perf_counter() - inicio)
+            except OperationalError:
+                falhas += 1
+            finally:
+                close_old_connections()
+        with lock:
+            resultados[tipo].extend(latencias)
+            erros[tipo] += falhas
+
+    threads = [threading.Thread(target=trabalhador, args=('escrita', escrever)) for _ in range(args.escritores)]
+    threads += [threading.Thread(target=trabalhador, args=('leitura', ler)) for _ in range(args.leitores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    relatorio = {'perfil': settings.DB_PROFILE}
+    for tipo, latencias in resultados.items():
+        relatorio[tipo] = {
+            'ops_por_segundo': len(latencias) / args.segundos,
+            'p50_ms': statistics.median(latencias) * 1000 if latencias else 0.0,
+            'p95_ms': _percentil(latencias, 0.95) * 1000,
+            'erros': erros[tipo],
+        }
+    print(json.dumps(relatorio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--leitores', type=int, default=8)
+    parser.add_argument('--elencos', type=int, default=50)
+    parser.add_argument('--jogadores-por-elenco', type=int, default=25)
+    parser.add_argument('--perfil', choices=PERFIS, help=argparse.SUPPRESS)
+    parser.add_argument('--diretorio', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.perfil:
+        executar_perfil(args)
+        return
+
+    relatorios = []
+    for perfil in PERFIS:
+        with tempfile.TemporaryDirectory() as diretorio:
+            env = dict(os.environ, DJANGO_DB_PROFILE=perfil, DJANGO_DB_NAME=str(Path(diretorio) / 'bench.sqlite3'))
+            comando = [sys.executable, __file__, '--perfil', perfil, '--diretorio', diretorio] + sys.argv[1:]
+            print(f"Executando perfil '{perfil}'...", flush=True)
+            saida = subprocess.run(comando, env=env, capture_output=True, text=True, check=True).stdout
+            relatorios.append(json.loads(saida.strip().splitlines()[-1]))
+
+    print(f"\n{'perfil':<10} {'tipo':<8} {'ops/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'erros':>7}")
+    for relatorio in relatorios:
+        for tipo in ('leitura', 'escrita'):
+            r = relatorio[tipo]
+            print(f"{relatorio['perfil']:<10} {tipo:<8} {r['ops_por_segundo']:>10.1f} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['erros']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark de carga mista leitura/escrita com e sem réplicas de leitura
+(DJANGO_DB_REPLICAS, ver api/replicas.py).
+
+Cada modo roda num processo separado, com um banco temporário próprio.
+Escritores imitam o JogadorViewSet (busca + save de um jogador) no banco
+principal. Leitores imitam as análises (SugerirTaticaView/ProcurarTalentosView:
+jogadores de um técnico via .values()) e as listagens (todos os jogadores de
+vários elencos), dentro de em_replica(); sem réplicas configuradas essas
+leituras vão para o principal. Com réplicas, uma thread roda
+sincronizar_replicas a cada --sincronizar-a-cada segundos durante a medição.
+
+Uso:
+    python benchmarks/bench_replicas.py [--segundos 10] [--escritores 4] [--leitores 8] [--replicas 2]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+MODOS = ['sem_replicas', 'com_replicas']
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def executar_modo(args):
+    sys.path.insert(0, str(RAIZ))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import OperationalError, close_old_connections
+
+    from api.replicas import aliases_replicas, em_replica
+
+    settings.SCOUTING_INDEX_PATH = Path(args.diretorio) / 'scouting_index.joblib'
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+    from api.models import Elenco, Jogador, User
+
+    usuarios = User.objects.bulk_create([
+        User(email=f'bench{i}@exemplo.com', password='!') for i in range(args.elencos)
+    ])
+    elencos = Elenco.objects.bulk_create([
+        Elenco(tecnico=usuario, nome_elenco=f'Elenco {i}') for i, usuario in enumerate(usuarios)
+    ])
+    Jogador.objects.bulk_create([
+        Jogador(
+            elenco=elenco, nome=f'Jogador {n}', posicao='Meia', camisa=n, idade=25,
+            velocidade=random.randint(1, 10), chute=random.randint(1, 10),
+            passe=random.randint(1, 10), defesa=random.randint(1, 10),
+        )
+        for elenco in elencos for n in range(1, args.jogadores_por_elenco + 1)
+    ])
+    ids_usuarios = [u.id for u in usuarios]
+    ids_jogadores = list(Jogador.objects.values_list('id', flat=True))
+    replicas = aliases_replicas()
+    if replicas:
+        call_command('sincronizar_replicas', verbosity=0, stdout=open(os.devnull, 'w'))
+    close_old_connections()
+
+    fim = time.perf_counter() + args.segundos
+    resultados = {'analise': [], 'listagem': [], 'escrita': []}
+    erros = {tipo: 0 for tipo in resultados}
+    lock = threading.Lock()
+
+    def analisar():
+        with em_replica():
+            list(Jogador.objects.filter(elenco__tecnico_id=random.choice(ids_usuarios)).values(
+                'nome', 'posicao', 'altura', 'peso', 'velocidade', 'chute', 'passe', 'defesa', 'goleiro'
+            ))
+
+    def listar():
+        with em_replica():
+            list(Jogador.objects.filter(elenco__tecnico_id__in=random.sample(ids_usuarios, 10)).values())
+
+    def escrever():
+        jogador = Jogador.objects.get(pk=random.choice(ids_jogadores))
+        jogador.passe = random.randint(1, 10)
+        jogador.save()
+
+    def trabalhador(tipo, operacao):
+        latencias, falhas = [], 0
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            try:
+                operacao()
+                latencias.append(time.perf_counter() - inicio)
+            except OperationalError:
+                falhas += 1
+            finally:
+                close_old_connections()
+        with lock:
+            resultados[tipo].extend(latencias)
+            erros[tipo] += falhas
+
+    def sincronizador():
+        sincronizacoes = 0
+        while time.perf_counter() + args.sincronizar_a_cada < fim:
+            time.sleep(args.sincronizar_a_cada)
+            call_command('sincronizar_replicas', stdout=open(os.devnull, 'w'))
+            sincronizacoes += 1
+        resultados['sincronizacoes'] = sincronizacoes
+
+    threads = [threading.Thread(target=trabalhador, args=('escrita', escrever)) for _ in range(args.escritores)]
+    threads += [
+        threading.Thread(target=trabalhador, args=('analise' if i % 2 == 0 else 'listagem', analisar if i % 2 == 0 else listar))
+        for i in range(args.leitores)
+    ]
+    if replicas and args.sincronizar_a_cada:
+        threads.append(threading.Thread(target=sincronizador))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    relatorio = {'modo': args.modo, 'replicas': len(replicas), 'sincronizacoes': resultados.pop('sincronizacoes', 0)}
+    for tipo, latencias in resultados.items():
+        relatorio[tipo] = {
+            'ops_por_segundo': len(latencias) / args.segundos,
+            'p50_ms': statistics.median(latencias) * 1000 if latencias else 0.0,
+            'p95_ms': _percentil(latencias, 0.95) * 1000,
+            'erros': erros[tipo],
+        }
+    print(json.dumps(relatorio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--leitores', type=int, default=8)
+    parser.add_argument('--replicas', type=int, default=2)
+    parser.add_argument('--sincronizar-a-cada', type=float, default=2.0, help="segundos entre sincronizações (0 desliga)")
+    parser.add_argument('--perfil-banco', choices=['padrao', 'producao'], default='padrao', help="DJANGO_DB_PROFILE")
+    parser.add_argument('--elencos', type=int, default=50)
+    parser.add_argument('--jogadores-por-elenco', type=int, default=25)
+    parser.add_argument('--modo', choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument('--diretorio', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        executar_modo(args)
+        return
+
+    relatorios = []
+    for modo in MODOS:
+        with tempfile.TemporaryDirectory() as diretorio:
+            replicas = [str(Path(diretorio) / f'replica_{n}.sqlite3') for n in range(1, args.replicas + 1)]
+            env = dict(
+                os.environ,
+                DJANGO_DB_PROFILE=args.perfil_banco,
+                DJANGO_DB_NAME=str(Path(diretorio) / 'bench.sqlite3'),
+                DJANGO_DB_REPLICAS=','.join(replicas) if modo == 'com_replicas' else '',
+            )
+            comando = [sys.executable, __file__, '--modo', modo, '--diretorio', diretorio] + sys.argv[1:]
+            print(f"Executando modo '{modo}'...", flush=True)
+            saida = subprocess.run(comando, env=env, capture_output=True, text=True, check=True).stdout
+            relatorios.append(json.loads(saida.strip().splitlines()[-1]))
+
+    print(f"\n{'modo':<13} {'tipo':<9} {'ops/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'erros':>7}")
+    for relatorio in relatorios:
+        for tipo in ('analise', 'listagem', 'escrita'):
+            r = relatorio[tipo]
+            print(f"{relatorio['modo']:<13} {tipo:<9} {r['ops_por_segundo']:>10.1f} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['erros']:>7}")
+        total = sum(relatorio[tipo]['ops_por_segundo'] for tipo in ('analise', 'listagem', 'escrita'))
+        print(f"{relatorio['modo']:<13} {'total':<9} {total:>10.1f}   ({relatorio['replicas']} réplicas, {relatorio['sincronizacoes']} sincronizações)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark das listagens: ModelSerializer + JSONRenderer (caminho anterior) x
+.values_list() + ORJSONRenderer (api/listagem.py e api/renderers.py).
+
+Cria um banco temporário com N jogadores num elenco e N formações, mede a
+mediana de consulta + serialização e de renderização de cada caminho e confere
+que as duas respostas têm o mesmo conteúdo (os bytes podem diferir na notação
+dos floats, ver api/renderers.py).
+
+Uso:
+    python benchmarks/bench_serializacao.py [--tamanhos 1000 10000] [--repeticoes 15]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _mediana_ms(funcao, repeticoes):
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+
+def preparar(diretorio, tamanho_maximo):
+    os.environ['DJANGO_DB_NAME'] = str(Path(diretorio) / 'db.sqlite3')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    sys.path.insert(0, str(RAIZ))
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    settings.SCOUTING_INDEX_PATH = Path(diretorio) / 'scouting_index.joblib'
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+    from api.models import Elenco, Formacao, Jogador, User
+    usuario = User.objects.create(email='bench@exemplo.com', password='!')
+    elenco = Elenco.objects.create(tecnico=usuario, nome_elenco='Elenco')
+    Jogador.objects.bulk_create([
+        Jogador(
+            elenco=elenco, nome=f'Jogador {n}', posicao=random.choice(['Zagueiro', 'Meia', 'Atacante']),
+            camisa=n, idade=random.randint(17, 38), nacionalidade='Brasil',
+            velocidade=random.randint(1, 10), chute=random.randint(1, 10),
+            passe=random.randint(1, 10), defesa=random.randint(1, 10),
+            perna_boa=random.choice(['DIR', 'ESQ']),
+        )
+        for n in range(1, tamanho_maximo + 1)
+    ], batch_size=1000)
+    Formacao.objects.bulk_create([
+        Formacao(
+            nome=f'Formação {n}', estilo='Ofensivo', dificuldade=n % 5, descricao='Descrição da formação ' * 5,
+            categoria='4-3-3', posicoes=[{'posicao': 'ZAG', 'x': 30, 'y': 80}] * 11,
+        )
+        for n in range(tamanho_maximo)
+    ], batch_size=1000)
+
+
+def medir(tamanho, repeticoes):
+    from rest_framework.renderers import JSONRenderer
+
+    from api.listagem import colunas_listagem, decodificar_json, mapeamento_listagem, montar_linhas
+    from api.models import Formacao, Jogador
+    from api.renderers import ORJSONRenderer
+    from api.serializers import FormacaoSerializer, JogadorSerializer
+
+    casos = [
+        ('jogadores', JogadorSerializer, Jogador.objects.order_by('pk')[:tamanho], {}),
+        ('formacoes', FormacaoSerializer, Formacao.objects.order_by('pk')[:tamanho], {'posicoes': decodificar_json}),
+    ]
+    resultados = []
+    for nome, serializer_class, queryset, conversores in casos:
+        mapeamento = mapeamento_listagem(serializer_class, conversores)
+        antes = lambda: serializer_class(queryset.all(), many=True).data
+        depois = lambda: montar_linhas(colunas_listagem(queryset.all(), mapeamento), mapeamento)
+        dados_antes, dados_depois = antes(), depois()
+        json_antes = JSONRenderer().render(dados_antes)
+        json_depois = ORJSONRenderer().render(dados_depois)
+
+        resultados.append({
+            'lista': nome,
+            'tamanho': tamanho,
+            'serializar_antes': _mediana_ms(antes, repeticoes),
+            'serializar_depois': _mediana_ms(depois, repeticoes),
+            'render_antes': _mediana_ms(lambda: JSONRenderer().render(dados_antes), repeticoes),
+            'render_depois': _mediana_ms(lambda: ORJSONRenderer().render(dados_depois), repeticoes),
+            'identico': json.loads(json_antes) == json.loads(json_depois),
+        })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeticoes', type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        preparar(diretorio, max(args.tamanhos))
+        resultados = [r for tamanho in args.tamanhos for r in medir(tamanho, args.repeticoes)]
+
+    print(f"\n{'lista':<10} {'N':>6} {'serializar (ms)':>22} {'render (ms)':>18} {'total (ms)':>20} {'speedup':>8} {'idêntico':>9}")
+    for r in resultados:
+        total_antes = r['serializar_antes'] + r['render_antes']
+        total_depois = r['serializar_depois'] + r['render_depois']
+        print(f"{r['lista']:<10} {r['tamanho']:>6} "
+              f"{r['serializar_antes']:>10.1f} -> {r['serializar_depois']:>7.1f} "
+              f"{r['render_antes']:>7.1f} -> {r['render_depois']:>6.1f} "
+              f"{total_antes:>9.1f} -> {total_depois:>7.1f} "
+              f"{total_antes / total_depois:>7.1f}x {'sim' if r['identico'] else 'NÃO':>9}")
+
+
+if __name__ == '__main__':
+    main()
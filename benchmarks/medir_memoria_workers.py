@@ -0,0 +1,95 @@
+"""
+Mede a memória dos workers do gunicorn com e sem preload (ver gunicorn.conf.py).
+
+Sobe o gunicorn duas vezes (GUNICORN_PRELOAD=0 e =1), espera os workers
+carregarem o modelo e reporta, por worker, USS (memória exclusiva) e PSS
+(memória compartilhada rateada entre os processos), além do PSS total.
+
+Uso:
+    python benchmarks/medir_memoria_workers.py [--workers 4] [--espera 30]
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import psutil
+
+RAIZ = Path(__file__).resolve().parent.parent
+MB = 1024 * 1024
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _aguardar_workers(master, quantidade, espera):
+    """Espera os workers subirem e o RSS deles parar de crescer (modelo carregado)."""
+    limite = time.monotonic() + espera
+    anterior = None
+    while time.monotonic() < limite:
+        workers = master.children()
+        if len(workers) == quantidade:
+            atual = sum(w.memory_info().rss for w in workers)
+            if anterior is not None and abs(atual - anterior) < MB:
+                return workers
+            anterior = atual
+        time.sleep(2)
+    return master.children()
+
+
+def medir(preload, args):
+    with tempfile.TemporaryDirectory() as diretorio:
+        env = dict(
+            os.environ,
+            GUNICORN_PRELOAD='1' if preload else '0',
+            GUNICORN_WORKERS=str(args.workers),
+            GUNICORN_BIND=f'127.0.0.1:{_porta_livre()}',
+            DJANGO_DB_NAME=str(Path(diretorio) / 'db.sqlite3'),
+        )
+        processo = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', str(RAIZ / 'gunicorn.conf.py')],
+            cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            master = psutil.Process(processo.pid)
+            workers = _aguardar_workers(master, args.workers, args.espera)
+            memorias = [w.memory_full_info() for w in workers]
+            memoria_master = master.memory_full_info()
+        finally:
+            processo.send_signal(signal.SIGTERM)
+            processo.wait(timeout=30)
+
+    return {
+        'preload': preload,
+        'workers': len(memorias),
+        'uss_medio': sum(m.uss for m in memorias) / max(1, len(memorias)) / MB,
+        'pss_medio': sum(m.pss for m in memorias) / max(1, len(memorias)) / MB,
+        'rss_medio': sum(m.rss for m in memorias) / max(1, len(memorias)) / MB,
+        'pss_total': (sum(m.pss for m in memorias) + memoria_master.pss) / MB,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--espera', type=float, default=60, help="segundos máximos para os workers carregarem")
+    args = parser.parse_args()
+
+    resultados = [medir(False, args), medir(True, args)]
+
+    print(f"\n{'preload':<8} {'workers':>7} {'USS/worker':>11} {'PSS/worker':>11} {'RSS/worker':>11} {'PSS total':>10}  (MB)")
+    for r in resultados:
+        print(f"{'sim' if r['preload'] else 'não':<8} {r['workers']:>7} {r['uss_medio']:>11.1f} "
+              f"{r['pss_medio']:>11.1f} {r['rss_medio']:>11.1f} {r['pss_total']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
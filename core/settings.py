@@ -10,9 +10,14 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import copy
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -56,11 +61,16 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Ficam fora da pilha quando desativados (sem DJANGO_DB_REPLICAS / PERFILAMENTO_ATIVO falso).
+    "api.replicas.ReplicaMiddleware",
+    "api.perfilamento.PerfilamentoMiddleware",
 ]
 
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+# X-Ler-Primario: leitura no banco principal com réplicas configuradas (api/replicas.py).
+CORS_ALLOW_HEADERS = (*default_headers, "x-ler-primario")
 
 ROOT_URLCONF = "core.urls"
 
@@ -89,10 +99,61 @@ WSGI_APPLICATION = "core.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("DJANGO_DB_NAME", BASE_DIR / "db.sqlite3"),
     }
 }
 
+# Perfil de produção (DJANGO_DB_PROFILE=producao): WAL para leitores não
+# bloquearem escritores, pragmas aplicados em cada nova conexão e conexões
+# persistentes com verificação de saúde. Ver benchmarks/bench_banco_sqlite.py.
+DB_PROFILE = os.environ.get("DJANGO_DB_PROFILE", "padrao")
+
+if DB_PROFILE == "producao":
+    DATABASES["default"].update({
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # BEGIN IMMEDIATE evita o "database is locked" ao promover leitura para escrita.
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA busy_timeout=20000;"
+                "PRAGMA cache_size=-64000;"
+                "PRAGMA mmap_size=268435456;"
+                "PRAGMA temp_store=MEMORY;"
+            ),
+        },
+    })
+
+# Réplicas de leitura (api/replicas.py): DJANGO_DB_REPLICAS com os caminhos das
+# cópias do banco, separados por vírgula, viram as conexões replica_1, replica_2...
+# com a mesma configuração do default. Recebem as leituras das views com
+# leitura_em_replica; escritas e leituras logo após uma escrita do mesmo usuário
+# (DB_REPLICAS_PRIMARIO_APOS_ESCRITA segundos) ficam no default. Cópias locais
+# são atualizadas com "python manage.py sincronizar_replicas".
+DB_REPLICAS = [caminho.strip() for caminho in os.environ.get("DJANGO_DB_REPLICAS", "").split(",") if caminho.strip()]
+DB_REPLICAS_PRIMARIO_APOS_ESCRITA = int(os.environ.get("DJANGO_DB_REPLICAS_PRIMARIO_APOS_ESCRITA", 30))
+
+# O instante da última escrita de cada usuário precisa ser visto por todos os
+# workers: cache em arquivos (DJANGO_DB_REPLICAS_CACHE_DIR) no cache "replicas".
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "replicas": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get(
+            "DJANGO_DB_REPLICAS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "footballtatics_replicas")
+        ),
+    },
+}
+
+for numero, caminho in enumerate(DB_REPLICAS, start=1):
+    DATABASES[f"replica_{numero}"] = {**copy.deepcopy(DATABASES["default"]), "NAME": caminho, "TEST": {"MIRROR": "default"}}
+
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -136,14 +197,25 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
+    # Usuário montado a partir das claims do token, sem consulta ao banco (ver api/authentication.py).
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
 }
 
+# API_JSON_RAPIDO=1 serializa as respostas JSON com o orjson (api/renderers.py).
+# Desligado por padrão: os floats saem em outra notação que a do JSONRenderer do
+# DRF (1e-05 vira 0.00001), o que pode quebrar clientes que comparam bytes.
+API_JSON_RAPIDO = os.environ.get('API_JSON_RAPIDO', '0') == '1'
+if API_JSON_RAPIDO:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=6), 
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -153,4 +225,47 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
-}
\ No newline at end of file
+    "TOKEN_USER_CLASS": "api.authentication.UsuarioToken",
+}
+
+# Segundos que o User completo fica em cache por processo (0 desliga o cache).
+AUTH_CACHE_USUARIO_TTL = 30
+
+# Inteligência artificial (carregados por api/ia_modelos.py). O formato do modelo
+# vem da extensão: .h5/.keras (Keras), .npz ou .joblib (alunos destilados por
+# deep_learning_model/distill_model.py).
+
+IA_MODELO_PATH = Path(os.environ.get('IA_MODELO_PATH', BASE_DIR / 'ia_models' / 'modelspi2025_v12.h5'))
+IA_SCALER_PATH = BASE_DIR / 'ia_models' / 'scaler_wh.pkl'
+
+# Classificação em massa (/api/classificar-jogadores/): registros por inferência
+# e tamanho máximo de um registro no corpo da requisição.
+IA_LOTE_CLASSIFICACAO = 1024
+IA_TAMANHO_MAXIMO_REGISTRO = 64 * 1024
+
+# Controle de admissão das views de IA (api/admissao.py): um orçamento por processo
+# para todas elas, com vagas de execução simultânea, fila total, fila por usuário
+# e espera máxima em segundos. Acima disso a resposta é 503 com Retry-After.
+# concorrencia + fila prende threads do worker: o gunicorn.conf.py dimensiona as
+# threads a partir daqui. Contadores em /api/admissao/.
+IA_ADMISSAO = {'concorrencia': 2, 'fila': 4, 'por_usuario': 2, 'espera': 5.0}
+
+# Amostras do Monte Carlo de robustez das táticas (/api/sugerir-tatica/?robustez=1).
+IA_ROBUSTEZ_AMOSTRAS = 2000
+
+
+# Perfilamento sob demanda (api/perfilamento.py): com PERFILAMENTO_ATIVO, perfila
+# requisições de staff com o cabeçalho "X-Perfilar: 1" e uma fração
+# PERFILAMENTO_AMOSTRAGEM das demais. Perfis em /api/perfis/ (staff).
+
+PERFILAMENTO_ATIVO = os.environ.get('PERFILAMENTO_ATIVO', '0') == '1'
+PERFILAMENTO_AMOSTRAGEM = float(os.environ.get('PERFILAMENTO_AMOSTRAGEM', 0))
+PERFILAMENTO_DIR = Path(os.environ.get('PERFILAMENTO_DIR', BASE_DIR / 'perfis'))
+PERFILAMENTO_MAXIMO = 50
+PERFILAMENTO_FRAMES_TRACEMALLOC = 10
+
+
+# Scouting (busca de jogadores similares)
+
+SCOUTING_INDEX_PATH = BASE_DIR / 'ia_models' / 'scouting_index.joblib'
+SCOUTING_LIMITE_PENDENTES = 1000
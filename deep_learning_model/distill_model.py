@@ -0,0 +1,223 @@
+"""
+Destilação do modelo v12 em modelos "alunos" bem menores.
+
+O v12 (build_model em train_model.py: 128-256-128 Dense com BatchNorm) é muito
+maior do que um problema de 7 features e 11 classes precisa. Este script treina
+alunos nas saídas do v12 (soft targets), compara cada um com o professor e
+salva o melhor num formato que o backend carrega via IA_MODELO_PATH
+(ver api/ia_modelos.py):
+
+    .npz     MLP pequeno, executado com NumPy puro (sem TensorFlow no servidor)
+    .joblib  gradient boosting do scikit-learn
+
+Os alunos recebem exatamente a mesma entrada do professor (já escalonada), então
+o scaler do servidor (IA_SCALER_PATH) continua o mesmo. Alunos são avaliados
+com as classes de api/ia_modelos.py, e o arquivo salvo é recarregado por
+carregar_modelo e conferido antes de o script terminar.
+
+Uso:
+    python deep_learning_model/distill_model.py [--amostras-servico 50000] [--concordancia-minima 0.97]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.ensemble import HistGradientBoostingClassifier
+from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.layers import Dense
+from tensorflow.keras.models import Sequential, load_model
+
+from train_model import load_training_data
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from api.ia_features import features_de_atributos
+from api.ia_modelos import ModeloMLPNumpy, ModeloSklearn, carregar_modelo
+
+ATIVACAO_OCULTA = 'elu'
+ARQUITETURAS_MLP = [(16,), (32,), (32, 32), (64, 32)]
+TAMANHO_LOTE_LATENCIA = 1024
+
+def amostrar_entradas_servico(quantidade, scaler_servico, seed=42):
+    """
+    Entradas no formato que o backend envia ao modelo: atributos de Jogador
+    (altura, peso em kg, velocidade, chute, passe e defesa de 1 a 10) levados às
+    unidades da base de origem por api/ia_features.py, como no servidor, e
+    escalonados com o scaler do servidor.
+    """
+    rng = np.random.default_rng(seed)
+    peso = rng.integers(50, 101, quantidade)
+    altura = rng.integers(150, 211, quantidade)
+    atributos = rng.integers(1, 11, (quantidade, 4))
+    return scaler_servico.transform(features_de_atributos(peso, altura, *atributos.T))
+
+# ==============================================================================
+# ALUNOS
+# ==============================================================================
+
+def ativacoes_mlp(camadas):
+    return [ATIVACAO_OCULTA] * (len(camadas) - 1) + ['sigmoid']
+
+def treinar_mlp(ocultas, X, soft_targets, seed=42):
+    """ MLP sem BatchNorm/Dropout treinado para reproduzir as probabilidades do professor. """
+    tf.keras.utils.set_random_seed(seed)
+    model = Sequential(
+        [Dense(ocultas[0], activation=ATIVACAO_OCULTA, input_dim=X.shape[1])]
+        + [Dense(n, activation=ATIVACAO_OCULTA) for n in ocultas[1:]]
+        + [Dense(soft_targets.shape[1], activation='sigmoid')]
+    )
+    model.compile(optimizer=tf.keras.optimizers.Nadam(learning_rate=0.003), loss='binary_crossentropy')
+    model.fit(
+        X, soft_targets, epochs=200, batch_size=256, validation_split=0.1, verbose=0,
+        callbacks=[EarlyStopping(monitor='val_loss', patience=10, mode='min', restore_best_weights=True)],
+    )
+    return [(W.astype(np.float32), b.astype(np.float32)) for W, b in
+            (layer.get_weights() for layer in model.layers)]
+
+def salvar_mlp(camadas, caminho):
+    pesos = {}
+    for i, (W, b) in enumerate(camadas):
+        pesos[f'W{i}'] = W
+        pesos[f'b{i}'] = b
+    np.savez(caminho, n_camadas=len(camadas), ativacoes=np.array(ativacoes_mlp(camadas)), **pesos)
+
+def treinar_gbt(X, soft_targets, seed=42):
+    """ Gradient boosting sobre a posição preferida do professor (argmax). """
+    gbt = HistGradientBoostingClassifier(max_iter=150, max_leaf_nodes=15, early_stopping=True, random_state=seed)
+    gbt.fit(X, soft_targets.argmax(axis=1))
+    return gbt
+
+# ==============================================================================
+# MÉTRICAS
+# ==============================================================================
+
+def concordancia(probabilidades, probabilidades_professor, tolerancia=1e-3):
+    """
+    Fração das linhas em que a posição escolhida pelo aluno também é a melhor
+    para o professor. As saídas sigmoid do v12 saturam e empatam com frequência
+    (várias posições em 1.0); qualquer uma das empatadas conta como concordância.
+    """
+    escolhida = probabilidades_professor[np.arange(len(probabilidades)), probabilidades.argmax(axis=1)]
+    return float((escolhida >= probabilidades_professor.max(axis=1) - tolerancia).mean())
+
+def acuracia_top1(probabilidades, y):
+    """ y é multi-rótulo: acerta quando a posição escolhida é uma das posições reais. """
+    return float(y[np.arange(len(y)), probabilidades.argmax(axis=1)].mean())
+
+def medir_latencia_ms(prever, X, repeticoes=200):
+    prever(X)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        prever(X)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos) * 1000)
+
+def avaliar(nome, prever, X_test, y_test, X_servico, professor_test, professor_servico):
+    probabilidades_test = prever(X_test)
+    lote = np.concatenate([X_test, X_servico])[:TAMANHO_LOTE_LATENCIA]
+    return {
+        'modelo': nome,
+        'concordancia_test': concordancia(probabilidades_test, professor_test),
+        'concordancia_servico': concordancia(prever(X_servico), professor_servico),
+        'acuracia_test': acuracia_top1(probabilidades_test, y_test),
+        'latencia_1_ms': medir_latencia_ms(prever, lote[:1]),
+        f'latencia_{len(lote)}_ms': medir_latencia_ms(prever, lote, repeticoes=50),
+    }
+
+if __name__ == '__main__':
+    DEEP_LEARNING_DIR = Path(__file__).resolve().parent
+    DATA_PATH = DEEP_LEARNING_DIR / 'data' / 'training_data'
+    MODEL_PATH = DEEP_LEARNING_DIR / 'models'
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--versao', default='v12', help="versão do professor (models/modelspi2025_<versao>.h5)")
+    parser.add_argument('--dados', type=Path, default=DATA_PATH)
+    parser.add_argument('--scaler-servico', type=Path, default=DEEP_LEARNING_DIR / 'scalers' / 'scaler_wh.pkl')
+    parser.add_argument('--amostras-servico', type=int, default=50000,
+                        help="entradas no domínio do backend somadas ao X_train para a destilação")
+    parser.add_argument('--concordancia-minima', type=float, default=0.97,
+                        help="concordância mínima com o professor para um aluno ser elegível")
+    args = parser.parse_args()
+
+    # 1. Dados e professor (mesma entrada escalonada usada no treino do v12)
+    try:
+        X_train, y_train, X_test, y_test = load_training_data(args.dados)
+    except FileNotFoundError:
+        print(f"Erro: Arquivos de dados não encontrados em '{args.dados}'.")
+        exit()
+    scaler = joblib.load(args.dados / f'scaler_{args.versao}.pkl')
+    X_train = scaler.transform(X_train).astype(np.float32)
+    X_test = scaler.transform(X_test).astype(np.float32)
+
+    X_servico = amostrar_entradas_servico(args.amostras_servico, joblib.load(args.scaler_servico)).astype(np.float32)
+    divisao = int(len(X_servico) * 0.8)
+    X_servico_treino, X_servico_test = X_servico[:divisao], X_servico[divisao:]
+
+    professor = load_model(MODEL_PATH / f'modelspi2025_{args.versao}.h5')
+    prever_professor = lambda X: np.asarray(professor.predict_on_batch(X))
+    X_destilacao = np.concatenate([X_train, X_servico_treino])
+    soft_targets = np.asarray(professor.predict(X_destilacao, batch_size=4096, verbose=0))
+    professor_test = prever_professor(X_test)
+    professor_servico = prever_professor(X_servico_test)
+    n_classes = soft_targets.shape[1]
+    print(f"Destilando {args.versao}: {len(X_train)} linhas de X_train + {len(X_servico_treino)} do domínio do servidor.")
+
+    # 2. Treina e avalia os alunos
+    relatorio = [avaliar(args.versao, prever_professor, X_test, y_test, X_servico_test, professor_test, professor_servico)]
+    alunos = {}
+    for ocultas in ARQUITETURAS_MLP:
+        nome = 'mlp_' + 'x'.join(map(str, ocultas))
+        print(f"Treinando {nome}...")
+        camadas = treinar_mlp(ocultas, X_destilacao, soft_targets)
+        modelo = ModeloMLPNumpy(camadas, ativacoes_mlp(camadas))
+        alunos[nome] = ('npz', camadas, modelo)
+        relatorio.append(avaliar(nome, modelo.predict_on_batch,
+                                 X_test, y_test, X_servico_test, professor_test, professor_servico))
+
+    print("Treinando gbt...")
+    gbt = treinar_gbt(X_destilacao, soft_targets)
+    modelo = ModeloSklearn(gbt, n_classes)
+    alunos['gbt'] = ('joblib', gbt, modelo)
+    relatorio.append(avaliar('gbt', modelo.predict_on_batch,
+                             X_test, y_test, X_servico_test, professor_test, professor_servico))
+
+    # 3. Relatório
+    df_relatorio = pd.DataFrame(relatorio).set_index('modelo')
+    print("\n--- RELATÓRIO DE DESTILAÇÃO ---")
+    print(df_relatorio.to_string(float_format=lambda v: f"{v:.4f}"))
+    relatorio_path = args.dados / f'distillation_report_{args.versao}.csv'
+    df_relatorio.to_csv(relatorio_path)
+    print(f"Relatório salvo em: {relatorio_path.absolute()}")
+
+    # 4. Salva o melhor aluno: o mais rápido em lote entre os que concordam o
+    #    suficiente com o professor (ou, se nenhum concordar, o mais fiel).
+    candidatos = df_relatorio.drop(index=args.versao)
+    coluna_lote = [c for c in candidatos.columns if c.startswith('latencia_') and c != 'latencia_1_ms'][0]
+    concordancia_minima = candidatos[['concordancia_test', 'concordancia_servico']].min(axis=1)
+    elegiveis = candidatos[concordancia_minima >= args.concordancia_minima]
+    melhor = elegiveis[coluna_lote].idxmin() if len(elegiveis) else concordancia_minima.idxmax()
+    if not len(elegiveis):
+        print(f"Nenhum aluno atingiu concordância de {args.concordancia_minima}; salvando o mais fiel.")
+
+    formato, aluno, modelo = alunos[melhor]
+    aluno_path = MODEL_PATH / f'modelspi2025_{args.versao}_aluno.{formato}'
+    if formato == 'npz':
+        salvar_mlp(aluno, aluno_path)
+    else:
+        joblib.dump(aluno, aluno_path)
+    print(f"Melhor aluno: {melhor}. Salvo em: {aluno_path.absolute()}")
+
+    # 5. Confere o arquivo como o servidor o carrega: mesmas previsões do aluno avaliado.
+    carregado = carregar_modelo(aluno_path)
+    for X in (X_test, X_servico_test):
+        if not np.allclose(carregado.predict_on_batch(X), modelo.predict_on_batch(X), atol=1e-6):
+            print(f"Erro: '{aluno_path.name}' carregado por api/ia_modelos.py não reproduz o aluno avaliado.")
+            exit(1)
+    print(f"Arquivo conferido com api/ia_modelos.py (concordância no domínio do servidor: "
+          f"{concordancia(carregado.predict_on_batch(X_servico_test), professor_servico):.4f}).")
+    print(f"Para servir: copie para ia_models/ e aponte IA_MODELO_PATH para '{aluno_path.name}'.")
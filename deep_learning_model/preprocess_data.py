@@ -0,0 +1,207 @@
+"""
+Gera os CSVs de treino (X_train, y_train, X_test, y_test) a partir da base de
+origem, substituindo o notebook notebooks/00_formatting_data.ipynb.
+
+Etapas (as mesmas do notebook):
+    1. Player_Attributes é lida em blocos de rowid, em paralelo num pool de
+       processos. Cada processo descarta as linhas com work rate inválido ou
+       atributos faltando, junta altura/peso da tabela Player, calcula as
+       features com api/ia_features.py (as mesmas do servidor) e devolve somas
+       e contagens por nome de jogador.
+    2. As somas viram médias por jogador (as features são lineares nos
+       atributos, então a média das features é a feature das médias).
+    3. Os nomes são abreviados como no FIFA ("Lionel Messi" -> "L. Messi") e
+       cruzados com as posições de players_15.csv/players_16.csv (LWB/RWB -> RB,
+       CF -> ST, só-goleiros descartados).
+    4. Cada posição é reamostrada até o tamanho da mais frequente, os dados são
+       divididos em treino/teste e gravados em blocos.
+
+As features saem sem normalização; o scaler é ajustado por train_model.py.
+
+Uso:
+    python deep_learning_model/preprocess_data.py [--fonte data/database.sqlite] [--processos 8]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.utils import resample
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from api.ia_features import COLUNAS_FONTE, NOMES_FEATURES_TREINO, POSICOES_MODELO, features_da_fonte
+
+RITMOS_VALIDOS = ['low', 'medium', 'high']
+SUBSTITUICOES_POSICAO = {'LWB': 'RB', 'RWB': 'RB', 'CF': 'ST'}
+
+# ==============================================================================
+# 1. ATRIBUTOS: LEITURA EM BLOCOS E AGREGAÇÃO POR JOGADOR (PARALELA)
+# ==============================================================================
+
+_processo = {}
+
+
+def intervalos_de_rowid(fonte, tamanho_bloco):
+    with sqlite3.connect(f'file:{fonte}?mode=ro', uri=True) as conexao:
+        minimo, maximo = conexao.execute('SELECT MIN(rowid), MAX(rowid) FROM Player_Attributes').fetchone()
+    if minimo is None:
+        return []
+    return [(inicio, min(inicio + tamanho_bloco - 1, maximo)) for inicio in range(minimo, maximo + 1, tamanho_bloco)]
+
+
+def _iniciar_processo(fonte, jogadores):
+    _processo['conexao'] = sqlite3.connect(f'file:{fonte}?mode=ro', uri=True)
+    _processo['jogadores'] = jogadores
+
+
+def processar_bloco(intervalo):
+    """ Somas e contagens das features por nome de jogador num intervalo de rowid. """
+    df = pd.read_sql_query(
+        f"SELECT player_api_id, attacking_work_rate, defensive_work_rate, {', '.join(COLUNAS_FONTE)} "
+        "FROM Player_Attributes WHERE rowid BETWEEN ? AND ?",
+        _processo['conexao'], params=intervalo,
+    )
+    lidas = len(df)
+    df = df[df['attacking_work_rate'].isin(RITMOS_VALIDOS) & df['defensive_work_rate'].isin(RITMOS_VALIDOS)]
+    df[COLUNAS_FONTE] = df[COLUNAS_FONTE].apply(pd.to_numeric, errors='coerce')
+    df = df.join(_processo['jogadores'], on='player_api_id', how='inner').dropna(
+        subset=COLUNAS_FONTE + ['height', 'weight', 'player_name']
+    )
+
+    features = features_da_fonte(df)
+    agrupado = features.groupby(df['player_name'].to_numpy())
+    return lidas, agrupado.sum(), agrupado.size()
+
+
+def medias_por_jogador(fonte, processos, tamanho_bloco):
+    with sqlite3.connect(f'file:{fonte}?mode=ro', uri=True) as conexao:
+        jogadores = pd.read_sql_query(
+            'SELECT player_api_id, player_name, height, weight FROM Player', conexao
+        ).set_index('player_api_id')
+
+    intervalos = intervalos_de_rowid(fonte, tamanho_bloco)
+    somas = pd.DataFrame(columns=NOMES_FEATURES_TREINO, dtype='float64')
+    contagens = pd.Series(dtype='int64')
+    lidas = 0
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(fonte, jogadores)) as pool:
+        for concluidos, (lidas_bloco, soma, contagem) in enumerate(pool.map(processar_bloco, intervalos), start=1):
+            # Acumula a cada bloco: a memória depende do número de jogadores, não de linhas.
+            somas = soma if somas.empty else somas.add(soma, fill_value=0)
+            contagens = contagem if contagens.empty else contagens.add(contagem, fill_value=0)
+            lidas += lidas_bloco
+            if concluidos % 50 == 0 or concluidos == len(intervalos):
+                print(f"  {concluidos}/{len(intervalos)} blocos, {lidas} linhas lidas")
+
+    medias = somas.div(contagens, axis=0)
+    medias.index.name = 'player_name'
+    return medias.reset_index(), lidas
+
+# ==============================================================================
+# 2. POSIÇÕES (FIFA) E CRUZAMENTO PELO NOME
+# ==============================================================================
+
+def abreviar_nomes(nomes):
+    """ "Lionel Andrés Messi" -> "L. Andrés Messi"; nomes de uma palavra ficam iguais. """
+    partes = nomes.str.split()
+    abreviados = partes.str[0].str[0] + '. ' + partes.str[1:].str.join(' ')
+    return abreviados.where(partes.str.len() > 1, partes.str[0])
+
+
+def carregar_posicoes(caminho_15, caminho_16):
+    """ Posições do FIFA 16 dos jogadores presentes nos dois anos, uma linha por nome. """
+    colunas = {'short_name': 'Name', 'player_positions': 'Position'}
+    fifa15 = pd.read_csv(caminho_15, usecols=list(colunas)).rename(columns=colunas)
+    fifa16 = pd.read_csv(caminho_16, usecols=list(colunas)).rename(columns=colunas)
+    fifa = fifa15[['Name']].merge(fifa16, on='Name', how='inner')
+    # Com nomes repetidos, fica a linha com menos posições.
+    quantidade = fifa['Position'].str.count(',') + 1
+    return fifa.loc[quantidade.groupby(fifa['Name']).idxmin()]
+
+
+def rotular(medias, posicoes):
+    dados = posicoes.merge(medias.assign(Name=abreviar_nomes(medias['player_name'])), on='Name', how='right')
+    dados = dados.dropna(subset=['Position'] + NOMES_FEATURES_TREINO)
+    dados['Position'] = dados['Position'].replace(SUBSTITUICOES_POSICAO, regex=True)
+    dados = dados[dados['Position'] != 'GK']
+    y = dados['Position'].str.get_dummies(sep=', ').reindex(columns=POSICOES_MODELO, fill_value=0)
+    com_posicao = y.sum(axis=1) > 0
+    return dados.loc[com_posicao, NOMES_FEATURES_TREINO].reset_index(drop=True), y[com_posicao].reset_index(drop=True)
+
+# ==============================================================================
+# 3. BALANCEAMENTO, DIVISÃO E GRAVAÇÃO
+# ==============================================================================
+
+def balancear(X, y, seed):
+    """ Reamostra (com reposição) as linhas de cada posição até o total da posição mais frequente. """
+    tamanho = int(y.sum().max())
+    indices = np.concatenate([
+        resample(np.flatnonzero(y[posicao].to_numpy()), replace=True, n_samples=tamanho, random_state=seed)
+        for posicao in POSICOES_MODELO if y[posicao].any()
+    ])
+    return X.iloc[indices].reset_index(drop=True), y.iloc[indices].reset_index(drop=True)
+
+
+def gravar_csv(df, caminho, tamanho_bloco):
+    """ Grava em blocos num arquivo temporário e só então o renomeia. """
+    temporario = caminho.with_name(f'.{caminho.name}.tmp')
+    for inicio in range(0, max(len(df), 1), tamanho_bloco):
+        df.iloc[inicio:inicio + tamanho_bloco].to_csv(
+            temporario, mode='w' if inicio == 0 else 'a', header=inicio == 0, index=False
+        )
+    os.replace(temporario, caminho)
+
+
+if __name__ == '__main__':
+    DEEP_LEARNING_DIR = Path(__file__).resolve().parent
+    DATA_DIR = DEEP_LEARNING_DIR / 'data'
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fonte', type=Path, default=DATA_DIR / 'database.sqlite')
+    parser.add_argument('--fifa-15', type=Path, default=DATA_DIR / 'players_15.csv')
+    parser.add_argument('--fifa-16', type=Path, default=DATA_DIR / 'players_16.csv')
+    parser.add_argument('--saida', type=Path, default=DATA_DIR / 'training_data')
+    parser.add_argument('--processos', type=int, default=os.cpu_count())
+    parser.add_argument('--tamanho-bloco', type=int, default=100_000, help="linhas de Player_Attributes por bloco")
+    parser.add_argument('--fracao-teste', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dividir-antes-de-balancear', action='store_true',
+                        help="divide treino/teste antes de reamostrar, para que cópias de um mesmo jogador não "
+                             "caiam nos dois conjuntos (o notebook balanceava antes de dividir)")
+    args = parser.parse_args()
+
+    for caminho in (args.fonte, args.fifa_15, args.fifa_16):
+        if not caminho.exists():
+            print(f"Erro: '{caminho}' não encontrado.")
+            exit()
+
+    inicio = time.perf_counter()
+    print(f"Lendo {args.fonte} em blocos de {args.tamanho_bloco} linhas com {args.processos} processos...")
+    medias, lidas = medias_por_jogador(args.fonte, args.processos, args.tamanho_bloco)
+    tempo_leitura = time.perf_counter() - inicio
+    print(f"{lidas} linhas de atributos -> {len(medias)} jogadores em {tempo_leitura:.1f}s "
+          f"({lidas / max(tempo_leitura, 1e-9):,.0f} linhas/s).")
+
+    X, y = rotular(medias, carregar_posicoes(args.fifa_15, args.fifa_16))
+    print(f"{len(X)} jogadores de linha com posição no FIFA.")
+
+    if args.dividir_antes_de_balancear:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.fracao_teste, random_state=args.seed)
+        X_train, y_train = balancear(X_train.reset_index(drop=True), y_train.reset_index(drop=True), args.seed)
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(
+            *balancear(X, y, args.seed), test_size=args.fracao_teste, random_state=args.seed
+        )
+
+    args.saida.mkdir(parents=True, exist_ok=True)
+    for nome, df in (('X_train', X_train), ('y_train', y_train), ('X_test', X_test), ('y_test', y_test)):
+        gravar_csv(df, args.saida / f'{nome}.csv', args.tamanho_bloco)
+
+    total = time.perf_counter() - inicio
+    print(f"Treino: {len(X_train)} linhas, teste: {len(X_test)} linhas, gravados em {args.saida.absolute()}.")
+    print(f"Total: {total:.1f}s ({lidas / max(total, 1e-9):,.0f} linhas de origem/s).")
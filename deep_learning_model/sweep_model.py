@@ -0,0 +1,376 @@
+"""
+Busca de hiperparâmetros do modelo de posições, com os trials rodando em paralelo.
+
+Cada trial monta um modelo com build_model (train_model.py) a partir de uma
+combinação do espaço de busca, treina com early stopping e mede a acurácia
+top-1 na validação. Os trials rodam num pool de processos, cada um limitado a
+--threads-por-processo threads do TensorFlow, para usar todos os núcleos sem
+que os processos disputem os mesmos.
+
+A latência de inferência (predict_on_batch, como no backend) não depende dos
+pesos, só da arquitetura. Medida durante o treino dos outros trials ela seria
+só ruído, então é medida depois, por arquitetura, num único processo com
+--threads-latencia threads.
+
+Os resultados (concluídos ou com falha) vão, um por linha, para um arquivo
+JSONL, e as latências para <resultados>_latencias.json; rodar de novo com os
+mesmos arquivos pula o que já foi feito. Um trial perdido porque o pool quebrou
+(processo morto, ex.: falta de memória) fica como 'interrompido' e roda de novo
+na retomada; só os que falharam no próprio treino esperam --repetir-falhas. No fim, mostra a fronteira de Pareto
+entre acurácia de validação e latência.
+
+A validação sai de X_train (--fracao-validacao); X_test só é usado para
+reportar a acurácia dos modelos da fronteira, não para escolhê-los.
+
+Uso:
+    python deep_learning_model/sweep_model.py [--espaco espaco.json] [--trials 40] [--processos 8]
+    python deep_learning_model/sweep_model.py --apenas-relatorio
+
+O espaço de busca é um JSON com uma lista de valores por parâmetro (mesmas
+chaves de ESPACO_PADRAO); parâmetros omitidos ficam com os valores do v12.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+# Sem TensorFlow no topo: os processos do pool limitam as threads antes do import.
+
+CONFIGURACAO_V12 = {
+    'camadas': [128, 256, 128],
+    'dropout': [0.2, 0.2, 0.1],
+    'batch_norm': True,
+    'ativacao': 'elu',
+    'otimizador': 'nadam',
+    'learning_rate': 0.0007,
+    'batch_size': 64,
+}
+
+ESPACO_PADRAO = {
+    'camadas': [[32], [64], [64, 32], [128, 64], [64, 64, 32], [128, 256, 128]],
+    'dropout': [0.0, 0.1, 0.2],
+    'batch_norm': [True, False],
+    'ativacao': ['elu', 'relu'],
+    'otimizador': ['nadam', 'adam'],
+    'learning_rate': [0.0003, 0.0007, 0.002],
+    'batch_size': [64, 256],
+}
+
+OTIMIZADORES = {'nadam': 'Nadam', 'adam': 'Adam', 'rmsprop': 'RMSprop'}
+TAMANHO_LOTE_LATENCIA = 1024
+
+# ==============================================================================
+# TRIALS
+# ==============================================================================
+
+def id_trial(configuracao):
+    return hashlib.sha1(json.dumps(configuracao, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def gerar_trials(espaco, quantidade, seed):
+    """
+    Todas as combinações do espaço, ou `quantidade` delas sorteadas sem
+    repetição quando o espaço for maior.
+    """
+    espaco = {**{chave: [valor] for chave, valor in CONFIGURACAO_V12.items()}, **espaco}
+    chaves = sorted(espaco)
+    total = int(np.prod([len(espaco[chave]) for chave in chaves]))
+    if quantidade is None or quantidade >= total:
+        combinacoes = itertools.product(*(espaco[chave] for chave in chaves))
+    else:
+        rng = random.Random(seed)
+        indices = rng.sample(range(total), quantidade)
+        combinacoes = []
+        for indice in indices:
+            combinacao = []
+            for chave in reversed(chaves):
+                indice, resto = divmod(indice, len(espaco[chave]))
+                combinacao.append(espaco[chave][resto])
+            combinacoes.append(reversed(combinacao))
+    return [dict(zip(chaves, combinacao)) for combinacao in combinacoes]
+
+
+def ler_resultados(caminho):
+    if not caminho.exists():
+        return []
+    resultados = []
+    with open(caminho) as arquivo:
+        for linha in arquivo:
+            try:
+                resultados.append(json.loads(linha))
+            except json.JSONDecodeError:
+                continue  # linha cortada por uma interrupção no meio da escrita
+    return resultados
+
+
+def caminho_latencias(caminho_resultados):
+    return caminho_resultados.with_name(caminho_resultados.stem + '_latencias.json')
+
+
+def ler_latencias(caminho):
+    return json.loads(caminho.read_text()) if caminho.exists() else {}
+
+
+def chave_arquitetura(configuracao):
+    # Dropout não altera a inferência; otimizador e lote só o treino.
+    return json.dumps({chave: configuracao[chave] for chave in ('camadas', 'batch_norm', 'ativacao')}, sort_keys=True)
+
+
+def registrar(caminho, resultado):
+    with open(caminho, 'a') as arquivo:
+        arquivo.write(json.dumps(resultado) + '\n')
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+
+# ==============================================================================
+# PROCESSO DO POOL
+# ==============================================================================
+
+_dados = {}
+
+
+def _iniciar_processo(threads, dados):
+    for variavel in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+        os.environ[variavel] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _dados.update(dados)
+
+
+def executar_trial(configuracao, epocas, paciencia, seed):
+    import tensorflow as tf
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+    from distill_model import acuracia_top1
+    from train_model import build_model
+
+    resultado = {'id': id_trial(configuracao), 'configuracao': configuracao, 'pid': os.getpid()}
+    inicio = time.perf_counter()
+    try:
+        tf.keras.utils.set_random_seed(seed)
+        X_treino, y_treino = _dados['X_treino'], _dados['y_treino']
+        model = build_model(
+            X_treino.shape[1], y_treino.shape[1],
+            camadas=configuracao['camadas'],
+            dropouts=configuracao['dropout'],
+            ativacao=configuracao['ativacao'],
+            batch_norm=configuracao['batch_norm'],
+        )
+        otimizador = getattr(tf.keras.optimizers, OTIMIZADORES[configuracao['otimizador']])
+        model.compile(optimizer=otimizador(learning_rate=configuracao['learning_rate']), loss='binary_crossentropy')
+        historico = model.fit(
+            X_treino, y_treino,
+            epochs=epocas,
+            batch_size=configuracao['batch_size'],
+            validation_data=(_dados['X_val'], _dados['y_val']),
+            callbacks=[
+                EarlyStopping(monitor='val_loss', patience=paciencia, mode='min', restore_best_weights=True),
+                ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=max(1, paciencia // 2), min_lr=1e-6),
+            ],
+            verbose=0,
+        )
+
+        prever = lambda X: np.asarray(model.predict(X, batch_size=4096, verbose=0))
+        resultado.update(
+            status='ok',
+            epocas=len(historico.history['loss']),
+            val_loss=float(min(historico.history['val_loss'])),
+            acuracia_val=acuracia_top1(prever(_dados['X_val']), _dados['y_val']),
+            acuracia_test=acuracia_top1(prever(_dados['X_test']), _dados['y_test']),
+            parametros=int(model.count_params()),
+        )
+    except Exception as e:
+        resultado.update(status='falhou', erro=f"{type(e).__name__}: {e}", traceback=traceback.format_exc(limit=5))
+    resultado['segundos'] = round(time.perf_counter() - inicio, 1)
+    return resultado
+
+def medir_latencia_arquitetura(configuracao):
+    import tensorflow as tf
+
+    from distill_model import medir_latencia_ms
+    from train_model import build_model
+
+    tf.keras.utils.set_random_seed(0)
+    X = _dados['X_latencia']
+    model = build_model(
+        X.shape[1], _dados['n_classes'],
+        camadas=configuracao['camadas'], dropouts=0.0,
+        ativacao=configuracao['ativacao'], batch_norm=configuracao['batch_norm'],
+    )
+    prever = lambda entrada: np.asarray(model.predict_on_batch(entrada))
+    return {
+        'latencia_1_ms': medir_latencia_ms(prever, X[:1]),
+        'latencia_lote_ms': medir_latencia_ms(prever, X, repeticoes=50),
+    }
+
+# ==============================================================================
+# FRONTEIRA DE PARETO
+# ==============================================================================
+
+def fronteira_pareto(resultados, latencia='latencia_1_ms'):
+    """
+    Trials concluídos que nenhum outro supera ao mesmo tempo em acurácia de
+    validação e em latência, do mais rápido para o mais preciso.
+    """
+    concluidos = sorted(
+        (r for r in resultados if r.get('status') == 'ok'),
+        key=lambda r: (r[latencia], -r['acuracia_val']),
+    )
+    fronteira, melhor_acuracia = [], -1.0
+    for resultado in concluidos:
+        if resultado['acuracia_val'] > melhor_acuracia:
+            fronteira.append(resultado)
+            melhor_acuracia = resultado['acuracia_val']
+    return fronteira
+
+
+def _descrever(configuracao):
+    return (f"{'x'.join(map(str, configuracao['camadas']))} do={configuracao['dropout']} "
+            f"bn={'s' if configuracao['batch_norm'] else 'n'} {configuracao['ativacao']} "
+            f"{configuracao['otimizador']}@{configuracao['learning_rate']} bs={configuracao['batch_size']}")
+
+
+def relatorio(resultados, latencias, latencia):
+    # Um trial repetido (--repetir-falhas ou interrompido) vale pelo último registro.
+    resultados = list({r['id']: r for r in resultados}.values())
+    concluidos = [
+        {**r, **latencias[chave_arquitetura(r['configuracao'])]}
+        for r in resultados
+        if r.get('status') == 'ok' and chave_arquitetura(r['configuracao']) in latencias
+    ]
+    falhas = [r for r in resultados if r.get('status') == 'falhou']
+    interrompidos = [r for r in resultados if r.get('status') == 'interrompido']
+    print(f"\n--- SWEEP: {len(concluidos)} trials concluídos, {len(falhas)} com falha, "
+          f"{len(interrompidos)} interrompidos (rodam de novo na retomada) ---")
+    for falha in falhas:
+        print(f"  falhou {falha['id']} ({_descrever(falha['configuracao'])}): {falha['erro']}")
+
+    fronteira = fronteira_pareto(concluidos, latencia)
+    print(f"\nFronteira de Pareto (acurácia de validação x {latencia}):")
+    print(f"{'id':<13} {'acur. val':>9} {'acur. test':>10} {'lat. 1 (ms)':>11} {'lat. lote (ms)':>14} {'parâm.':>8}  configuração")
+    for r in fronteira:
+        print(f"{r['id']:<13} {r['acuracia_val']:>9.4f} {r['acuracia_test']:>10.4f} {r['latencia_1_ms']:>11.3f} "
+              f"{r['latencia_lote_ms']:>14.3f} {r['parametros']:>8}  {_descrever(r['configuracao'])}")
+    return fronteira
+
+
+if __name__ == '__main__':
+    DEEP_LEARNING_DIR = Path(__file__).resolve().parent
+    DATA_PATH = DEEP_LEARNING_DIR / 'data' / 'training_data'
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--espaco', type=Path, help="JSON com o espaço de busca (padrão: ESPACO_PADRAO)")
+    parser.add_argument('--trials', type=int, default=40, help="trials sorteados do espaço (0 = todas as combinações)")
+    parser.add_argument('--processos', type=int, default=os.cpu_count(), help="trials treinando ao mesmo tempo")
+    parser.add_argument('--threads-por-processo', type=int, default=None,
+                        help="threads do TensorFlow por trial (padrão: núcleos / processos)")
+    parser.add_argument('--threads-latencia', type=int, default=1,
+                        help="threads do TensorFlow ao medir a latência (como IA_THREADS_POR_WORKER no servidor)")
+    parser.add_argument('--epocas', type=int, default=100)
+    parser.add_argument('--paciencia', type=int, default=15, help="épocas sem melhora na val_loss até parar")
+    parser.add_argument('--fracao-validacao', type=float, default=0.15)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dados', type=Path, default=DATA_PATH)
+    parser.add_argument('--resultados', type=Path, default=DATA_PATH / 'sweep_results.jsonl')
+    parser.add_argument('--repetir-falhas', action='store_true', help="roda de novo os trials que falharam")
+    parser.add_argument('--latencia', choices=['latencia_1_ms', 'latencia_lote_ms'], default='latencia_1_ms',
+                        help="latência usada na fronteira de Pareto")
+    parser.add_argument('--apenas-relatorio', action='store_true', help="só mostra a fronteira do arquivo de resultados")
+    args = parser.parse_args()
+
+    arquivo_latencias = caminho_latencias(args.resultados)
+    if args.apenas_relatorio:
+        relatorio(ler_resultados(args.resultados), ler_latencias(arquivo_latencias), args.latencia)
+        exit()
+
+    # 1. Trials pendentes
+    espaco = json.loads(args.espaco.read_text()) if args.espaco else ESPACO_PADRAO
+    trials = gerar_trials(espaco, args.trials or None, args.seed)
+    anteriores = ler_resultados(args.resultados)
+    # Vale o último registro de cada trial; 'interrompido' nunca conta como feito.
+    ultimos = {r['id']: r.get('status') for r in anteriores}
+    feitos = {identificador for identificador, status in ultimos.items()
+              if status == 'ok' or (status == 'falhou' and not args.repetir_falhas)}
+    pendentes = [configuracao for configuracao in trials if id_trial(configuracao) not in feitos]
+    print(f"{len(trials)} trials no sweep, {len(trials) - len(pendentes)} já registrados em {args.resultados}.")
+
+    latencias = ler_latencias(arquivo_latencias)
+    arquiteturas = trials + [r['configuracao'] for r in anteriores if r.get('status') == 'ok']
+    sem_latencia = {chave_arquitetura(configuracao): configuracao for configuracao in arquiteturas}
+    sem_latencia = {chave: configuracao for chave, configuracao in sem_latencia.items() if chave not in latencias}
+
+    if pendentes or sem_latencia:
+        # 2. Dados: mesma preparação do train_model.py, com a validação tirada do treino.
+        from sklearn.preprocessing import MinMaxScaler
+        from train_model import load_training_data
+        try:
+            X_train, y_train, X_test, y_test = load_training_data(args.dados)
+        except FileNotFoundError:
+            print(f"Erro: Arquivos de dados não encontrados em '{args.dados}'.")
+            exit()
+        ordem = np.random.default_rng(args.seed).permutation(len(X_train))
+        corte = int(len(ordem) * (1 - args.fracao_validacao))
+        scaler = MinMaxScaler().fit(X_train[ordem[:corte]])
+        preparar = lambda X: scaler.transform(X).astype(np.float32)
+        dados = dict(
+            X_treino=preparar(X_train[ordem[:corte]]), y_treino=y_train[ordem[:corte]].astype(np.float32),
+            X_val=preparar(X_train[ordem[corte:]]), y_val=y_train[ordem[corte:]].astype(np.float32),
+            X_test=preparar(X_test), y_test=y_test.astype(np.float32),
+        )
+
+    if pendentes:
+        # 3. Pool: 'spawn' para cada processo importar o TensorFlow já com as threads limitadas.
+        processos = max(1, min(args.processos, len(pendentes)))
+        threads = args.threads_por_processo or max(1, (os.cpu_count() or 1) // processos)
+        print(f"Rodando {len(pendentes)} trials em {processos} processos com {threads} thread(s) cada.")
+        args.resultados.parent.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(
+            max_workers=processos, mp_context=get_context('spawn'),
+            initializer=_iniciar_processo, initargs=(threads, dados),
+        ) as pool:
+            futuros = {
+                pool.submit(executar_trial, configuracao, args.epocas, args.paciencia, args.seed): configuracao
+                for configuracao in pendentes
+            }
+            for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+                configuracao = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    # Processo morto (ex.: falta de memória): o pool inteiro é perdido, e
+                    # com ele os trials que ainda não tinham rodado. Não é falha do trial.
+                    resultado = {'id': id_trial(configuracao), 'configuracao': configuracao,
+                                 'status': 'interrompido', 'erro': f"{type(e).__name__}: {e}"}
+                registrar(args.resultados, resultado)
+                resumo = (f"acur. val {resultado['acuracia_val']:.4f} em {resultado['epocas']} épocas"
+                          if resultado['status'] == 'ok' else resultado['erro'])
+                print(f"[{concluidos}/{len(pendentes)}] {resultado['id']} {_descrever(configuracao)}: {resumo}")
+
+    if sem_latencia:
+        # 4. Latência por arquitetura, uma de cada vez, sem treino concorrendo.
+        print(f"Medindo a latência de {len(sem_latencia)} arquitetura(s) com {args.threads_latencia} thread(s).")
+        X_latencia = np.concatenate([dados['X_val'], dados['X_test']])[:TAMANHO_LOTE_LATENCIA]
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=get_context('spawn'), initializer=_iniciar_processo,
+            initargs=(args.threads_latencia, {'X_latencia': X_latencia, 'n_classes': dados['y_val'].shape[1]}),
+        ) as pool:
+            for chave, configuracao in sem_latencia.items():
+                latencias[chave] = pool.submit(medir_latencia_arquitetura, configuracao).result()
+                temporario = arquivo_latencias.with_suffix('.tmp')
+                temporario.write_text(json.dumps(latencias, indent=1))
+                os.replace(temporario, arquivo_latencias)
+
+    # 5. Relatório com todos os trials do arquivo
+    relatorio(ler_resultados(args.resultados), latencias, args.latencia)
@@ -16,21 +16,25 @@ def load_training_data(data_path):
     y_test = pd.read_csv(data_path / 'y_test.csv')
     return X_train.values, y_train.values, X_test.values, y_test.values
 
-def build_model(input_shape, output_shape):
-    """Constrói o modelo Keras sequencial."""
+def build_model(input_shape, output_shape, camadas=(128, 256, 128), dropouts=(0.2, 0.2, 0.1),
+                ativacao='elu', batch_norm=True):
+    """
+    Constrói o modelo Keras sequencial. Os padrões são a arquitetura do v12;
+    `dropouts` aceita um valor por camada ou um único valor para todas.
+    """
     print("Construindo o modelo...")
-    model = Sequential([
-        Dense(128, activation='elu', input_dim=input_shape),
-        BatchNormalization(),
-        Dropout(0.2),
-        Dense(256, activation='elu'),
-        BatchNormalization(),
-        Dropout(0.2),
-        Dense(128, activation='elu'),
-        BatchNormalization(),
-        Dropout(0.1),
-        Dense(output_shape, activation='sigmoid')
-    ])
+    if isinstance(dropouts, (int, float)):
+        dropouts = [dropouts] * len(camadas)
+    if len(dropouts) < len(camadas):
+        raise ValueError(f"{len(camadas)} camadas e só {len(dropouts)} valores de dropout.")
+    model = Sequential()
+    for i, (unidades, dropout) in enumerate(zip(camadas, dropouts)):
+        model.add(Dense(unidades, activation=ativacao, **({'input_dim': input_shape} if i == 0 else {})))
+        if batch_norm:
+            model.add(BatchNormalization())
+        if dropout:
+            model.add(Dropout(dropout))
+    model.add(Dense(output_shape, activation='sigmoid'))
     return model
 
 def fit_and_save_scaler(X_train_data, save_path):
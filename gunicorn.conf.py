@@ -0,0 +1,75 @@
+"""
+Configuração do gunicorn, lida automaticamente ao rodar `gunicorn` na raiz do projeto.
+
+Com preload_app o master importa Django, TensorFlow/Keras, as views e o scaler
+antes do fork, e os workers compartilham essas páginas por copy-on-write. Um
+modelo Keras é montado em cada worker depois do fork; um aluno destilado
+(.npz/.joblib) não usa TensorFlow e é carregado no master (ver api/ia_modelos.py).
+
+Variáveis de ambiente:
+    GUNICORN_BIND, GUNICORN_WORKERS, GUNICORN_TIMEOUT
+    GUNICORN_THREADS            threads por worker (worker gthread); padrão: as que as
+                                views de IA podem prender (concorrencia + fila de
+                                settings.IA_ADMISSAO) mais GUNICORN_THREADS_RESERVA
+    GUNICORN_THREADS_RESERVA    threads deixadas para as outras views (padrão 2)
+    GUNICORN_PRELOAD=0          desliga o preload (para comparação)
+    IA_THREADS_POR_WORKER       threads de TF/BLAS por worker (padrão: núcleos / workers)
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'core.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Sem limite, cada worker abre um pool de threads do tamanho da máquina e os
+# workers disputam os mesmos núcleos. Precisa estar no ambiente antes do
+# import de numpy/TensorFlow, que acontece no master quando há preload.
+threads_por_worker = int(os.environ.get(
+    'IA_THREADS_POR_WORKER', max(1, multiprocessing.cpu_count() // workers)
+))
+for variavel in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+    os.environ.setdefault(variavel, str(threads_por_worker))
+os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+
+# Cada requisição de IA executando ou na fila do limitador prende uma thread (ver
+# api/admissao.py). Com as threads do orçamento de IA mais a reserva, as outras
+# views continuam sendo atendidas com a IA lotada, e o excedente de IA chega ao
+# limitador e recebe 503 na hora em vez de esperar na fila do gunicorn.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+from api.admissao import threads_ocupadas_pela_ia
+
+threads_ia = threads_ocupadas_pela_ia()
+threads_reserva = int(os.environ.get('GUNICORN_THREADS_RESERVA', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', threads_ia + threads_reserva))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+
+def when_ready(server):
+    if threads <= threads_ia:
+        server.log.warning(
+            f"GUNICORN_THREADS={threads} não passa das {threads_ia} threads que as views de IA podem "
+            "prender (concorrencia + fila de IA_ADMISSAO): com a IA lotada as outras views ficam sem "
+            "thread e o excedente espera na fila do gunicorn em vez de receber 503."
+        )
+    if preload_app:
+        from api.ia_modelos import preparar_para_fork
+        preparar_para_fork()
+        server.log.info("Dependências de IA pré-carregadas no master.")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Conexões de banco abertas no master não podem ser usadas por dois processos.
+        from django.db import connections
+        connections.close_all()
+        from api.ia_modelos import reiniciar_apos_fork
+        reiniciar_apos_fork()
+
+
+def post_worker_init(worker):
+    from api.ia_modelos import configurar_threads, obter_modelo_ia
+    configurar_threads(threads_por_worker)
+    obter_modelo_ia()